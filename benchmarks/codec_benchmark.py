@@ -0,0 +1,89 @@
+# coding=utf-8
+"""Compare the data file codecs on recorded data.
+
+Usage: python benchmarks/codec_benchmark.py /data/btc_usdt/depth_2022-11-10.json.gz
+"""
+import argparse
+import gzip
+import time
+from pathlib import Path
+
+from binance_data_collector.app.helpers.data_file_manager import (
+    Codec,
+    GzipCodec,
+    Lz4Codec,
+    ZstdCodec,
+)
+
+MB: int = 1024 * 1024
+
+
+def read_records(path: Path, limit_mb: int) -> bytes:
+    opener = gzip.open if path.suffix == ".gz" else open
+
+    with opener(path, mode="rb") as f:
+        return f.read(limit_mb * MB)
+
+
+def create_codecs() -> list[Codec]:
+    codecs: list[Codec] = [GzipCodec(level=level) for level in (1, 6, 9)]
+
+    try:
+        codecs.extend([ZstdCodec(level=level) for level in (1, 3, 9)])
+        codecs.append(ZstdCodec(level=3, threads=4))
+    except RuntimeError as e:
+        print(f"Skip zstd: {e}")
+
+    try:
+        codecs.extend([Lz4Codec(level=level) for level in (0, 9)])
+    except RuntimeError as e:
+        print(f"Skip lz4: {e}")
+
+    return codecs
+
+
+def benchmark(codec: Codec, data: bytes, block_size: int) -> str:
+    blocks: list[bytes] = [
+        data[i:i + block_size] for i in range(0, len(data), block_size)
+    ]
+
+    start: float = time.perf_counter()
+    compressed: list[bytes] = [codec.compress(block) for block in blocks]
+    compress_s: float = time.perf_counter() - start
+
+    start = time.perf_counter()
+    restored: bytes = codec.decompress(b"".join(compressed))
+    decompress_s: float = time.perf_counter() - start
+
+    assert restored == data, f"{codec} does not round trip"
+
+    size: int = sum(len(block) for block in compressed)
+
+    return (
+        f"{codec!r:<50} "
+        f"compress {len(data) / MB / compress_s:8.1f} MB/s  "
+        f"decompress {len(data) / MB / decompress_s:8.1f} MB/s  "
+        f"ratio {len(data) / size:6.2f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", type=Path, help="Recorded data file")
+    parser.add_argument("--limit-mb", type=int, default=256)
+    parser.add_argument("--block-size-kb", type=int, default=1024)
+    args = parser.parse_args()
+
+    data: bytes = read_records(path=args.path, limit_mb=args.limit_mb)
+    print(f"{args.path}: {len(data) / MB:.1f} MB uncompressed")
+
+    for codec in create_codecs():
+        print(benchmark(
+            codec=codec,
+            data=data,
+            block_size=args.block_size_kb * 1024,
+        ))
+
+
+if __name__ == '__main__':
+    main()
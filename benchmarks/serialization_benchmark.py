@@ -0,0 +1,120 @@
+# coding=utf-8
+"""Compare the compiled serializer plans with the generic jsons path.
+
+Usage: python benchmarks/serialization_benchmark.py --count 10000
+"""
+import argparse
+import dataclasses
+import datetime
+import enum
+import time
+import typing
+
+import jsons
+
+from binance_data_collector.serialization import JsonFormatter
+from binance_data_collector.serialization.core import (
+    ClassDeserializer,
+    ClassSerializer,
+)
+from binance_data_collector.serialization.plans import compile_plan
+
+
+class Status(enum.Enum):
+    ACTIVE = "ACTIVE"
+    IDLE = "IDLE"
+
+
+# no defaults, jsons would take them for class variables
+@dataclasses.dataclass(kw_only=True)
+class Pair(object):
+    uuid: str
+    created_at: datetime.datetime
+    updated_at: datetime.datetime
+    base: str
+    quote: str
+    status: Status
+    tags: list[str]
+    parent: typing.Optional["Pair"]
+
+
+def create_pairs(count: int) -> dict[str, Pair]:
+    now: datetime.datetime = datetime.datetime.now(tz=datetime.timezone.utc)
+
+    return {
+        str(i): Pair(
+            uuid=str(i),
+            created_at=now,
+            updated_at=now,
+            base=f"B{i}",
+            quote="USDT",
+            status=Status.IDLE if i % 2 else Status.ACTIVE,
+            tags=["spot", "margin"],
+            parent=Pair(
+                uuid=f"{i}p",
+                created_at=now,
+                updated_at=now,
+                base="BTC",
+                quote="USDT",
+                status=Status.ACTIVE,
+                tags=[],
+                parent=None,
+            ),
+        )
+        for i in range(count)
+    }
+
+
+def measure(name: str, count: int, callback: typing.Callable[[], typing.Any]) -> typing.Any:
+    start: float = time.perf_counter()
+    result: typing.Any = callback()
+    elapsed_s: float = time.perf_counter() - start
+
+    print(f"{name:<20} {elapsed_s * 1000:10.1f} ms  {count / elapsed_s:12.0f} objects/s")
+
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10000)
+    args = parser.parse_args()
+
+    pairs: dict[str, Pair] = create_pairs(count=args.count)
+    cls: type = dict[str, Pair]
+
+    # the current jsons path, on its own fork
+    fork = jsons.fork()
+    jsons.set_serializer(ClassSerializer(), cls=Pair, fork_inst=fork)
+    jsons.set_deserializer(ClassDeserializer(), cls=Pair, fork_inst=fork)
+
+    data: typing.Any = measure(
+        "jsons dump",
+        args.count,
+        lambda: jsons.dump(pairs, fork_inst=fork),
+    )
+    loaded: typing.Any = measure(
+        "jsons load",
+        args.count,
+        lambda: jsons.load(data, cls=cls, fork_inst=fork),
+    )
+    assert loaded == pairs
+
+    # what @serializable does, on a formatter of another fork
+    setattr(Pair, "__serialization_plan__", compile_plan(cls=Pair))
+    formatter: JsonFormatter = JsonFormatter(fork_inst=jsons.fork())
+
+    data = measure("plan dump", args.count, lambda: formatter.dump(pairs))
+    loaded = measure(
+        "plan load",
+        args.count,
+        lambda: formatter.load(data, cls=cls),
+    )
+    assert loaded == pairs
+
+    text: str = measure("plan dumps", args.count, lambda: formatter.dumps(pairs))
+    measure("plan loads", args.count, lambda: formatter.loads(text, cls=cls))
+
+
+if __name__ == '__main__':
+    main()
@@ -12,5 +12,6 @@ from .injection import (
 from .injectable import Injectable
 from .module import Module
 from .pipes import ParseUUIDPipe, UUIDVersion
+from .responses import StreamingResponse
 from .route import Request, Param, Query, Body
 from .types import InjectionToken
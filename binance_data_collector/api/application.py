@@ -60,10 +60,33 @@ class Application(object):
             if isinstance(component, OnDestroy):
                 component.on_destroy()
 
-    def listen(self, port: int = 3000) -> None:
+    def get(self, token: InjectionToken) -> typing.Any:
+        """Return the provider registered for the token"""
+
+        if isinstance(token, type):
+            token = token.__name__
+
+        if token not in self._providers:
+            raise RuntimeError(f"Provider not found for {token}")
+
+        return self._providers[token]
+
+    def init(self) -> None:
         self.init_components(components=list(self._providers.values()))
         self.init_components(components=list(self._controllers.values()))
 
+    def destroy(self) -> None:
+        # destroy in reverse order, dependents before their dependencies
+        self.destroy_components(
+            components=list(reversed(self._controllers.values())),
+        )
+        self.destroy_components(
+            components=list(reversed(self._providers.values())),
+        )
+
+    def listen(self, port: int = 3000) -> None:
+        self.init()
+
         uvicorn.run(
             app=self._app,
             host="0.0.0.0",
@@ -72,8 +95,7 @@ class Application(object):
             log_config=None,
         )
 
-        self.destroy_components(components=list(self._controllers.values()))
-        self.destroy_components(components=list(self._providers.values()))
+        self.destroy()
 
     def get_api_metadata(self, o: typing.Any, key: str) -> typing.Any:
         metadata: dict[str, typing.Any] = getattr(o, API_METADATA_KEY)
@@ -296,10 +318,16 @@ class Application(object):
                 signature=signature,
             )
 
+            response_model: typing.Any = signature.return_annotation
+
+            # responses are sent as they are, without a model
+            if inspect.isclass(response_model) and issubclass(response_model, fastapi.Response):
+                response_model = None
+
             self._app.router.add_api_route(
                 path='/' + '/'.join(path_segments),
                 endpoint=endpoint_method,
-                response_model=signature.return_annotation,
+                response_model=response_model,
                 status_code=metadata.status_code,
                 tags=metadata.tags,
                 methods=[metadata.method.name],
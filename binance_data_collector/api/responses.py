@@ -0,0 +1,6 @@
+# coding=utf-8
+import fastapi.responses
+
+
+class StreamingResponse(fastapi.responses.StreamingResponse):
+    pass
@@ -1,5 +1,7 @@
 # coding=utf-8
+import dataclasses
 import datetime
+import typing
 
 from binance_data_collector.api import (
     Controller,
@@ -9,6 +11,7 @@ from binance_data_collector.api import (
     Post,
     Query,
     ParseUUIDPipe,
+    StreamingResponse,
     UUIDVersion,
 )
 
@@ -16,8 +19,17 @@ from .app_service import AppService
 from .constants import TZ
 from .dto.currency_pair_response_dto import CurrencyPairResponseDTO
 from .dto.currency_pairs_query_dto import CurrencyPairsQueryDTO
+from .dto.data_query_dto import DataQueryDTO
 from .dto.health_reponse_dto import HealthResponseDTO
 from .dto.info_response_dto import InfoResponseDTO
+from .dto.metrics_response_dto import MetricsResponseDTO
+from .dto.order_book_query_dto import OrderBookQueryDTO
+from .dto.order_book_response_dto import OrderBookResponseDTO
+from .dto.segment_response_dto import SegmentResponseDTO
+from .dto.segments_query_dto import SegmentsQueryDTO
+from .helpers.data_collector import CollectorMetrics
+from .helpers.order_book import OrderBookView
+from .helpers.segments import SegmentInfo
 from .models.currency_pair import CurrencyPair
 
 
@@ -37,6 +49,29 @@ class AppController(object):
     def get_health(self) -> HealthResponseDTO:
         return HealthResponseDTO(status="OK")
 
+    @Get("metrics", tags=["metrics"])
+    def get_metrics(self) -> MetricsResponseDTO:
+        metrics: CollectorMetrics = self._app_service.get_metrics()
+
+        return MetricsResponseDTO(**dataclasses.asdict(metrics))
+
+    @Get("segments", tags=["segments"])
+    def get_segments(
+        self,
+        query: SegmentsQueryDTO = Query(),
+    ) -> list[SegmentResponseDTO]:
+        segments: list[SegmentInfo] = self._app_service.get_segments(
+            symbol=query.symbol,
+            name=query.name,
+            from_ms=query.from_ms,
+            to_ms=query.to_ms,
+        )
+
+        return [
+            SegmentResponseDTO(**dataclasses.asdict(segment))
+            for segment in segments
+        ]
+
     @Get("currency_pairs", tags=["currency_pairs"])
     def get_currency_pairs(
         self,
@@ -57,6 +92,54 @@ class AppController(object):
             for currency_pair in currency_pairs
         ]
 
+    @Post(
+        "currency_pairs/start",
+        status_code=HttpStatus.OK,
+        tags=["currency_pairs"],
+    )
+    def start_currency_pairs(
+        self,
+        query: CurrencyPairsQueryDTO = Query(),
+    ) -> list[CurrencyPairResponseDTO]:
+        currency_pairs: list[CurrencyPair] = \
+            self._app_service.start_currency_pairs(query=query.dict())
+
+        return [
+            CurrencyPairResponseDTO(
+                uuid=currency_pair.uuid,
+                base=currency_pair.base,
+                quote=currency_pair.quote,
+                status=currency_pair.status,
+                created_at=currency_pair.created_at,
+                updated_at=currency_pair.updated_at,
+            )
+            for currency_pair in currency_pairs
+        ]
+
+    @Post(
+        "currency_pairs/stop",
+        status_code=HttpStatus.OK,
+        tags=["currency_pairs"],
+    )
+    def stop_currency_pairs(
+        self,
+        query: CurrencyPairsQueryDTO = Query(),
+    ) -> list[CurrencyPairResponseDTO]:
+        currency_pairs: list[CurrencyPair] = \
+            self._app_service.stop_currency_pairs(query=query.dict())
+
+        return [
+            CurrencyPairResponseDTO(
+                uuid=currency_pair.uuid,
+                base=currency_pair.base,
+                quote=currency_pair.quote,
+                status=currency_pair.status,
+                created_at=currency_pair.created_at,
+                updated_at=currency_pair.updated_at,
+            )
+            for currency_pair in currency_pairs
+        ]
+
     @Get("currency_pairs/{uuid}", tags=["currency_pairs"])
     def get_currency_pair(
         self,
@@ -75,6 +158,42 @@ class AppController(object):
             updated_at=currency_pair.updated_at,
         )
 
+    @Get("currency_pairs/{uuid}/book", tags=["currency_pairs"])
+    def get_order_book(
+        self,
+        uuid: str = Param("uuid", ParseUUIDPipe(version=UUIDVersion.V4)),
+        query: OrderBookQueryDTO = Query(),
+    ) -> OrderBookResponseDTO:
+        order_book: OrderBookView = self._app_service.get_order_book(
+            uuid=uuid,
+            depth=query.depth,
+        )
+
+        return OrderBookResponseDTO(**dataclasses.asdict(order_book))
+
+    @Get("currency_pairs/{uuid}/data/{channel}", tags=["currency_pairs"])
+    def get_data(
+        self,
+        uuid: str = Param("uuid", ParseUUIDPipe(version=UUIDVersion.V4)),
+        channel: str = Param("channel"),
+        query: DataQueryDTO = Query(),
+    ) -> StreamingResponse:
+        chunks: typing.Iterator[bytes] = self._app_service.get_data(
+            uuid=uuid,
+            channel=channel,
+            from_ms=query.from_ms,
+            to_ms=query.to_ms,
+            data_format=query.format,
+        )
+
+        return StreamingResponse(
+            content=chunks,
+            media_type=(
+                "application/octet-stream" if query.format == "bin"
+                else "application/x-ndjson"
+            ),
+        )
+
     @Post(
         "currency_pairs/{uuid}/start",
         status_code=HttpStatus.NO_CONTENT,
@@ -1,29 +1,55 @@
 # coding=utf-8
 from pathlib import Path
 
-from binance_data_collector.api import FactoryProvider, Module
+from binance_data_collector.api import ClassProvider, FactoryProvider, Module
 
 from binance_data_collector.environments import environment
 
 from .app_controller import AppController
 from .app_service import AppService
 from .constants import REPOSITORY_TOKEN
+from .helpers.catalog import Catalog
 from .helpers.currency_pair_manager import CurrencyPairManager
 from .helpers.data_collector import DataCollector
 from .helpers.data_file_manager import DataFileManager
+from .helpers.exchange_info_client import ExchangeInfoClient
+from .helpers.scheduler import Scheduler
 from .helpers.web_socket_manager import WebSocketManager
+from .helpers.worker_pool import DataCollectorCluster
 from .models.currency_pair import CurrencyPair
 from .models.file_mock_repository import FileMockRepository
+from .models.repository import Repository
+from .models.sqlite_repository import SqliteRepository
 
 
-def create_repository() -> FileMockRepository:
-    fmr: FileMockRepository[CurrencyPair] = FileMockRepository[CurrencyPair](
-        path=Path(environment.data_root) / "currency_pairs.json",
-    )
+def create_repository() -> Repository[CurrencyPair]:
+    if environment.repository_backend == "file":
+        fmr: FileMockRepository[CurrencyPair] = FileMockRepository[CurrencyPair](
+            path=Path(environment.data_root) / "currency_pairs.json",
+            indexes=["status", "base", "quote", "symbol"],
+        )
+
+        fmr.load()
+
+        return fmr
+
+    if environment.repository_backend == "sqlite":
+        sr: SqliteRepository[CurrencyPair] = SqliteRepository[CurrencyPair](
+            path=Path(environment.data_root) / "currency_pairs.db",
+            cls=CurrencyPair,
+            table="currency_pairs",
+            indexes=["status", "base", "quote"],
+            # the entities of the file backend, if it was used before
+            import_path=Path(environment.data_root) / "currency_pairs.json",
+        )
 
-    fmr.load()
+        sr.load()
 
-    return fmr
+        return sr
+
+    raise RuntimeError(
+        f"Unsupported repository backend: `{environment.repository_backend}`"
+    )
 
 
 @Module(
@@ -33,12 +59,54 @@ def create_repository() -> FileMockRepository:
             provide=REPOSITORY_TOKEN,
             use_factory=create_repository,
         ),
+        Scheduler,
+        Catalog,
         WebSocketManager,
         DataFileManager,
         DataCollector,
+        ExchangeInfoClient,
         CurrencyPairManager,
         AppService,
     ],
 )
 class AppModule(object):
     pass
+
+
+# collects the symbols assigned to a worker process, has no API
+@Module(
+    providers=[
+        Scheduler,
+        Catalog,
+        WebSocketManager,
+        DataFileManager,
+        DataCollector,
+    ],
+)
+class WorkerModule(object):
+    pass
+
+
+# manages the currency pairs and the API, collection runs in the workers
+@Module(
+    controllers=[AppController],
+    providers=[
+        FactoryProvider(
+            provide=REPOSITORY_TOKEN,
+            use_factory=create_repository,
+        ),
+        Scheduler,
+        # backfilled from the manifests before the workers start, the
+        # workers add the segments they write
+        Catalog,
+        ClassProvider(
+            provide="DataCollector",
+            use_class=DataCollectorCluster,
+        ),
+        ExchangeInfoClient,
+        CurrencyPairManager,
+        AppService,
+    ],
+)
+class ClusterAppModule(object):
+    pass
@@ -1,26 +1,176 @@
 # coding=utf-8
 from __future__ import annotations
 
+import concurrent.futures
 import typing
+from pathlib import Path
 
 from binance_data_collector.api import HTTPException, Inject, Injectable
 
 from .constants import REPOSITORY_TOKEN
-from .helpers.data_collector import DataCollector
+from .helpers.block_index import DataFileReader
+from .helpers.catalog import Catalog
+from .helpers.data_collector import CHANNELS, CollectorMetrics, DataCollector
+from .helpers.data_file_manager import create_codec_for
+from .helpers.order_book import OrderBookView
+from .helpers.record_format import (
+    BinaryRecordEncoder,
+    RecordEncoder,
+    create_encoder,
+)
+from .helpers.segments import (
+    PARTIAL_SUFFIX,
+    SegmentInfo,
+    find_partials,
+)
 from .models.currency_pair import CurrencyPair, CurrencyPairStatus
 from .models.repository import EntityNotFoundException, Repository
 
+# lines are sent in chunks of about this size
+DATA_CHUNK_SIZE: int = 64 * 1024
+
 
 @Injectable()
 class AppService(object):
     def __init__(
         self,
         data_collector: DataCollector,
+        catalog: Catalog,
         repository: Repository[CurrencyPair] = Inject(token=REPOSITORY_TOKEN)
     ) -> None:
         self._data_collector: DataCollector = data_collector
+        self._catalog: Catalog = catalog
         self._repository: Repository[CurrencyPair] = repository
 
+    def get_metrics(self) -> CollectorMetrics:
+        return self._data_collector.get_metrics()
+
+    def get_segments(
+        self,
+        symbol: str | None = None,
+        name: str | None = None,
+        from_ms: int | None = None,
+        to_ms: int | None = None,
+    ) -> list[SegmentInfo]:
+        return self._catalog.find(
+            symbol=symbol,
+            name=name,
+            from_ms=from_ms,
+            to_ms=to_ms,
+        )
+
+    def get_data(
+        self,
+        uuid: str,
+        channel: str,
+        from_ms: int | None = None,
+        to_ms: int | None = None,
+        data_format: str = "json",
+    ) -> typing.Iterator[bytes]:
+        """Stream the recorded data of a channel, one block at a time"""
+
+        currency_pair: CurrencyPair = self.get_currency_pair(uuid=uuid)
+
+        if channel not in CHANNELS:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Channel [{channel}] cannot be found",
+            )
+
+        encoder: RecordEncoder | None = None
+
+        if data_format == BinaryRecordEncoder.name:
+            encoder = create_encoder(
+                name=data_format,
+                channel=channel,
+                tick_size=currency_pair.tick_size,
+                step_size=currency_pair.step_size,
+            )
+
+            if not isinstance(encoder, BinaryRecordEncoder):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Channel [{channel}] has no binary format",
+                )
+
+        # the partials are listed before the catalog is queried, a segment
+        # closed in between is then found twice instead of not at all
+        partials: list[Path] = find_partials(
+            directory=self._catalog.data_root / currency_pair.lower(),
+            name=channel,
+        )
+
+        # closed segments first, then the segment being written
+        paths: list[Path] = [
+            self._catalog.data_root / segment.path
+            for segment in self._catalog.find(
+                symbol=currency_pair.symbol,
+                name=channel,
+                from_ms=from_ms,
+                to_ms=to_ms,
+            )
+        ]
+        paths += [
+            path for path in partials
+            if path.with_name(path.name.removesuffix(PARTIAL_SUFFIX)) not in paths
+        ]
+
+        # checked before the response starts, the rest runs while streaming
+        return self._iter_data(
+            paths=paths,
+            from_ms=from_ms,
+            to_ms=to_ms,
+            encoder=encoder,
+        )
+
+    @staticmethod
+    def _iter_data(
+        paths: list[Path],
+        from_ms: int | None,
+        to_ms: int | None,
+        encoder: RecordEncoder | None,
+    ) -> typing.Iterator[bytes]:
+        chunk: bytearray = bytearray()
+
+        for path in paths:
+            partial: bool = path.name.endswith(PARTIAL_SUFFIX)
+
+            try:
+                reader: DataFileReader = DataFileReader(
+                    path=path,
+                    codec=create_codec_for(path=path),
+                    tail=not partial,
+                )
+            except FileNotFoundError:
+                if not partial:
+                    raise
+
+                # the segment was closed after it was listed
+                path = path.with_name(path.name.removesuffix(PARTIAL_SUFFIX))
+                reader: DataFileReader = DataFileReader(
+                    path=path,
+                    codec=create_codec_for(path=path),
+                )
+
+            if encoder is not None:
+                yield from reader.iter_binary(
+                    encoder=encoder,
+                    from_ms=from_ms,
+                    to_ms=to_ms,
+                )
+
+                continue
+
+            for line in reader.iter_lines(from_ms=from_ms, to_ms=to_ms):
+                chunk += line
+
+                if len(chunk) >= DATA_CHUNK_SIZE:
+                    yield bytes(chunk)
+                    chunk = bytearray()
+
+        if len(chunk) > 0:
+            yield bytes(chunk)
+
     def get_currency_pairs(
         self,
         query: dict[str, typing.Any] | None = None,
@@ -36,6 +186,29 @@ class AppService(object):
                 detail=f"CurrencyPair [{uuid}] cannot be found",
             ) from e
 
+    def get_order_book(self, uuid: str, depth: int) -> OrderBookView:
+        currency_pair: CurrencyPair = self.get_currency_pair(uuid=uuid)
+
+        try:
+            order_book: OrderBookView | None = self._data_collector.get_order_book(
+                currency_pair=currency_pair,
+                depth=depth,
+            )
+        except concurrent.futures.TimeoutError as e:
+            # a worker process which is busy or restarting
+            raise HTTPException(
+                status_code=504,
+                detail=f"Order book of CurrencyPair [{uuid}] timed out",
+            ) from e
+
+        if order_book is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"CurrencyPair [{uuid}] has no order book",
+            )
+
+        return order_book
+
     def start_currency_pair(self, uuid: str) -> None:
         currency_pair: CurrencyPair = self.get_currency_pair(uuid=uuid)
 
@@ -81,3 +254,65 @@ class AppService(object):
         currency_pair.status = CurrencyPairStatus.STOPPED
         self._repository.update(uuid=currency_pair.uuid, item=currency_pair)
         self._data_collector.remove_currency_pair(currency_pair=currency_pair)
+
+    @staticmethod
+    def _check_filter(query: dict[str, typing.Any] | None) -> None:
+        # an empty query matches every currency pair of the exchange
+        if all(value is None for value in (query or {}).values()):
+            raise HTTPException(
+                status_code=400,
+                detail="At least one filter is required",
+            )
+
+    def start_currency_pairs(
+        self,
+        query: dict[str, typing.Any] | None = None,
+    ) -> list[CurrencyPair]:
+        """Start every matching currency pair which is not started yet"""
+
+        self._check_filter(query=query)
+
+        currency_pairs: list[CurrencyPair] = [
+            currency_pair for currency_pair in self._repository.find(query=query)
+            if currency_pair.status in (
+                CurrencyPairStatus.CREATED,
+                CurrencyPairStatus.STOPPED,
+                CurrencyPairStatus.RESTORED,
+            )
+        ]
+
+        for currency_pair in currency_pairs:
+            currency_pair.status = CurrencyPairStatus.ACTIVE
+
+        self._repository.update_many(items=currency_pairs)
+
+        for currency_pair in currency_pairs:
+            self._data_collector.add_currency_pair(currency_pair=currency_pair)
+
+        return currency_pairs
+
+    def stop_currency_pairs(
+        self,
+        query: dict[str, typing.Any] | None = None,
+    ) -> list[CurrencyPair]:
+        """Stop every matching currency pair which is started"""
+
+        self._check_filter(query=query)
+
+        currency_pairs: list[CurrencyPair] = [
+            currency_pair for currency_pair in self._repository.find(query=query)
+            if currency_pair.status in (
+                CurrencyPairStatus.ACTIVE,
+                CurrencyPairStatus.IDLE,
+            )
+        ]
+
+        for currency_pair in currency_pairs:
+            currency_pair.status = CurrencyPairStatus.STOPPED
+
+        self._repository.update_many(items=currency_pairs)
+
+        for currency_pair in currency_pairs:
+            self._data_collector.remove_currency_pair(currency_pair=currency_pair)
+
+        return currency_pairs
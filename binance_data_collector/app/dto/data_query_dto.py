@@ -0,0 +1,12 @@
+# coding=utf-8
+from __future__ import annotations
+
+import pydantic
+
+
+class DataQueryDTO(pydantic.BaseModel):
+    # event times in ms
+    from_ms: int | None = pydantic.Field(default=None, alias="from")
+    to_ms: int | None = pydantic.Field(default=None, alias="to")
+    # JSON lines, or the binary records of trades and depth diffs
+    format: str = pydantic.Field(default="json", regex="^(json|bin)$")
@@ -0,0 +1,78 @@
+# coding=utf-8
+import pydantic
+
+
+class ShardMetricsDTO(pydantic.BaseModel):
+    id: str
+    symbols: int
+    streams: int
+    queued_streams: int
+    pending_requests: int
+    message_count: int
+    message_rate: float
+
+
+class IngestMetricsDTO(pydantic.BaseModel):
+    workers: int
+    capacity: int
+    depth: int
+    enqueued: int
+    processed: int
+    dropped: int
+    paused: bool
+
+
+class FileHandleMetricsDTO(pydantic.BaseModel):
+    capacity: int
+    open: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class WriterMetricsDTO(pydantic.BaseModel):
+    index: int
+    queue_depth: int
+    flushes: int
+    bytes_written: int
+    utilisation: float
+
+
+class DataFileMetricsDTO(pydantic.BaseModel):
+    handles: FileHandleMetricsDTO
+    writers: list[WriterMetricsDTO]
+
+
+class SnapshotMetricsDTO(pydantic.BaseModel):
+    workers: int
+    requests: int
+    failures: int
+    throttled: int
+    used_weight: int
+    weight_budget: int
+    sent_weight: int
+    sent_weight_last: int
+    latency_ms_avg: float
+    latency_ms_max: float
+
+
+class JobMetricsDTO(pydantic.BaseModel):
+    name: str
+    jobs: int
+    runs: int
+    skipped: int
+    failures: int
+    run_time_ms_avg: float
+    run_time_ms_max: float
+    lateness_ms_avg: float
+    lateness_ms_max: float
+
+
+class MetricsResponseDTO(pydantic.BaseModel):
+    shards: list[ShardMetricsDTO]
+    ingest: IngestMetricsDTO
+    files: DataFileMetricsDTO
+    snapshots: SnapshotMetricsDTO
+    skipped_snapshots: int
+    gaps: int
+    jobs: list[JobMetricsDTO]
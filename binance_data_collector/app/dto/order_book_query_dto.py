@@ -0,0 +1,6 @@
+# coding=utf-8
+import pydantic
+
+
+class OrderBookQueryDTO(pydantic.BaseModel):
+    depth: int = pydantic.Field(default=20, ge=1, le=5000)
@@ -0,0 +1,11 @@
+# coding=utf-8
+import pydantic
+
+
+class OrderBookResponseDTO(pydantic.BaseModel):
+    symbol: str
+    synced: bool
+    last_update_id: int | None
+    # price and quantity pairs, best first
+    bids: list[tuple[str, str]]
+    asks: list[tuple[str, str]]
@@ -0,0 +1,21 @@
+# coding=utf-8
+import pydantic
+
+
+class SegmentResponseDTO(pydantic.BaseModel):
+    symbol: str
+    name: str
+    # relative to the data root
+    path: str
+    start_ms: int
+    end_ms: int
+    blocks: int
+    records: int
+    size: int
+    raw_size: int
+    min_time: int
+    max_time: int
+    first_id: int
+    last_id: int
+    sha256: str
+    recovered: bool
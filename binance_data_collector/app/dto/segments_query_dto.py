@@ -0,0 +1,12 @@
+# coding=utf-8
+from __future__ import annotations
+
+import pydantic
+
+
+class SegmentsQueryDTO(pydantic.BaseModel):
+    symbol: str | None = None
+    name: str | None = None
+    # event times in ms
+    from_ms: int | None = pydantic.Field(default=None, alias="from")
+    to_ms: int | None = pydantic.Field(default=None, alias="to")
@@ -0,0 +1,394 @@
+# coding=utf-8
+"""Sidecar block index of the data files.
+
+Every data file `<name>` is written as a sequence of independently
+compressed blocks, `<name>.idx` gets a fixed size entry per block:
+
+    header  4s magic, u8 version, q segment start, q segment end,
+            32s symbol, 32s route name
+    entry   Q offset, I compressed length, I length, I records,
+            q min event time, q max event time, q first id, q last id
+
+Times are exchange event times in ms (local time for snapshots and gaps),
+the segment bounds are in ms since the epoch as well,
+ids are update ids of depth diffs and trade ids of trades, -1 if unknown.
+The entry is appended after its block, so a crash can leave blocks past the
+last entry, those are read as a single unindexed block.
+"""
+from __future__ import annotations
+
+__all__ = [
+    "BlockIndex",
+    "BlockInfo",
+    "BlockStats",
+    "DataFileReader",
+    "get_index_path",
+    "load_index",
+    "pack_index_header",
+    "read_index",
+]
+
+import bisect
+import dataclasses
+import itertools
+import struct
+import typing
+from pathlib import Path
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+from .frames import scan_frame_info
+from .record_format import RecordEncoder, iter_records
+
+if typing.TYPE_CHECKING:
+    from .data_file_manager import Codec
+
+INDEX_MAGIC: bytes = b"BDCI"
+INDEX_VERSION: int = 2
+INDEX_EXTENSION: str = ".idx"
+
+INDEX_HEADER: struct.Struct = struct.Struct("<4sBqq32s32s")
+ENTRY: struct.Struct = struct.Struct("<QIIIqqqq")
+
+UNKNOWN: int = -1
+# binary data files start with a file header record
+BINARY_PREFIX: bytes = b"\x00BDCR"
+
+
+def get_index_path(path: Path) -> Path:
+    return path.with_name(path.name + INDEX_EXTENSION)
+
+
+def pack_index_header(
+    symbol: str = "",
+    name: str = "",
+    start_ms: int = UNKNOWN,
+    end_ms: int = UNKNOWN,
+) -> bytes:
+    return INDEX_HEADER.pack(
+        INDEX_MAGIC,
+        INDEX_VERSION,
+        start_ms,
+        end_ms,
+        symbol.encode("ascii"),
+        name.encode("ascii"),
+    )
+
+
+@dataclasses.dataclass(frozen=True)
+class BlockInfo(object):
+    offset: int
+    # compressed length in the data file
+    length: int
+    # uncompressed length
+    size: int
+    records: int
+    min_time: int = UNKNOWN
+    max_time: int = UNKNOWN
+    first_id: int = UNKNOWN
+    last_id: int = UNKNOWN
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.length
+
+    def pack(self) -> bytes:
+        return ENTRY.pack(
+            self.offset,
+            self.length,
+            self.size,
+            self.records,
+            self.min_time,
+            self.max_time,
+            self.first_id,
+            self.last_id,
+        )
+
+
+class BlockStats(object):
+    """Time and id range of the records of the block being buffered"""
+
+    def __init__(self) -> None:
+        self.records: int = 0
+        self.min_time: int = UNKNOWN
+        self.max_time: int = UNKNOWN
+        self.first_id: int = UNKNOWN
+        self.last_id: int = UNKNOWN
+
+    def add(
+        self,
+        time_ms: int | None,
+        first_id: int | None,
+        last_id: int | None,
+    ) -> None:
+        self.records += 1
+
+        if time_ms is not None:
+            if self.min_time == UNKNOWN or time_ms < self.min_time:
+                self.min_time = time_ms
+
+            if time_ms > self.max_time:
+                self.max_time = time_ms
+
+        if first_id is not None and self.first_id == UNKNOWN:
+            self.first_id = first_id
+
+        if last_id is not None:
+            self.last_id = last_id
+
+    def merge(self, info: BlockInfo) -> None:
+        """Add the records of a whole block"""
+
+        self.records += info.records
+
+        if info.min_time != UNKNOWN and (
+            self.min_time == UNKNOWN or info.min_time < self.min_time
+        ):
+            self.min_time = info.min_time
+
+        if info.max_time > self.max_time:
+            self.max_time = info.max_time
+
+        if info.first_id != UNKNOWN and self.first_id == UNKNOWN:
+            self.first_id = info.first_id
+
+        if info.last_id != UNKNOWN:
+            self.last_id = info.last_id
+
+    def to_info(self, offset: int, length: int, size: int) -> BlockInfo:
+        return BlockInfo(
+            offset=offset,
+            length=length,
+            size=size,
+            records=self.records,
+            min_time=self.min_time,
+            max_time=self.max_time,
+            first_id=self.first_id,
+            last_id=self.last_id,
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class BlockIndex(object):
+    symbol: str
+    name: str
+    # bounds of the segment of the data file
+    start_ms: int
+    end_ms: int
+    blocks: list[BlockInfo]
+
+
+def load_index(index_path: Path) -> BlockIndex:
+    data: bytes = index_path.read_bytes()
+
+    if len(data) < INDEX_HEADER.size:
+        return BlockIndex(
+            symbol="",
+            name="",
+            start_ms=UNKNOWN,
+            end_ms=UNKNOWN,
+            blocks=[],
+        )
+
+    magic, version, start_ms, end_ms, symbol, name = \
+        INDEX_HEADER.unpack_from(data, 0)
+
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        raise ValueError(f"Unsupported index `{index_path}` (version {version})")
+
+    # a torn last entry is ignored
+    count: int = (len(data) - INDEX_HEADER.size) // ENTRY.size
+
+    return BlockIndex(
+        symbol=symbol.rstrip(b"\x00").decode("ascii"),
+        name=name.rstrip(b"\x00").decode("ascii"),
+        start_ms=start_ms,
+        end_ms=end_ms,
+        blocks=[
+            BlockInfo(*ENTRY.unpack_from(data, INDEX_HEADER.size + i * ENTRY.size))
+            for i in range(count)
+        ],
+    )
+
+
+def read_index(path: Path) -> list[BlockInfo]:
+    """Entries of the index of a data file, empty if it has none"""
+
+    index_path: Path = get_index_path(path=path)
+
+    if not index_path.exists():
+        return []
+
+    return load_index(index_path=index_path).blocks
+
+
+class DataFileReader(object):
+    """Read the records of a time range of a data file.
+
+    The blocks of the range are found by binary search over the index, so
+    only those are read and decompressed. Event times are nearly sorted,
+    the search runs over their running maximum and minimum.
+
+    Without `tail` the data past the last index entry is ignored, as the
+    block being written to a partial file may be incomplete.
+    """
+
+    def __init__(self, path: Path, codec: Codec, tail: bool = True) -> None:
+        self._path: Path = path
+        self._codec: Codec = codec
+
+        self._blocks: list[BlockInfo] = read_index(path=path)
+
+        size: int = path.stat().st_size
+        end: int = self._blocks[-1].end if len(self._blocks) > 0 else 0
+
+        if not tail:
+            self._blocks = [block for block in self._blocks if block.end <= size]
+        elif end < size:
+            self._blocks.append(
+                BlockInfo(offset=end, length=size - end, size=UNKNOWN, records=UNKNOWN)
+            )
+
+        # unknown times never allow to skip a block
+        self._max_times: list[float] = list(itertools.accumulate(
+            (float("inf") if b.max_time == UNKNOWN else b.max_time for b in self._blocks),
+            max,
+        ))
+        self._min_times: list[float] = list(itertools.accumulate(
+            (
+                float("-inf") if b.min_time == UNKNOWN else b.min_time
+                for b in reversed(self._blocks)
+            ),
+            min,
+        ))[::-1]
+
+    @property
+    def blocks(self) -> list[BlockInfo]:
+        return self._blocks
+
+    def find_blocks(
+        self,
+        from_ms: int | None = None,
+        to_ms: int | None = None,
+    ) -> list[BlockInfo]:
+        """Blocks which may hold records of [from_ms, to_ms]"""
+
+        start: int = 0
+        stop: int = len(self._blocks)
+
+        if from_ms is not None:
+            start = bisect.bisect_left(self._max_times, from_ms)
+
+        if to_ms is not None:
+            stop = bisect.bisect_right(self._min_times, to_ms)
+
+        return self._blocks[start:stop]
+
+    def _iter_blocks(
+        self,
+        from_ms: int | None = None,
+        to_ms: int | None = None,
+    ) -> typing.Iterator[tuple[BlockInfo, bytes]]:
+        with open(self._path, mode="rb") as f:
+            for block in self.find_blocks(from_ms=from_ms, to_ms=to_ms):
+                f.seek(block.offset)
+
+                yield block, self._codec.decompress(f.read(block.length))
+
+    def iter_blocks(
+        self,
+        from_ms: int | None = None,
+        to_ms: int | None = None,
+    ) -> typing.Iterator[bytes]:
+        """Decompressed data of the blocks of the range, one at a time"""
+
+        for _, data in self._iter_blocks(from_ms=from_ms, to_ms=to_ms):
+            yield data
+
+    def iter_lines(
+        self,
+        from_ms: int | None = None,
+        to_ms: int | None = None,
+    ) -> typing.Iterator[bytes]:
+        """JSON lines of the records of the range, binary data is decoded"""
+
+        lower: float = float("-inf") if from_ms is None else from_ms
+        upper: float = float("inf") if to_ms is None else to_ms
+
+        for data in self.iter_blocks(from_ms=from_ms, to_ms=to_ms):
+            yield from self._iter_block_lines(data=data, lower=lower, upper=upper)
+
+    def iter_binary(
+        self,
+        encoder: RecordEncoder,
+        from_ms: int | None = None,
+        to_ms: int | None = None,
+    ) -> typing.Iterator[bytes]:
+        """Binary records of the range, one chunk per block.
+
+        Binary blocks within the range are passed on as stored, the records
+        of any other block are encoded by `encoder`. Every chunk starts with
+        a file header, like the blocks of a binary file.
+        """
+
+        lower: float = float("-inf") if from_ms is None else from_ms
+        upper: float = float("inf") if to_ms is None else to_ms
+
+        for block, data in self._iter_blocks(from_ms=from_ms, to_ms=to_ms):
+            if (
+                data.startswith(BINARY_PREFIX)
+                and block.min_time != UNKNOWN
+                and lower <= block.min_time
+                and block.max_time <= upper
+            ):
+                yield data
+
+                continue
+
+            encoder.reset()
+
+            chunk: bytearray = bytearray()
+            for line in self._iter_block_lines(data=data, lower=lower, upper=upper):
+                chunk += encoder.encode_raw(data=line[:-1])
+
+            if len(chunk) > 0:
+                yield bytes(chunk)
+
+    @classmethod
+    def _iter_block_lines(
+        cls,
+        data: bytes,
+        lower: float,
+        upper: float,
+    ) -> typing.Iterator[bytes]:
+        if data.startswith(BINARY_PREFIX):
+            yield from cls._iter_binary_lines(data=data, lower=lower, upper=upper)
+
+            return
+
+        for line in data.splitlines():
+            if len(line) == 0:
+                continue
+
+            time_ms: int | None = scan_frame_info(payload=line)[0]
+
+            if time_ms is None or lower <= time_ms <= upper:
+                yield line + b'\n'
+
+    @staticmethod
+    def _iter_binary_lines(
+        data: bytes,
+        lower: float,
+        upper: float,
+    ) -> typing.Iterator[bytes]:
+        for record in iter_records(data=data):
+            if record.raw is not None:
+                time_ms: int | None = scan_frame_info(payload=record.raw)[0]
+
+                if time_ms is None or lower <= time_ms <= upper:
+                    yield record.raw + b'\n'
+            elif lower <= record.event_time <= upper:
+                yield json.dumps(record.frame).encode("utf8") + b'\n'
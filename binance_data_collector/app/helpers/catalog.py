@@ -0,0 +1,240 @@
+# coding=utf-8
+from __future__ import annotations
+
+__all__ = ["CATALOG_NAME", "Catalog"]
+
+import dataclasses
+import sqlite3
+import threading
+import typing
+from pathlib import Path
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+from binance_data_collector.api import Injectable
+from binance_data_collector.api.lifecycle import OnDestroy, OnInit
+from binance_data_collector.environments import environment
+from binance_data_collector.log import LoggingMixin
+
+from .block_index import UNKNOWN
+from .segments import MANIFEST_NAME, SegmentInfo
+
+CATALOG_NAME: str = "catalog.db"
+
+COLUMNS: list[str] = [field.name for field in dataclasses.fields(SegmentInfo)]
+
+
+@Injectable()
+class Catalog(LoggingMixin, OnInit, OnDestroy):
+    """SQLite catalog of the closed data file segments.
+
+    Every segment is a row with its zone map (time and id range), so the
+    segments of a route overlapping a time range are found by an index
+    lookup instead of listing and opening files. The worker processes of a
+    cluster write to the same database, SQLite serializes them. The
+    manifests of the data directories hold the same entries, `rebuild`
+    restores the catalog from them.
+
+    The database is opened on creation, the data files recovered while the
+    other providers are created are added before `on_init`. `on_init`
+    backfills the entries of the manifests which could not be added, it
+    only reads the lines appended since the last backfill (the read offset
+    of every manifest is kept in the database). The worker processes of a
+    cluster leave the backfill to the parent.
+    """
+
+    def __init__(self) -> None:
+        self._data_root: Path = Path(environment.data_root).resolve()
+        self._path: Path = self._data_root / CATALOG_NAME
+
+        self._connection: sqlite3.Connection | None = None
+        self._lock: threading.Lock = threading.Lock()
+
+        self.open()
+
+    @property
+    def data_root(self) -> Path:
+        return self._data_root
+
+    def open(self) -> None:
+        with self._lock:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+
+            self._connection = sqlite3.connect(
+                database=self._path,
+                # wait for the other writing processes
+                timeout=30,
+                check_same_thread=False,
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS segments ("
+                    "path TEXT PRIMARY KEY, "
+                    "symbol TEXT NOT NULL, "
+                    "name TEXT NOT NULL, "
+                    "start_ms INTEGER NOT NULL, "
+                    "end_ms INTEGER NOT NULL, "
+                    "blocks INTEGER NOT NULL, "
+                    "records INTEGER NOT NULL, "
+                    "size INTEGER NOT NULL, "
+                    "raw_size INTEGER NOT NULL, "
+                    "min_time INTEGER NOT NULL, "
+                    "max_time INTEGER NOT NULL, "
+                    "first_id INTEGER NOT NULL, "
+                    "last_id INTEGER NOT NULL, "
+                    "sha256 TEXT NOT NULL, "
+                    "recovered INTEGER NOT NULL)"
+                )
+                self._connection.execute(
+                    "CREATE INDEX IF NOT EXISTS ix_segments_route "
+                    "ON segments (symbol, name, min_time)"
+                )
+                # bytes of the manifests which are in the catalog
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS manifests ("
+                    "path TEXT PRIMARY KEY, "
+                    "offset INTEGER NOT NULL)"
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def on_init(self) -> None:
+        if not environment.catalog_backfill:
+            return
+
+        count: int = self.rebuild(full=False)
+
+        self.log.info(f"Added {count} new manifest entries to the catalog")
+
+    def on_destroy(self) -> None:
+        self.close()
+
+    def add(self, info: SegmentInfo) -> None:
+        self.add_many(infos=[info])
+
+    def add_many(
+        self,
+        infos: list[SegmentInfo],
+        manifest: tuple[str, int] | None = None,
+    ) -> None:
+        """Insert or replace the entries of segments, in one transaction.
+
+        `manifest` is the path and the new read offset of the manifest the
+        entries were read from.
+        """
+
+        placeholders: str = ", ".join("?" for _ in COLUMNS)
+
+        with self._lock:
+            with self._connection:
+                self._connection.executemany(
+                    f"INSERT OR REPLACE INTO segments ({', '.join(COLUMNS)}) "
+                    f"VALUES ({placeholders})",
+                    [dataclasses.astuple(info) for info in infos],
+                )
+
+                if manifest is not None:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO manifests (path, offset) "
+                        "VALUES (?, ?)",
+                        manifest,
+                    )
+
+    def _get_offset(self, path: str) -> int:
+        with self._lock:
+            row: tuple[int] | None = self._connection.execute(
+                "SELECT offset FROM manifests WHERE path = ?",
+                (path,),
+            ).fetchone()
+
+        return 0 if row is None else row[0]
+
+    def find(
+        self,
+        symbol: str | None = None,
+        name: str | None = None,
+        from_ms: int | None = None,
+        to_ms: int | None = None,
+    ) -> list[SegmentInfo]:
+        """Segments which may hold records of [from_ms, to_ms]"""
+
+        conditions: list[str] = []
+        parameters: list[typing.Any] = []
+
+        if symbol is not None:
+            conditions.append("symbol = ?")
+            parameters.append(symbol.lower())
+
+        if name is not None:
+            conditions.append("name = ?")
+            parameters.append(name)
+
+        # segments without event times never allow to be skipped
+        if to_ms is not None:
+            conditions.append("(min_time = ? OR min_time <= ?)")
+            parameters.extend((UNKNOWN, to_ms))
+
+        if from_ms is not None:
+            conditions.append("(max_time = ? OR max_time >= ?)")
+            parameters.extend((UNKNOWN, from_ms))
+
+        where: str = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+
+        with self._lock:
+            rows: list[tuple] = self._connection.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM segments {where}"
+                f"ORDER BY symbol, name, start_ms, min_time",
+                parameters,
+            ).fetchall()
+
+        return [SegmentInfo(*row[:-1], recovered=bool(row[-1])) for row in rows]
+
+    def rebuild(self, full: bool = True) -> int:
+        """Add the entries of the manifests under the data root.
+
+        Only the lines appended since the last call are read unless `full`,
+        returns the number of entries read.
+        """
+
+        count: int = 0
+
+        for manifest in sorted(self._data_root.glob(f"*/{MANIFEST_NAME}")):
+            key: str = manifest.relative_to(self._data_root).as_posix()
+            offset: int = 0 if full else self._get_offset(path=key)
+
+            with open(manifest, mode="rb") as f:
+                # replaced by a shorter one, e.g. restored from a backup
+                if f.seek(0, 2) < offset:
+                    offset = 0
+
+                f.seek(offset)
+                data: bytes = f.read()
+
+            # a torn last line is read again once it is complete
+            end: int = data.rfind(b'\n') + 1
+
+            if end == 0:
+                continue
+
+            infos: list[SegmentInfo] = []
+
+            for line in data[:end].splitlines():
+                try:
+                    infos.append(SegmentInfo(**json.loads(line)))
+                except (ValueError, TypeError):
+                    self.log.warning(f"Skipped a broken entry of `{manifest}`")
+
+            self.add_many(infos=infos, manifest=(key, offset + end))
+            count += len(infos)
+
+        return count
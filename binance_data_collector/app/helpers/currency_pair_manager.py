@@ -5,12 +5,16 @@ __all__ = ["CurrencyPairManager"]
 
 import datetime
 import threading
-import time
 
 from binance_data_collector.api import Inject, Injectable
 from binance_data_collector.api.lifecycle import OnDestroy, OnInit
 from binance_data_collector.app.constants import REPOSITORY_TOKEN, TZ
 from binance_data_collector.app.helpers.data_collector import DataCollector
+from binance_data_collector.app.helpers.exchange_info_client import (
+    ExchangeInfoClient,
+    ExchangeInfoDelta,
+)
+from binance_data_collector.app.helpers.scheduler import Job, Scheduler
 from binance_data_collector.app.models.repository import Repository
 from binance_data_collector.environments import environment
 from binance_data_collector.log import LoggingMixin
@@ -19,15 +23,17 @@ from binance_data_collector.app.models.currency_pair import CurrencyPair, Curren
 
 
 @Injectable()
-class CurrencyPairManager(threading.Thread, LoggingMixin, OnInit, OnDestroy):
+class CurrencyPairManager(LoggingMixin, OnInit, OnDestroy):
     def __init__(
         self,
         data_collector: DataCollector,
+        exchange_info_client: ExchangeInfoClient,
+        scheduler: Scheduler,
         repository: Repository[CurrencyPair] = Inject(token=REPOSITORY_TOKEN),
     ) -> None:
-        super().__init__()
-
+        self._scheduler: Scheduler = scheduler
         self._data_collector: DataCollector = data_collector
+        self._exchange_info_client: ExchangeInfoClient = exchange_info_client
         self._repository: Repository[CurrencyPair] = repository
 
         # cache currency pairs to prevent constant DB query
@@ -37,19 +43,18 @@ class CurrencyPairManager(threading.Thread, LoggingMixin, OnInit, OnDestroy):
         }
 
         active: list[CurrencyPair] = [
-            cp for cp in self._currency_pairs.values()
-            if (
-                cp.status == CurrencyPairStatus.ACTIVE
-                or
-                cp.status == CurrencyPairStatus.IDLE
-            )
+            *repository.find(query={"status": CurrencyPairStatus.ACTIVE}),
+            *repository.find(query={"status": CurrencyPairStatus.IDLE}),
         ]
 
         # resubscribe to all active streams
         for cp in active:
             self._data_collector.add_currency_pair(currency_pair=cp)
 
-        self._stopped: bool = False
+        self._jobs: list[Job] = []
+        # the refresh and the idle check run on different scheduler workers
+        # and both update the cached pairs
+        self._lock: threading.Lock = threading.Lock()
 
     def _is_idle(self, currency_pair: CurrencyPair) -> bool:
         last_message_dt: datetime.datetime = \
@@ -65,68 +70,127 @@ class CurrencyPairManager(threading.Thread, LoggingMixin, OnInit, OnDestroy):
 
     def _refresh(self) -> None:
         try:
-            # use symbol dict to allow O(1) lookup
-            new_currency_pairs: dict[str, CurrencyPair] = {
-                cp.symbol: cp
-                for cp in self._data_collector.query_currency_pairs()
-            }
+            delta: ExchangeInfoDelta | None = \
+                self._exchange_info_client.refresh()
         except Exception as e:
             self.log.exception("Could not query currency pairs", exc_info=e)
-        else:
-            for key, value in self._currency_pairs.items():
-                cp: CurrencyPair | None = new_currency_pairs.get(key, None)
 
-                if cp is None:
-                    value.status = CurrencyPairStatus.ARCHIVED
-                    self._repository.update(uuid=value.uuid, item=value)
-                    self._data_collector.remove_currency_pair(
-                        currency_pair=value,
-                    )
-                elif self._is_idle(currency_pair=value):
-                    value.status = CurrencyPairStatus.IDLE
-                    self._repository.update(uuid=value.uuid, item=value)
+            return
+
+        # the symbols did not change since the last refresh
+        if delta is None:
+            return
+
+        # a full refresh is persisted at once, a failed one is reported
+        # again by the next refresh
+        with self._lock:
+            with self._repository.batch():
+                self._apply(delta=delta)
 
-            for key, value in new_currency_pairs.items():
-                cp: CurrencyPair | None = self._currency_pairs.get(key, None)
+            self._exchange_info_client.acknowledge(delta=delta)
 
-                if cp is None:
-                    self._repository.create(item=value)
-                    self._currency_pairs[key] = value
-                elif cp.status == CurrencyPairStatus.ARCHIVED:
-                    cp.status = CurrencyPairStatus.RESTORED
-                    self._repository.update(uuid=cp.uuid, item=cp)
+    def _apply(self, delta: ExchangeInfoDelta) -> None:
+        removed: list[str] = delta.removed
 
-    def run(self) -> None:
-        sleep_duration_s: int = 5
+        if delta.initial:
+            removed = [
+                key for key in self._currency_pairs.keys()
+                if key not in delta.symbols
+            ]
 
-        refresh_period_s: int = 60
-        refresh_counter_start: int = refresh_period_s // sleep_duration_s
+        archived: list[CurrencyPair] = []
 
-        snapshot_period_s: int = environment.snapshot_period_s
-        snapshot_counter_start = snapshot_period_s // sleep_duration_s
+        for key in removed:
+            value: CurrencyPair | None = self._currency_pairs.get(key, None)
 
-        refresh_counter: int = 0
-        snapshot_counter: int = 0
+            if value is None or value.status == CurrencyPairStatus.ARCHIVED:
+                continue
 
-        while not self._stopped:
-            if refresh_counter <= 0:
-                self._refresh()
+            value.status = CurrencyPairStatus.ARCHIVED
+            archived.append(value)
 
-                refresh_counter = refresh_counter_start
+        created: list[CurrencyPair] = []
+        restored: list[CurrencyPair] = []
 
-            if snapshot_counter <= 0:
-                self._data_collector.create_snapshot()
+        for info in delta.added:
+            cp: CurrencyPair | None = self._currency_pairs.get(info.symbol, None)
 
-                snapshot_counter = snapshot_counter_start
+            if cp is None:
+                created.append(
+                    CurrencyPair(
+                        base=info.base,
+                        quote=info.quote,
+                        tick_size=info.tick_size,
+                        step_size=info.step_size,
+                    ),
+                )
+            elif cp.status == CurrencyPairStatus.ARCHIVED:
+                cp.status = CurrencyPairStatus.RESTORED
+                restored.append(cp)
 
-            refresh_counter -= 1
-            snapshot_counter -= 1
+        restored_symbols: set[str] = {cp.symbol for cp in restored}
+
+        # the filters are needed to encode binary data files
+        changed: list[CurrencyPair] = [
+            cp for key, cp in self._currency_pairs.items()
+            if key in delta.symbols
+            and key not in restored_symbols
+            and (
+                cp.tick_size != delta.symbols[key].tick_size
+                or
+                cp.step_size != delta.symbols[key].step_size
+            )
+        ]
 
-            time.sleep(sleep_duration_s)
+        for cp in restored + changed:
+            cp.tick_size = delta.symbols[cp.symbol].tick_size
+            cp.step_size = delta.symbols[cp.symbol].step_size
+
+        self._repository.create_many(items=created)
+        self._repository.update_many(items=archived + restored + changed)
+
+        for cp in created:
+            self._currency_pairs[cp.symbol] = cp
+
+        for cp in archived:
+            self._data_collector.remove_currency_pair(currency_pair=cp)
+
+        # the collector may hold a copy of the pair (a worker process)
+        for cp in changed:
+            self._data_collector.update_currency_pair(currency_pair=cp)
+
+    def _check_idle(self) -> None:
+        with self._lock:
+            idle: list[CurrencyPair] = [
+                value for value in self._currency_pairs.values()
+                if (
+                    value.status != CurrencyPairStatus.IDLE
+                    and
+                    self._is_idle(currency_pair=value)
+                )
+            ]
+
+            for value in idle:
+                value.status = CurrencyPairStatus.IDLE
+
+            self._repository.update_many(items=idle)
 
     def on_init(self) -> None:
-        self.start()
+        # snapshots are scheduled per symbol by the data collector
+        self._jobs = [
+            self._scheduler.call_every(
+                name="exchange_info_refresh",
+                period_s=environment.refresh_period_s,
+                callback=self._refresh,
+            ),
+            self._scheduler.call_every(
+                name="idle_check",
+                period_s=environment.idle_check_period_s,
+                callback=self._check_idle,
+                delay_s=environment.idle_check_period_s,
+            ),
+        ]
 
     def on_destroy(self) -> None:
-        self._stopped = True
-        self.join()
+        for job in self._jobs:
+            self._scheduler.cancel(job=job)
@@ -1,24 +1,37 @@
 # coding=utf-8
 from __future__ import annotations
 
-__all__ = ["DataCollector"]
+__all__ = ["CHANNELS", "DataCollector", "CollectorMetrics", "ShardMetrics"]
 
 import dataclasses
 import datetime
+import functools
 import threading
 import time
 import typing
+import zlib
 
-import requests
+try:
+    import ujson as json
+except ImportError:
+    import json
 
 from binance_data_collector.api import Injectable
-from binance_data_collector.api.lifecycle import OnDestroy
+from binance_data_collector.api.lifecycle import OnDestroy, OnInit
+from binance_data_collector.environments import environment
 from binance_data_collector.log import LoggingMixin
 from binance_data_collector.rxpy import Subscription
 
-from binance_data_collector.app.models.currency_pair import CurrencyPair
+from binance_data_collector.app.models.currency_pair import CurrencyPair, CurrencyPairStatus
 
-from .data_file_manager import DataFileManager
+from .data_file_manager import DataFile, DataFileManager, DataFileMetrics
+from .ingest_queue import DropPolicy, IngestQueue, IngestQueueMetrics
+from .frames import scan_update_ids
+from .metrics import RateCounter
+from .order_book import OrderBook, OrderBookView
+from .snapshot_fetcher import SnapshotFetcher, SnapshotMetrics
+from .scheduler import Job, JobMetrics, Scheduler
+from .subscription_scheduler import SubscriptionScheduler
 from .web_socket_manager import (
     WebSocketConnection,
     WebSocketEvent,
@@ -30,80 +43,134 @@ from ..constants import TZ
 
 lock: threading.Lock = threading.Lock()
 
+STREAMS: tuple[str, ...] = ("trade", "depth@100ms")
+CHANNELS: list[str] = ["trade", "depth", "snapshot", "gap"]
+
 
 @dataclasses.dataclass()
 class CurrencyPairInfo(object):
     value: CurrencyPair
+    shard_id: str
     last_message_dt: datetime.datetime | None = None
+    # last `u` of the depth diff chain, None until the first diff
+    last_update_id: int | None = None
+    # `lastUpdateId` of the last snapshot
+    snapshot_update_id: int | None = None
+
+
+@dataclasses.dataclass()
+class WebSocketShard(object):
+    """A single connection carrying the streams of a subset of the symbols"""
+
+    connection: WebSocketConnection
+    scheduler: SubscriptionScheduler
+    symbols: set[str] = dataclasses.field(default_factory=set)
+    subscriptions: list[Subscription] = dataclasses.field(default_factory=list)
+    messages: RateCounter = dataclasses.field(default_factory=RateCounter)
+
+    @property
+    def id(self) -> str:
+        return self.connection.id
+
+
+@dataclasses.dataclass(frozen=True)
+class ShardMetrics(object):
+    id: str
+    symbols: int
+    streams: int
+    queued_streams: int
+    pending_requests: int
+    message_count: int
+    message_rate: float
+
+
+@dataclasses.dataclass(frozen=True)
+class CollectorMetrics(object):
+    shards: list[ShardMetrics]
+    ingest: IngestQueueMetrics
+    files: DataFileMetrics
+    snapshots: SnapshotMetrics
+    skipped_snapshots: int
+    gaps: int
+    jobs: list[JobMetrics]
 
 
 @Injectable()
-class DataCollector(LoggingMixin, OnDestroy):
+class DataCollector(LoggingMixin, OnInit, OnDestroy):
     def __init__(
         self,
         data_file_manager: DataFileManager,
         web_socket_manager: WebSocketManager,
+        scheduler: Scheduler,
     ) -> None:
+        self._scheduler: Scheduler = scheduler
         self._data_file_manager: DataFileManager = data_file_manager
         self._web_socket_manager: WebSocketManager = web_socket_manager
 
         self._currency_pairs: dict[str, CurrencyPairInfo] = {}
+        self._order_books: dict[str, OrderBook] = {}
 
-        self._next_id: int = 1
-        self._pending_subscribe: dict[int, CurrencyPair] = {}
-        self._pending_unsubscribe: dict[int, CurrencyPair] = {}
+        self._shards: dict[str, WebSocketShard] = {}
 
-        self._connection: typing.Optional[WebSocketConnection] = None
+        self._gaps: int = 0
+        # targeted snapshots run off the ingest path
+        self._snapshot_fetcher: SnapshotFetcher = SnapshotFetcher(
+            workers=environment.snapshot_workers,
+            weight_budget=environment.snapshot_weight_budget,
+            weight_share=environment.snapshot_weight_budget // max(1, environment.workers),
+        )
+        self._snapshots_in_flight: set[str] = set()
+        # requested again while in flight, refetched once released
+        self._snapshots_requested: set[str] = set()
+        self._snapshot_lock: threading.Lock = threading.Lock()
 
-        self._subscriptions: list[Subscription] = []
+        # every symbol is snapshotted at its own phase of the period
+        self._snapshot_jobs: dict[str, Job] = {}
+        self._skipped_snapshots: int = 0
+
+        self._jobs: list[Job] = []
+
+        self._connections: int = max(1, environment.websocket_connections)
+        self._symbols_per_shard: int = max(
+            1, environment.streams_per_connection // len(STREAMS),
+        )
+
+        # keep disk writes off the reactor thread
+        self._ingest_queue: IngestQueue[WebSocketMessage] = IngestQueue(
+            handler=self._handle_message,
+            workers=environment.ingest_workers,
+            capacity=environment.ingest_queue_size,
+            policy=DropPolicy(environment.ingest_drop_policy),
+        )
+        self._ingest_queue.pressure.subscribe(
+            on_next=lambda paused: self._web_socket_manager.set_paused(
+                paused=paused,
+            ),
+        )
 
     @property
     def connected(self) -> bool:
-        return self._connection is not None
+        return len(self._shards) > 0
 
     def _is_collecting(self, currency_pair: CurrencyPair) -> bool:
         with lock:
             symbol: str = currency_pair.symbol
             return self._currency_pairs.get(symbol, None) is not None
 
-    def _subscribe_symbol(self, symbol: str) -> None:
-        self._connection.send_message(
-            message={
-                "method": "SUBSCRIBE",
-                "params":
-                    [
-                        f"{symbol}@trade",
-                        f"{symbol}@depth@100ms"
-                    ],
-                "id": self._next_id
-            }
-        )
-
-        self._next_id += 1
-
-    def _unsubscribe_symbol(self, symbol: str) -> None:
-        self._connection.send_message(
-            message={
-                "method": "UNSUBSCRIBE",
-                "params":
-                    [
-                        f"{symbol}@trade",
-                        f"{symbol}@depth@100ms"
-                    ],
-                "id": self._next_id
-            }
-        )
+    def _get_streams_for(self, symbol: str) -> list[str]:
+        return [f"{symbol}@{stream}" for stream in STREAMS]
 
-        self._next_id += 1
-
-    def _resubscribe(self) -> None:
+    def _resubscribe(self, shard: WebSocketShard) -> None:
+        # under the lock, a pair added meanwhile is either in the streams or
+        # subscribed once connected (requests before are dropped)
         with lock:
-            currency_pairs: list[CurrencyPair] = [
-                cp.value for cp in self._currency_pairs.values()
+            streams: list[str] = [
+                stream
+                for symbol in shard.symbols
+                for stream in self._get_streams_for(symbol=symbol)
             ]
 
-            for currency_pair in currency_pairs[1:]:
-                self._subscribe_symbol(symbol=currency_pair.symbol)
+            shard.scheduler.connect(streams=streams)
 
     def _handle_message(self, message: WebSocketMessage) -> None:
         name: str = message.channel.split("@")[0]
@@ -118,139 +185,410 @@ class DataCollector(LoggingMixin, OnDestroy):
 
         self._currency_pairs[symbol].last_message_dt = datetime.datetime.now(tz=TZ)
 
+        # the routes are opened with the pair, none is left once removed
+        data_file: DataFile | None = self._data_file_manager.route(
+            symbol=symbol,
+            name=name,
+        )
+
+        if data_file is None:
+            return
+
         try:
-            self._data_file_manager.get_file(
-                currency_pair=currency_pair,
-                name=name,
-            ).write_data(
-                data=message.data,
-            )
+            if message.raw is not None:
+                data_file.write_raw(data=message.raw)
+            else:
+                data_file.write_data(data=message.data)
         except Exception as e:
             self.log.exception(f"Could not save message [{message}]", exc_info=e)
 
-    def _handle_event(self, event: WebSocketEvent) -> None:
+        if name == "depth":
+            # buffer the diff before a snapshot may be requested
+            self._update_order_book(symbol=symbol, message=message)
+            self._check_update_ids(currency_pair=currency_pair, message=message)
+
+    def _check_update_ids(
+        self,
+        currency_pair: CurrencyPair,
+        message: WebSocketMessage,
+    ) -> None:
+        """Follow the `U`/`u` chain of the depth diffs of the symbol.
+
+        Messages of a symbol are handled by a single ingest worker, so the
+        chain needs no lock. A broken chain is logged and triggers a
+        snapshot of the symbol.
+        """
+
+        if message.raw is not None:
+            update_ids: tuple[int, int] | None = scan_update_ids(
+                payload=message.raw,
+            )
+        else:
+            data: dict[str, typing.Any] = message.data["data"]
+            update_ids: tuple[int, int] | None = (data["U"], data["u"])
+
+        info: CurrencyPairInfo | None = self._currency_pairs.get(
+            currency_pair.symbol,
+            None,
+        )
+
+        if update_ids is None or info is None:
+            return
+
+        first, last = update_ids
+        previous: int | None = info.last_update_id
+
+        if previous is not None and last <= previous:
+            return
+
+        info.last_update_id = last
+
+        if previous is None:
+            # the diffs are useless without a snapshot to apply them on
+            self._request_snapshot(currency_pair=currency_pair)
+        elif first != previous + 1:
+            self._gaps += 1
+
+            self.log.warning(
+                f"Gap in depth diffs of [{currency_pair.symbol}] "
+                f"(expected: {previous + 1}, got: {first})"
+            )
+
+            data_file: DataFile | None = self._data_file_manager.route(
+                symbol=currency_pair.symbol,
+                name="gap",
+            )
+
+            try:
+                if data_file is not None:
+                    data_file.write_data(
+                        data={
+                            "symbol": currency_pair.symbol,
+                            "expected": previous + 1,
+                            "received": first,
+                            "time": time.time_ns(),
+                        },
+                    )
+            except Exception as e:
+                self.log.exception(
+                    f"Could not log gap of [{currency_pair.symbol}]",
+                    exc_info=e,
+                )
+
+            self._request_snapshot(currency_pair=currency_pair)
+
+    def _update_order_book(self, symbol: str, message: WebSocketMessage) -> None:
+        order_book: OrderBook | None = self._order_books.get(symbol, None)
+
+        if order_book is None:
+            return
+
+        try:
+            data: dict[str, typing.Any] = message.data
+
+            if data is None:
+                data = json.loads(message.raw)
+
+            applied: bool = order_book.apply_diff(diff=data["data"])
+        except Exception as e:
+            self.log.exception(
+                f"Could not update order book of [{symbol}]",
+                exc_info=e,
+            )
+
+            return
+
+        info: CurrencyPairInfo | None = self._currency_pairs.get(symbol, None)
+
+        # the book lost a diff and has to be rebuilt
+        if not applied and info is not None:
+            self._request_snapshot(currency_pair=info.value)
+
+    def _handle_shard_message(
+        self,
+        shard: WebSocketShard,
+        message: WebSocketMessage,
+    ) -> None:
+        shard.messages.add()
+
+        self._ingest_queue.put(key=message.symbol, item=message)
+
+    def _handle_shard_event(
+        self,
+        shard: WebSocketShard,
+        event: WebSocketEvent,
+    ) -> None:
         if event.type == WebSocketEventType.CONNECTED:
-            self._resubscribe()
+            self._resubscribe(shard=shard)
         elif event.type == WebSocketEventType.DISCONNECTED:
-            self._disconnect()
-        elif event.type == WebSocketEventType.CONTROL_MESSAGE:
-            key: int = event.context["id"]
+            # the factory reconnects, streams are resubscribed on connect
+            self.log.warning(f"Shard [{shard.id}] disconnected")
 
-            if key in self._pending_subscribe:
-                self._pending_subscribe.pop(key)
-            elif key in self._pending_unsubscribe:
-                self._pending_unsubscribe.pop(key)
+            shard.scheduler.disconnect()
+        elif event.type == WebSocketEventType.CONTROL_MESSAGE:
+            shard.scheduler.acknowledge(
+                key=event.context["id"],
+                error=event.context["error"],
+            )
 
-    def _create_subscriptions(self) -> None:
-        self._subscriptions.append(
-            self._connection.messages.subscribe(on_next=self._handle_message),
+    def _create_subscriptions(self, shard: WebSocketShard) -> None:
+        shard.subscriptions.append(
+            shard.connection.messages.subscribe(
+                on_next=functools.partial(self._handle_shard_message, shard),
+            ),
         )
 
-        self._subscriptions.append(
-            self._connection.events.subscribe(on_next=self._handle_event),
+        shard.subscriptions.append(
+            shard.connection.events.subscribe(
+                on_next=functools.partial(self._handle_shard_event, shard),
+            ),
         )
 
-    def _destroy_subscriptions(self) -> None:
-        for subscription in self._subscriptions:
+    def _destroy_subscriptions(self, shard: WebSocketShard) -> None:
+        for subscription in shard.subscriptions:
             subscription.unsubscribe()
 
-    def _connect_with(self, currency_pair: CurrencyPair) -> None:
-        symbol: str = currency_pair.symbol
+        shard.subscriptions.clear()
 
-        query: str = f"streams={symbol}@depth@100ms/{symbol}@trade"
-        url: str = f"wss://stream.binance.com:9443/stream?{query}"
+    def _open_shard(self) -> WebSocketShard:
+        # no streams in the url, every stream is subscribed once connected,
+        # so they are all (un)subscribed the same way
+        url: str = "wss://stream.binance.com:9443/stream"
 
-        self._connection: WebSocketConnection = \
-            self._web_socket_manager.create_connection(url=url)
+        connection: WebSocketConnection = \
+            self._web_socket_manager.create_connection(
+                url=url,
+                raw=environment.raw_ingestion,
+            )
+
+        shard: WebSocketShard = WebSocketShard(
+            connection=connection,
+            scheduler=SubscriptionScheduler(
+                send=connection.send_message,
+                call_later=self._web_socket_manager.call_later,
+                messages_per_second=environment.websocket_messages_per_second,
+                streams_per_message=environment.streams_per_subscribe_message,
+                ack_timeout_s=environment.subscribe_ack_timeout_s,
+            ),
+        )
+        self._shards[shard.id] = shard
 
-        self._create_subscriptions()
+        self._create_subscriptions(shard=shard)
 
-    def _disconnect(self) -> None:
-        self._destroy_subscriptions()
+        self.log.info(f"Shard [{shard.id}] opened ({len(self._shards)} total)")
 
-        connection: WebSocketConnection = self._connection
-        self._connection = None
-        self._web_socket_manager.delete_connection(connection=connection)
+        return shard
 
-    def query_currency_pairs(self) -> list[CurrencyPair]:
-        url: str = "https://api.binance.com/api/v3/exchangeInfo"
-        response: requests.Response = requests.get(url=url)
-        content: dict[str, typing.Any] = response.json()
+    def _close_shard(self, shard: WebSocketShard) -> None:
+        self._destroy_subscriptions(shard=shard)
+        shard.scheduler.disconnect()
+
+        self._shards.pop(shard.id, None)
+        self._web_socket_manager.delete_connection(connection=shard.connection)
+
+        self.log.info(f"Shard [{shard.id}] closed ({len(self._shards)} total)")
+
+    def _select_shard(self) -> WebSocketShard | None:
+        """Select the least loaded shard or None if a new one is needed"""
+
+        if len(self._shards) < self._connections:
+            return None
 
-        return [
-            CurrencyPair(base=s["baseAsset"], quote=s["quoteAsset"])
-            for s in content["symbols"]
+        candidates: list[WebSocketShard] = [
+            shard for shard in self._shards.values()
+            if len(shard.symbols) < self._symbols_per_shard
         ]
 
+        if len(candidates) == 0:
+            return None
+
+        return min(candidates, key=lambda shard: len(shard.symbols))
+
     def add_currency_pair(self, currency_pair: CurrencyPair) -> None:
         if self._is_collecting(currency_pair=currency_pair):
             return
 
-        self._currency_pairs[currency_pair.symbol] = CurrencyPairInfo(
-            value=currency_pair,
+        symbol: str = currency_pair.symbol
+
+        # open the files before the first message arrives
+        self._data_file_manager.open_routes(
+            currency_pair=currency_pair,
+            names=CHANNELS,
         )
 
-        if self.connected:
-            with lock:
-                self._pending_subscribe[self._next_id] = currency_pair
-                self._subscribe_symbol(symbol=currency_pair.symbol)
-        else:
-            self._connect_with(currency_pair=currency_pair)
+        with lock:
+            shard: WebSocketShard | None = self._select_shard()
+
+            if shard is None:
+                shard = self._open_shard()
+
+            # a shard which is not connected yet subscribes on connect
+            shard.symbols.add(symbol)
+            shard.scheduler.subscribe(
+                streams=self._get_streams_for(symbol=symbol),
+            )
+
+            self._currency_pairs[symbol] = CurrencyPairInfo(
+                value=currency_pair,
+                shard_id=shard.id,
+            )
+
+            if environment.order_book:
+                self._order_books[symbol] = OrderBook(symbol=symbol)
+
+        self._snapshot_jobs[symbol] = self._scheduler.call_every(
+            name="snapshot",
+            period_s=environment.snapshot_period_s,
+            callback=functools.partial(self._handle_scheduled_snapshot, symbol),
+            delay_s=self._get_snapshot_delay_s(symbol=symbol),
+        )
 
     def remove_currency_pair(self, currency_pair: CurrencyPair) -> None:
         if not self._is_collecting(currency_pair=currency_pair):
             return
 
-        self._currency_pairs.pop(currency_pair.symbol)
-        self._data_file_manager.close_file(
-            currency_pair=currency_pair,
-            name="snapshot",
+        symbol: str = currency_pair.symbol
+
+        with lock:
+            info: CurrencyPairInfo = self._currency_pairs.pop(symbol)
+            self._order_books.pop(symbol, None)
+            shard: WebSocketShard = self._shards[info.shard_id]
+            shard.symbols.discard(symbol)
+
+            if len(shard.symbols) > 0:
+                shard.scheduler.unsubscribe(
+                    streams=self._get_streams_for(symbol=symbol),
+                )
+            else:
+                self._close_shard(shard=shard)
+
+        job: Job | None = self._snapshot_jobs.pop(symbol, None)
+
+        if job is not None:
+            self._scheduler.cancel(job=job)
+
+        self._data_file_manager.close_routes(currency_pair=currency_pair)
+
+    def update_currency_pair(self, currency_pair: CurrencyPair) -> None:
+        with lock:
+            info: CurrencyPairInfo | None = self._currency_pairs.get(
+                currency_pair.symbol,
+                None,
+            )
+
+            if info is None:
+                return
+
+            info.value = currency_pair
+
+        self._data_file_manager.update_routes(currency_pair=currency_pair)
+
+    def _handle_snapshot(
+        self,
+        currency_pair: CurrencyPair,
+        data: dict[str, typing.Any],
+    ) -> None:
+        data["time"] = time.time_ns()
+
+        info: CurrencyPairInfo | None = self._currency_pairs.get(
+            currency_pair.symbol,
+            None,
         )
-        self._data_file_manager.close_file(
-            currency_pair=currency_pair,
-            name="trade",
+
+        if info is not None:
+            info.snapshot_update_id = data["lastUpdateId"]
+
+        order_book: OrderBook | None = self._order_books.get(
+            currency_pair.symbol,
+            None,
         )
-        self._data_file_manager.close_file(
-            currency_pair=currency_pair,
-            name="depth",
+
+        # older than the diffs already applied, the book needs a newer one
+        if order_book is not None and not order_book.apply_snapshot(snapshot=data):
+            self._request_snapshot(currency_pair=currency_pair)
+
+        # the pair was removed while the snapshot was fetched
+        data_file: DataFile | None = self._data_file_manager.route(
+            symbol=currency_pair.symbol,
+            name="snapshot",
         )
 
-        if len(self._currency_pairs.keys()) > 1:
-            with lock:
-                self._pending_unsubscribe[self._next_id] = currency_pair
-                self._unsubscribe_symbol(symbol=currency_pair.symbol)
-        else:
-            self._disconnect()
+        if data_file is not None:
+            data_file.write_data(data=data)
 
-    def _fetch_snapshot_for(self, currency_pair: CurrencyPair) -> dict[str, typing.Any]:
-        symbol: str = currency_pair.upper('')
-        url: str = f"https://api.binance.com/api/v3/depth?symbol={symbol}&limit=1000"
+    def _release_snapshot(self, currency_pair: CurrencyPair) -> None:
+        with self._snapshot_lock:
+            self._snapshots_in_flight.discard(currency_pair.symbol)
 
-        response: requests.Response = requests.get(url=url)
+            requested: bool = currency_pair.symbol in self._snapshots_requested
+            self._snapshots_requested.discard(currency_pair.symbol)
 
-        return response.json()
+        if requested and currency_pair.symbol in self._currency_pairs:
+            self._request_snapshot(currency_pair=currency_pair)
 
-    def create_snapshot(self) -> None:
-        for currency_pair_info in self._currency_pairs.values():
-            currency_pair: CurrencyPair = currency_pair_info.value
-            try:
-                data: dict[str, typing.Any] = self._fetch_snapshot_for(
-                    currency_pair=currency_pair,
-                )
+    def _request_snapshot(self, currency_pair: CurrencyPair) -> None:
+        """Snapshot a single symbol in the background, once at a time"""
 
-                data["time"] = time.time_ns()
+        with self._snapshot_lock:
+            if currency_pair.symbol in self._snapshots_in_flight:
+                self._snapshots_requested.add(currency_pair.symbol)
+                return
 
-                self._data_file_manager.get_file(
-                    currency_pair=currency_pair,
-                    name="snapshot",
-                ).write_data(
-                    data=data,
-                )
-            except Exception as e:
-                self.log.exception(
-                    f"Could not snapshot symbol [{currency_pair.symbol}]",
-                    exc_info=e,
-                )
+            self._snapshots_in_flight.add(currency_pair.symbol)
+
+        try:
+            self._snapshot_fetcher.submit(
+                currency_pair=currency_pair,
+                callback=self._handle_snapshot,
+            ).add_done_callback(
+                lambda _: self._release_snapshot(currency_pair=currency_pair),
+            )
+        except RuntimeError:
+            # the fetcher is closed
+            self._release_snapshot(currency_pair=currency_pair)
+
+    def _get_snapshot_delay_s(self, symbol: str) -> float:
+        """Delay until the phase of the symbol, derived from its name.
+
+        Symbols are spread evenly over the period and keep their phase
+        across restarts.
+        """
+
+        period_s: float = environment.snapshot_period_s
+        phase_s: float = zlib.crc32(symbol.encode("ascii")) / 2 ** 32 * period_s
+
+        return (phase_s - time.time() % period_s) % period_s
+
+    def _needs_snapshot(self, info: CurrencyPairInfo) -> bool:
+        if info.value.status == CurrencyPairStatus.IDLE:
+            return False
+
+        # the first diff requests the first snapshot
+        if info.last_update_id is None:
+            return False
+
+        # the book did not move since the last snapshot
+        if (
+            info.snapshot_update_id is not None
+            and
+            info.last_update_id <= info.snapshot_update_id
+        ):
+            return False
+
+        return True
+
+    def _handle_scheduled_snapshot(self, symbol: str) -> None:
+        info: CurrencyPairInfo | None = self._currency_pairs.get(symbol, None)
+
+        if info is None:
+            return
+
+        if not self._needs_snapshot(info=info):
+            self._skipped_snapshots += 1
+
+            return
+
+        self._request_snapshot(currency_pair=info.value)
 
     def get_last_message_dt_for(
         self,
@@ -264,6 +602,82 @@ class DataCollector(LoggingMixin, OnDestroy):
 
         return info.last_message_dt
 
+    def get_order_book(
+        self,
+        currency_pair: CurrencyPair,
+        depth: int = 20,
+    ) -> OrderBookView | None:
+        order_book: OrderBook | None = self._order_books.get(
+            currency_pair.symbol,
+            None,
+        )
+
+        if order_book is None:
+            return None
+
+        return order_book.get_view(depth=depth)
+
+    def get_last_message_dts(self) -> dict[str, datetime.datetime | None]:
+        return {
+            symbol: info.last_message_dt
+            for symbol, info in list(self._currency_pairs.items())
+        }
+
+    def get_metrics(self) -> CollectorMetrics:
+        return CollectorMetrics(
+            shards=[
+                ShardMetrics(
+                    id=shard.id,
+                    symbols=len(shard.symbols),
+                    streams=len(shard.symbols) * len(STREAMS),
+                    queued_streams=shard.scheduler.queued,
+                    pending_requests=shard.scheduler.pending,
+                    message_count=shard.messages.total,
+                    message_rate=shard.messages.rate(),
+                )
+                for shard in list(self._shards.values())
+            ],
+            ingest=self._ingest_queue.get_metrics(),
+            files=self._data_file_manager.get_metrics(),
+            snapshots=self._snapshot_fetcher.get_metrics(),
+            skipped_snapshots=self._skipped_snapshots,
+            jobs=self._scheduler.get_metrics(),
+            gaps=self._gaps,
+        )
+
+    def _log_metrics(self) -> None:
+        metrics: CollectorMetrics = self.get_metrics()
+
+        self.log.info(
+            f"Metrics: {len(self._currency_pairs)} symbols, "
+            f"{sum(s.message_rate for s in metrics.shards):.1f} msg/s, "
+            f"ingest depth {metrics.ingest.depth}, "
+            f"dropped {metrics.ingest.dropped}, "
+            f"gaps {metrics.gaps}, "
+            f"snapshot weight {metrics.snapshots.used_weight} "
+            f"(sent {metrics.snapshots.sent_weight_last}/min)"
+        )
+
+    def on_init(self) -> None:
+        self._ingest_queue.start()
+
+        if environment.metrics_log_interval_s > 0:
+            self._jobs.append(
+                self._scheduler.call_every(
+                    name="metrics_log",
+                    period_s=environment.metrics_log_interval_s,
+                    callback=self._log_metrics,
+                    delay_s=environment.metrics_log_interval_s,
+                ),
+            )
+
     def on_destroy(self) -> None:
-        if self.connected:
-            self._disconnect()
+        with lock:
+            for shard in list(self._shards.values()):
+                self._close_shard(shard=shard)
+
+        for job in [*self._jobs, *self._snapshot_jobs.values()]:
+            self._scheduler.cancel(job=job)
+
+        self._ingest_queue.stop()
+        self._snapshot_fetcher.close()
@@ -1,103 +1,1009 @@
 # coding=utf-8
-__all__ = ["DataFile", "DataFileManager"]
+from __future__ import annotations
 
+__all__ = [
+    "Codec",
+    "GzipCodec",
+    "ZstdCodec",
+    "Lz4Codec",
+    "create_codec",
+    "create_codec_for",
+    "FsyncPolicy",
+    "FileHandleCache",
+    "FileHandleMetrics",
+    "FileWriter",
+    "WriterMetrics",
+    "DataFileMetrics",
+    "DataFile",
+    "DataFileManager",
+]
+
+import abc
+import collections
+import dataclasses
 import datetime
+import enum
 import gzip
+import hashlib
+import io
+import itertools
+import os
+import queue
 import threading
+import time
 from pathlib import Path
-from typing import Any
+import typing
+from typing import Any, BinaryIO
 
 from binance_data_collector.environments import environment
 
 try:
-    import ujson as json
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
 except ImportError:
-    import json
+    lz4_frame = None
 
 from binance_data_collector.api import Injectable
-from binance_data_collector.api.lifecycle import OnDestroy
+from binance_data_collector.api.lifecycle import OnDestroy, OnInit
+from binance_data_collector.log import LoggingMixin
 
 from binance_data_collector.app.models.currency_pair import CurrencyPair
 
+from .block_index import BlockInfo, BlockStats, get_index_path, pack_index_header
+from .catalog import Catalog
+from .frames import get_frame_info, scan_frame_info
+from .metrics import RateCounter
+from .record_format import (
+    BinaryRecordEncoder,
+    JsonRecordEncoder,
+    RecordEncoder,
+    create_encoder,
+)
+from .scheduler import Job, Scheduler
+from .segments import (
+    DAY_MINUTES,
+    PARTIAL_SUFFIX,
+    SegmentCallback,
+    SegmentFile,
+    SegmentInfo,
+    append_manifest,
+    commit_segment,
+    format_segment,
+    get_partial_path,
+    get_segment_start,
+    recover_partials,
+    to_ms,
+)
+
 
 lock: threading.Lock = threading.Lock()
 
 
+class Codec(metaclass=abc.ABCMeta):
+    """Block compression of data files.
+
+    Every codec writes a format in which concatenated compressed blocks
+    are valid, so data files are written as a sequence of blocks and can
+    be appended to after a restart.
+    """
+
+    name: str
+    extension: str
+
+    @abc.abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.__dict__})"
+
+
+class GzipCodec(Codec):
+    name: str = "gzip"
+    extension: str = ".gz"
+
+    def __init__(self, level: int = 6) -> None:
+        self._level: int = level
+
+    def compress(self, data: bytes) -> bytes:
+        return gzip.compress(data, compresslevel=self._level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return gzip.decompress(data)
+
+
+class ZstdCodec(Codec):
+    name: str = "zstd"
+    extension: str = ".zst"
+
+    def __init__(self, level: int = 3, threads: int = 0) -> None:
+        if zstandard is None:
+            raise RuntimeError("The zstd codec requires `zstandard`")
+
+        self._level: int = level
+        self._threads: int = threads
+
+    def _create_compressor(self) -> "zstandard.ZstdCompressor":
+        return zstandard.ZstdCompressor(
+            level=self._level,
+            threads=self._threads,
+        )
+
+    def compress(self, data: bytes) -> bytes:
+        return self._create_compressor().compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        with zstandard.ZstdDecompressor().stream_reader(
+            io.BytesIO(data),
+            read_across_frames=True,
+        ) as reader:
+            return reader.read()
+
+
+class Lz4Codec(Codec):
+    name: str = "lz4"
+    extension: str = ".lz4"
+
+    def __init__(self, level: int = 0) -> None:
+        if lz4_frame is None:
+            raise RuntimeError("The lz4 codec requires `lz4`")
+
+        self._level: int = level
+
+    def compress(self, data: bytes) -> bytes:
+        return lz4_frame.compress(data, compression_level=self._level)
+
+    def decompress(self, data: bytes) -> bytes:
+        # the file object reads across concatenated frames
+        with lz4_frame.open(io.BytesIO(data), mode="rb") as reader:
+            return reader.read()
+
+
+def create_codec(
+    name: str,
+    level: int | None = None,
+    threads: int = 0,
+) -> Codec:
+    kwargs: dict[str, Any] = {} if level is None else {"level": level}
+
+    if name == GzipCodec.name:
+        return GzipCodec(**kwargs)
+    elif name == ZstdCodec.name:
+        return ZstdCodec(threads=threads, **kwargs)
+    elif name == Lz4Codec.name:
+        return Lz4Codec(**kwargs)
+    else:
+        raise RuntimeError(f"Unsupported codec: `{name}`")
+
+
+def create_codec_for(path: Path) -> Codec:
+    """Codec of an existing data file, by its extension"""
+
+    # partial files are named after their final name
+    name: str = path.name.removesuffix(PARTIAL_SUFFIX)
+
+    for codec in (GzipCodec, ZstdCodec, Lz4Codec):
+        if name.endswith(codec.extension):
+            return create_codec(name=codec.name)
+
+    raise RuntimeError(f"Unsupported codec of `{path}`")
+
+
+class FsyncPolicy(enum.Enum):
+    # leave it to the OS
+    NEVER = "NEVER"
+    # fsync every flushed block
+    FLUSH = "FLUSH"
+    # fsync every dirty file together once per interval (group commit)
+    INTERVAL = "INTERVAL"
+
+
+@dataclasses.dataclass(frozen=True)
+class FileHandleMetrics(object):
+    capacity: int
+    open: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class FileHandleCache(object):
+    """Bound the number of open data file handles with LRU eviction.
+
+    Data files register before every write, evicted files close their
+    handle and reopen it in append mode on their next flush.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity: int = max(1, capacity)
+
+        self._handles: collections.OrderedDict[DataFile, None] = \
+            collections.OrderedDict()
+
+        self._hits: int = 0
+        self._misses: int = 0
+        self._evictions: int = 0
+
+        self._lock: threading.Lock = threading.Lock()
+
+    def acquire(self, data_file: DataFile) -> None:
+        with self._lock:
+            if data_file in self._handles:
+                self._handles.move_to_end(data_file)
+                self._hits += 1
+
+                return
+
+            self._misses += 1
+            self._handles[data_file] = None
+
+            victims: list[DataFile] = []
+            while len(self._handles) > self._capacity:
+                victim, _ = self._handles.popitem(last=False)
+                victims.append(victim)
+
+        for victim in victims:
+            # a file which is being flushed right now is not cold
+            if victim.release(blocking=False):
+                with self._lock:
+                    self._evictions += 1
+            else:
+                with self._lock:
+                    self._handles[victim] = None
+
+    def discard(self, data_file: DataFile) -> None:
+        with self._lock:
+            self._handles.pop(data_file, None)
+
+    def get_metrics(self) -> FileHandleMetrics:
+        return FileHandleMetrics(
+            capacity=self._capacity,
+            open=len(self._handles),
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class WriterMetrics(object):
+    index: int
+    queue_depth: int
+    flushes: int
+    bytes_written: int
+    # share of the last seconds spent compressing and writing
+    utilisation: float
+
+
+class FileWriter(threading.Thread, LoggingMixin):
+    """Compress and write the blocks of the data files pinned to it.
+
+    zlib, zstd and lz4 release the GIL while compressing, so writers run
+    in parallel with each other and with the ingest threads.
+    """
+
+    def __init__(self, index: int) -> None:
+        super().__init__(name=f"file-writer-{index}", daemon=True)
+
+        self._index: int = index
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+
+        self._flushes: int = 0
+        self._bytes_written: int = 0
+        # microseconds spent working per second
+        self._busy_us: RateCounter = RateCounter()
+
+    def submit(self, data_file: DataFile) -> None:
+        self._queue.put(data_file)
+
+    def run(self) -> None:
+        while True:
+            data_file: DataFile | None = self._queue.get()
+
+            if data_file is None:
+                break
+
+            started: float = time.perf_counter()
+
+            try:
+                written: int = data_file.flush()
+
+                if written > 0:
+                    self._bytes_written += written
+                    self._flushes += 1
+            except Exception as e:
+                self.log.exception("Could not flush data file", exc_info=e)
+
+            self._busy_us.add(int((time.perf_counter() - started) * 1e6))
+
+    def stop(self) -> None:
+        self._queue.put(None)
+        self.join()
+
+    def get_metrics(self) -> WriterMetrics:
+        return WriterMetrics(
+            index=self._index,
+            queue_depth=self._queue.qsize(),
+            flushes=self._flushes,
+            bytes_written=self._bytes_written,
+            utilisation=min(1.0, self._busy_us.rate() / 1e6),
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class DataFileMetrics(object):
+    handles: FileHandleMetrics
+    writers: list[WriterMetrics]
+
+
 class DataFile(object):
-    def __init__(self, path: Path, ts: datetime.date) -> None:
+    """Buffer records and write them as independently compressed blocks.
+
+    A block is flushed once the buffer reaches `flush_size` bytes or when
+    the manager finds it older than the flush interval, so a crash loses at
+    most one block per file. The time and id range of every block is
+    appended to the sidecar index after the block. Flushes run on the
+    writer of the file, the caller only flushes inline if the writer falls
+    far behind.
+
+    The file is written under its partial name and renamed to `path` when
+    it is closed, `on_close` then gets the summary of the segment.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ts: datetime.datetime,
+        end_ts: datetime.datetime,
+        codec: Codec,
+        symbol: str = "",
+        name: str = "",
+        flush_size: int = 1024 * 1024,
+        fsync_policy: FsyncPolicy = FsyncPolicy.INTERVAL,
+        handles: FileHandleCache | None = None,
+        writer: FileWriter | None = None,
+        encoder: RecordEncoder | None = None,
+        on_close: SegmentCallback | None = None,
+    ) -> None:
         self._path: Path = path
-        self._ts: datetime.date = ts
+        self._partial_path: Path = get_partial_path(path=path)
+        self._ts: datetime.datetime = ts
+        self._end_ts: datetime.datetime = end_ts
+        self._symbol: str = symbol
+        self._name: str = name
+        self._codec: Codec = codec
+        self._flush_size: int = flush_size
+        self._fsync_policy: FsyncPolicy = fsync_policy
+        self._handles: FileHandleCache | None = handles
+        self._writer: FileWriter | None = writer
+        self._encoder: RecordEncoder = encoder or JsonRecordEncoder()
+        self._on_close: SegmentCallback | None = on_close
+
+        self._file: BinaryIO | None = None
+        self._index_file: BinaryIO | None = None
+
+        self._buffer: bytearray = bytearray()
+        self._stats: BlockStats = BlockStats()
+        self._buffered_at: float | None = None
+        self._flush_pending: bool = False
+        self._dirty: bool = False
+        self._closed: bool = False
 
-        self._file: gzip.GzipFile | None = None
+        # totals of the written blocks, for the summary of the segment
+        self._digest: hashlib._Hash = hashlib.sha256()
+        self._totals: BlockStats = BlockStats()
+        self._blocks: int = 0
+        self._size: int = 0
+        self._raw_size: int = 0
+
+        # set at rollover, late writes are forwarded to it
+        self._successor: DataFile | None = None
+
+        # guards the buffer, writes to the file are serialized separately
+        self._lock: threading.Lock = threading.Lock()
+        self._flush_lock: threading.Lock = threading.Lock()
 
     @property
-    def ts(self) -> datetime.date:
+    def ts(self) -> datetime.datetime:
         return self._ts
 
     @property
-    def file(self) -> gzip.GzipFile | None:
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def file(self) -> BinaryIO | None:
         return self._file
 
-    def open(self) -> gzip.GzipFile:
+    def open(self) -> BinaryIO:
         # prevent broken files and lost ios
         if self._file is not None:
             self._file.close()
 
-        self._file = gzip.open(self._path, mode="ab")
+        if self._index_file is not None:
+            self._index_file.close()
+
+        # unbuffered, every block is written with a single call
+        self._file = open(self._partial_path, mode="ab", buffering=0)
+        self._index_file = open(
+            get_index_path(path=self._partial_path),
+            mode="ab",
+            buffering=0,
+        )
+
+        if self._index_file.tell() == 0:
+            self._index_file.write(
+                pack_index_header(
+                    symbol=self._symbol,
+                    name=self._name,
+                    start_ms=to_ms(self._ts),
+                    end_ms=to_ms(self._end_ts),
+                ),
+            )
 
         return self._file
 
-    def close(self) -> None:
+    def _close_handle(self) -> None:
         if self._file is not None:
+            self._sync()
             self._file.close()
+            self._index_file.close()
+            self._file = None
+            self._index_file = None
+
+    def close(self) -> None:
+        """Flush, close and finalise the file, later writes are dropped"""
+
+        with self._lock:
+            if self._closed:
+                return
+
+            self._closed = True
+
+        self.flush()
+
+        with self._flush_lock:
+            self._close_handle()
+            segment: SegmentFile | None = self._commit()
+
+        if self._handles is not None:
+            self._handles.discard(data_file=self)
+
+        if segment is not None and self._on_close is not None:
+            self._on_close(segment)
+
+    def _commit(self) -> SegmentFile | None:
+        # must be called with the flush lock held, after the last flush
+        if self._blocks == 0:
+            return None
+
+        commit_segment(
+            path=self._path,
+            sync=self._fsync_policy != FsyncPolicy.NEVER,
+        )
+
+        return SegmentFile(
+            path=self._path,
+            symbol=self._symbol,
+            name=self._name,
+            start_ms=to_ms(self._ts),
+            end_ms=to_ms(self._end_ts),
+            blocks=self._blocks,
+            records=self._totals.records,
+            size=self._size,
+            raw_size=self._raw_size,
+            min_time=self._totals.min_time,
+            max_time=self._totals.max_time,
+            first_id=self._totals.first_id,
+            last_id=self._totals.last_id,
+            sha256=self._digest.hexdigest(),
+        )
+
+    def release(self, blocking: bool = True) -> bool:
+        """Close the handle only, the file is reopened by the next flush"""
+
+        if not self._flush_lock.acquire(blocking=blocking):
+            return False
+
+        try:
+            self._close_handle()
+        finally:
+            self._flush_lock.release()
+
+        return True
+
+    def retire(self, successor: DataFile) -> None:
+        """Close the file and forward any later write to the successor"""
+
+        with self._lock:
+            self._successor = successor
+
+        self.close()
+
+    def _append(
+        self,
+        data: dict[str, Any] | None = None,
+        raw: bytes | None = None,
+    ) -> None:
+        with self._lock:
+            successor: DataFile | None = self._successor
+
+            # a removed route, late writes have nowhere to go
+            if successor is None and self._closed:
+                return
+
+            if successor is None:
+                if self._buffered_at is None:
+                    self._buffered_at = time.monotonic()
+
+                if len(self._buffer) == 0:
+                    self._encoder.reset()
+
+                # encoded under the lock, the encoder writes in order
+                if raw is not None:
+                    self._stats.add(*scan_frame_info(payload=raw))
+                    self._buffer += self._encoder.encode_raw(data=raw)
+                else:
+                    self._stats.add(*get_frame_info(frame=data))
+                    self._buffer += self._encoder.encode_data(data=data)
+
+                size: int = len(self._buffer)
+
+        if successor is not None:
+            successor._append(data=data, raw=raw)
+        elif size >= 4 * self._flush_size:
+            # the writer cannot keep up, slow down the producer
+            self.flush()
+        elif size >= self._flush_size:
+            self.request_flush()
 
     def write_data(self, data: dict[str, Any]) -> None:
-        self._file.write(json.dumps(data).encode('utf8'))
-        self._file.write(b'\n')
+        self._append(data=data)
+
+    def write_raw(self, data: bytes) -> None:
+        """Write an already serialized JSON document"""
+
+        self._append(raw=data)
+
+    def is_due(self, now: float, interval_s: float) -> bool:
+        buffered_at: float | None = self._buffered_at
+
+        return buffered_at is not None and now - buffered_at >= interval_s
+
+    def request_flush(self) -> None:
+        """Flush on the writer of the file (inline without a writer)"""
+
+        if self._writer is None:
+            self.flush()
+
+            return
+
+        with self._lock:
+            if self._flush_pending:
+                return
+
+            self._flush_pending = True
+
+        self._writer.submit(data_file=self)
+
+    def flush(self) -> int:
+        """Compress and write the buffer, returns the written bytes"""
+
+        with self._flush_lock:
+            with self._lock:
+                block: bytearray = self._buffer
+                stats: BlockStats = self._stats
+                self._buffer = bytearray()
+                self._stats = BlockStats()
+                self._buffered_at = None
+                self._flush_pending = False
+
+            if len(block) == 0:
+                return 0
+
+            if self._handles is not None:
+                self._handles.acquire(data_file=self)
+
+            if self._file is None:
+                self.open()
+
+            compressed: bytes = self._codec.compress(block)
+            offset: int = self._file.tell()
+
+            self._file.write(compressed)
+
+            # after the block, an entry never points past the data
+            info: BlockInfo = stats.to_info(
+                offset=offset,
+                length=len(compressed),
+                size=len(block),
+            )
+            self._index_file.write(info.pack())
+            self._dirty = True
+
+            self._digest.update(compressed)
+            self._totals.merge(info=info)
+            self._blocks += 1
+            self._size += len(compressed)
+            self._raw_size += len(block)
+
+            if self._fsync_policy == FsyncPolicy.FLUSH:
+                self._sync()
+
+            return len(compressed)
+
+    def _sync(self) -> None:
+        if self._dirty and self._file is not None:
+            os.fsync(self._file.fileno())
+            os.fsync(self._index_file.fileno())
+            self._dirty = False
+
+    def sync(self) -> None:
+        with self._flush_lock:
+            self._sync()
+
+
+RouteKey: typing.TypeAlias = tuple[str, str]
 
 
 @Injectable()
-class DataFileManager(OnDestroy):
-    def __init__(self) -> None:
+class DataFileManager(LoggingMixin, OnInit, OnDestroy):
+    """Own the data files of every (symbol, name) route.
+
+    The routing table is only replaced as a whole, so the hot path reads it
+    without locking. Files are switched to the next segment (UTC, aligned
+    to midnight) by a rollover job scheduled at its start, not on the write
+    path. Every closed segment is added to the manifest of its directory
+    and to the catalog.
+    """
+
+    def __init__(self, scheduler: Scheduler, catalog: Catalog) -> None:
+        self._scheduler: Scheduler = scheduler
+        self._catalog: Catalog = catalog
+
         self._data_root: Path = Path(environment.data_root).resolve()
         self._pattern: str = environment.data_file_name_pattern
 
-        self._data_files: dict[str, DataFile] = {}
+        # files are read back with the codec matching their extension
+        if not self._pattern.endswith("{ext}"):
+            raise RuntimeError(
+                f"Data file name pattern must end with `{{ext}}`: `{self._pattern}`",
+            )
+
+        self._format: str = environment.data_file_format
+
+        if self._format not in (JsonRecordEncoder.name, BinaryRecordEncoder.name):
+            raise RuntimeError(f"Unsupported data file format: `{self._format}`")
+
+        self._segment_minutes: int = environment.data_file_segment_minutes
+
+        if self._segment_minutes <= 0 or DAY_MINUTES % self._segment_minutes != 0:
+            raise RuntimeError(
+                f"Unsupported data file segment: `{self._segment_minutes}` minutes",
+            )
+
+        self._codec: Codec = create_codec(
+            name=environment.data_file_codec,
+            level=environment.data_file_codec_level,
+            threads=environment.data_file_codec_threads,
+        )
+
+        self._flush_size: int = environment.data_file_flush_size
+        self._flush_interval_s: float = environment.data_file_flush_interval_s
+        self._fsync_policy: FsyncPolicy = \
+            FsyncPolicy(environment.data_file_fsync_policy)
+        self._fsync_interval_s: float = environment.data_file_fsync_interval_s
+        self._handles: FileHandleCache = FileHandleCache(
+            capacity=environment.data_file_max_open,
+        )
+        self._writers: list[FileWriter] = [
+            FileWriter(index=i)
+            for i in range(max(1, environment.data_file_writers))
+        ]
+
+        self._currency_pairs: dict[str, CurrencyPair] = {}
+        self._routes: dict[RouteKey, DataFile] = {}
+        self._ts: datetime.datetime = self._get_segment_start()
 
-    def _close_file_by_key(self, key: str) -> None:
-        data_file: DataFile = self._data_files.pop(key)
-        data_file.close()
+        self._jobs: list[Job] = []
+        self._rollover_job: Job | None = None
+        self._stopped: bool = False
+
+    def _get_segment_start(self) -> datetime.datetime:
+        return get_segment_start(
+            now=datetime.datetime.now(tz=datetime.timezone.utc),
+            minutes=self._segment_minutes,
+        )
+
+    def _get_path(
+        self,
+        currency_pair: CurrencyPair,
+        name: str,
+        ts: datetime.datetime,
+        encoder: RecordEncoder,
+    ) -> Path:
+        directory: Path = self._data_root / currency_pair.lower()
+        segment: str = format_segment(start=ts, minutes=self._segment_minutes)
+
+        # a closed segment is never reopened, a restart within it gets a
+        # file of its own
+        for i in itertools.count():
+            file_name: str = self._pattern.format(
+                name=name,
+                ts=segment if i == 0 else f"{segment}_{i}",
+                format=encoder.name,
+                ext=self._codec.extension,
+            )
+            path: Path = directory / file_name
+
+            if not path.exists() and not get_partial_path(path=path).exists():
+                return path
+
+    def _create_file(
+        self,
+        currency_pair: CurrencyPair,
+        name: str,
+        ts: datetime.datetime,
+    ) -> DataFile:
+        encoder: RecordEncoder = create_encoder(
+            name=self._format,
+            channel=name,
+            tick_size=currency_pair.tick_size,
+            step_size=currency_pair.step_size,
+        )
+        path: Path = self._get_path(
+            currency_pair=currency_pair,
+            name=name,
+            ts=ts,
+            encoder=encoder,
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # the file itself is opened by the first flush
+        return DataFile(
+            path=path,
+            ts=ts,
+            end_ts=ts + datetime.timedelta(minutes=self._segment_minutes),
+            codec=self._codec,
+            symbol=currency_pair.symbol,
+            name=name,
+            flush_size=self._flush_size,
+            fsync_policy=self._fsync_policy,
+            handles=self._handles,
+            # pin the symbol to a writer to keep its blocks in order
+            writer=self._writers[hash(currency_pair.symbol) % len(self._writers)],
+            encoder=encoder,
+            on_close=self._add_segment,
+        )
+
+    def _add_segment(self, segment: SegmentFile, recovered: bool = False) -> None:
+        info: SegmentInfo = SegmentInfo.create(
+            segment=segment,
+            data_root=self._data_root,
+            recovered=recovered,
+        )
+
+        try:
+            append_manifest(
+                info=info,
+                directory=segment.path.parent,
+                sync=self._fsync_policy != FsyncPolicy.NEVER,
+            )
+        except Exception as e:
+            self.log.exception("Could not add segment to manifest", exc_info=e)
+
+        # the manifest is the record, the catalog is backfilled from it by
+        # the next start (or the `catalog --rebuild` command)
+        try:
+            self._catalog.add(info=info)
+        except Exception as e:
+            self.log.exception(
+                f"Could not add segment `{info.path}` to catalog, "
+                f"it is added from the manifest by the next start",
+                exc_info=e,
+            )
+
+    def _recover(self, currency_pair: CurrencyPair) -> None:
+        # must be called before the first route of the pair is opened, the
+        # partial files are left by a previous run
+        directory: Path = self._data_root / currency_pair.lower()
+
+        try:
+            segments: list[SegmentFile] = recover_partials(directory=directory)
+        except Exception as e:
+            self.log.exception(
+                f"Could not recover the data files of [{currency_pair.symbol}]",
+                exc_info=e,
+            )
+
+            return
+
+        for segment in segments:
+            self.log.warning(f"Recovered partial data file `{segment.path}`")
+
+            self._add_segment(segment=segment, recovered=True)
+
+    def _add_route(self, currency_pair: CurrencyPair, name: str) -> DataFile:
+        # must be called with the lock held
+        key: RouteKey = (currency_pair.symbol, name)
+
+        if key not in self._routes:
+            if currency_pair.symbol not in self._currency_pairs:
+                self._recover(currency_pair=currency_pair)
+
+            self._currency_pairs[currency_pair.symbol] = currency_pair
+
+            routes: dict[RouteKey, DataFile] = self._routes.copy()
+            routes[key] = self._create_file(
+                currency_pair=currency_pair,
+                name=name,
+                ts=self._ts,
+            )
+            self._routes = routes
+
+        return self._routes[key]
+
+    def route(self, symbol: str, name: str) -> DataFile | None:
+        """Lock-free lookup of the open file of a route"""
+
+        return self._routes.get((symbol, name), None)
+
+    def open_routes(self, currency_pair: CurrencyPair, names: list[str]) -> None:
+        with lock:
+            for name in names:
+                self._add_route(currency_pair=currency_pair, name=name)
+
+    def close_routes(self, currency_pair: CurrencyPair) -> None:
+        with lock:
+            symbol: str = currency_pair.symbol
+
+            routes: dict[RouteKey, DataFile] = self._routes.copy()
+            closed: list[DataFile] = [
+                routes.pop(key) for key in list(routes.keys())
+                if key[0] == symbol
+            ]
+            self._routes = routes
+            self._currency_pairs.pop(symbol, None)
+
+        # like the rollover, closing must not hold up the other routes
+        for data_file in closed:
+            data_file.close()
+
+    def update_routes(self, currency_pair: CurrencyPair) -> None:
+        """Take over changed filters, the next segments are encoded with them"""
+
+        with lock:
+            if currency_pair.symbol in self._currency_pairs:
+                self._currency_pairs[currency_pair.symbol] = currency_pair
 
     def get_file(self, currency_pair: CurrencyPair, name: str) -> DataFile:
-        key: str = f"{currency_pair.lower()}_{name}"
-        ts: datetime.date = datetime.date.today()
-        file_name: str = self._pattern.format(name=name, ts=ts)
+        data_file: DataFile | None = self.route(
+            symbol=currency_pair.symbol,
+            name=name,
+        )
 
+        if data_file is not None:
+            return data_file
+
+        with lock:
+            return self._add_route(currency_pair=currency_pair, name=name)
+
+    def _rollover(self, ts: datetime.datetime) -> None:
         with lock:
-            if key in self._data_files and ts != self._data_files[key].ts:
-                # close before switch to prevent non-closed io at exception
-                self._close_file_by_key(key=key)
+            old_routes: dict[RouteKey, DataFile] = self._routes
+            new_routes: dict[RouteKey, DataFile] = {
+                (symbol, name): self._create_file(
+                    currency_pair=self._currency_pairs[symbol],
+                    name=name,
+                    ts=ts,
+                )
+                for symbol, name in old_routes.keys()
+            }
 
-            if key not in self._data_files:
-                path: Path = self._data_root / currency_pair.lower() / file_name
+            self._routes = new_routes
+            self._ts = ts
 
-                self._data_files[key] = DataFile(path=path, ts=ts)
+        # closing flushes and commits every file, routes must not wait for
+        # it, the old files forward late writes to their successors
+        for key, data_file in old_routes.items():
+            data_file.retire(successor=new_routes[key])
 
-                path.parent.mkdir(parents=True, exist_ok=True)
-                # open only after assign to prevent non-closed io at exception
-                self._data_files[key].open()
+        self.log.info(f"Rolled over {len(new_routes)} files to [{ts}]")
 
-            return self._data_files[key]
+    def _flush_due(self) -> None:
+        now: float = time.monotonic()
 
-    def close_file(self, currency_pair: CurrencyPair, name: str) -> None:
-        key: str = f"{currency_pair.lower()}_{name}"
+        for data_file in list(self._routes.values()):
+            if data_file.is_due(now=now, interval_s=self._flush_interval_s):
+                data_file.request_flush()
+
+    def _sync_all(self) -> None:
+        for data_file in list(self._routes.values()):
+            try:
+                data_file.sync()
+            except Exception as e:
+                self.log.exception("Could not sync data file", exc_info=e)
+
+    def _schedule_rollover(self) -> None:
+        now: datetime.datetime = datetime.datetime.now(tz=datetime.timezone.utc)
+        next_ts: datetime.datetime = get_segment_start(
+            now=now,
+            minutes=self._segment_minutes,
+        ) + datetime.timedelta(minutes=self._segment_minutes)
 
         with lock:
-            if key in self._data_files:
-                # close before switch to prevent non-closed io at exception
-                self._close_file_by_key(key=key)
+            if self._stopped:
+                return
+
+            self._rollover_job = self._scheduler.call_later(
+                name="file_rollover",
+                # the monotonic clock may run ahead, the job checks the segment
+                delay_s=max(0.1, (next_ts - now).total_seconds()),
+                callback=self._handle_rollover,
+            )
+
+    def _handle_rollover(self) -> None:
+        ts: datetime.datetime = self._get_segment_start()
+
+        try:
+            if ts != self._ts:
+                self._rollover(ts=ts)
+        finally:
+            self._schedule_rollover()
+
+    def get_metrics(self) -> DataFileMetrics:
+        return DataFileMetrics(
+            handles=self._handles.get_metrics(),
+            writers=[writer.get_metrics() for writer in self._writers],
+        )
+
+    def on_init(self) -> None:
+        for writer in self._writers:
+            writer.start()
+
+        self._jobs.append(
+            self._scheduler.call_every(
+                name="file_flush",
+                period_s=min(1.0, self._flush_interval_s),
+                callback=self._flush_due,
+            ),
+        )
+
+        if self._fsync_policy == FsyncPolicy.INTERVAL:
+            self._jobs.append(
+                self._scheduler.call_every(
+                    name="file_fsync",
+                    period_s=self._fsync_interval_s,
+                    callback=self._sync_all,
+                    delay_s=self._fsync_interval_s,
+                ),
+            )
+
+        self._schedule_rollover()
 
     def on_destroy(self) -> None:
         with lock:
-            for key in list(self._data_files.keys()):
-                self._close_file_by_key(key=key)
+            self._stopped = True
+            rollover_job: Job | None = self._rollover_job
+
+        for job in [*self._jobs, rollover_job]:
+            if job is not None:
+                self._scheduler.cancel(job=job)
+
+        with lock:
+            routes: dict[RouteKey, DataFile] = self._routes
+            self._routes = {}
+
+        for data_file in routes.values():
+            data_file.close()
+
+        for writer in self._writers:
+            writer.stop()
@@ -0,0 +1,156 @@
+# coding=utf-8
+from __future__ import annotations
+
+__all__ = ["ExchangeInfoClient", "ExchangeInfoDelta", "SymbolInfo"]
+
+import dataclasses
+import hashlib
+import threading
+import typing
+
+import requests
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+from binance_data_collector.api import Injectable
+from binance_data_collector.api.lifecycle import OnDestroy
+from binance_data_collector.log import LoggingMixin
+
+EXCHANGE_INFO_URL: str = "https://api.binance.com/api/v3/exchangeInfo"
+# everything before the symbols (e.g. serverTime) changes on every request
+SYMBOLS_MARKER: bytes = b'"symbols":'
+
+
+@dataclasses.dataclass(frozen=True)
+class SymbolInfo(object):
+    symbol: str
+    base: str
+    quote: str
+    status: str
+    base_precision: int
+    quote_precision: int
+    tick_size: str | None
+    step_size: str | None
+
+
+@dataclasses.dataclass(frozen=True)
+class ExchangeInfoDelta(object):
+    # all symbols of the exchange, keyed by the lower case symbol
+    symbols: dict[str, SymbolInfo]
+    added: list[SymbolInfo]
+    removed: list[str]
+    # True for the first document, every symbol is added
+    initial: bool
+    # of the document the delta leads to
+    fingerprint: bytes
+
+
+def get_fingerprint(content: bytes) -> bytes:
+    """Digest of the symbol list, ignoring the volatile header fields"""
+
+    start: int = content.find(SYMBOLS_MARKER)
+
+    return hashlib.blake2b(content[max(0, start):], digest_size=16).digest()
+
+
+def parse_symbol(data: dict[str, typing.Any]) -> SymbolInfo:
+    filters: dict[str, dict[str, typing.Any]] = {
+        f["filterType"]: f for f in data.get("filters", [])
+    }
+
+    return SymbolInfo(
+        symbol=data["symbol"].lower(),
+        base=data["baseAsset"],
+        quote=data["quoteAsset"],
+        status=data["status"],
+        base_precision=data.get("baseAssetPrecision", 8),
+        quote_precision=data.get("quoteAssetPrecision", 8),
+        tick_size=filters.get("PRICE_FILTER", {}).get("tickSize", None),
+        step_size=filters.get("LOT_SIZE", {}).get("stepSize", None),
+    )
+
+
+@Injectable()
+class ExchangeInfoClient(LoggingMixin, OnDestroy):
+    """Poll exchangeInfo and report only what changed.
+
+    The document is parsed only if the fingerprint of its symbol list
+    differs from the previous one, which is rare. A delta is relative to
+    the last acknowledged document, until the consumer has applied it and
+    called `acknowledge` every refresh reports it again.
+    """
+
+    def __init__(self) -> None:
+        self._session: requests.Session = requests.Session()
+
+        self._fingerprint: bytes | None = None
+        self._symbols: dict[str, SymbolInfo] | None = None
+
+        self._lock: threading.Lock = threading.Lock()
+
+    def get_symbol(self, symbol: str) -> SymbolInfo | None:
+        if self._symbols is None:
+            return None
+
+        return self._symbols.get(symbol, None)
+
+    def refresh(self) -> ExchangeInfoDelta | None:
+        """Fetch the document, returns None if the symbols did not change"""
+
+        response: requests.Response = self._session.get(
+            url=EXCHANGE_INFO_URL,
+            timeout=30,
+        )
+        response.raise_for_status()
+
+        content: bytes = response.content
+        fingerprint: bytes = get_fingerprint(content=content)
+
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return None
+
+            symbols: dict[str, SymbolInfo] = {
+                info.symbol: info
+                for info in map(parse_symbol, json.loads(content)["symbols"])
+            }
+            previous: dict[str, SymbolInfo] | None = self._symbols
+
+        if previous is None:
+            return ExchangeInfoDelta(
+                symbols=symbols,
+                added=list(symbols.values()),
+                removed=[],
+                initial=True,
+                fingerprint=fingerprint,
+            )
+
+        delta: ExchangeInfoDelta = ExchangeInfoDelta(
+            symbols=symbols,
+            added=[
+                info for key, info in symbols.items() if key not in previous
+            ],
+            removed=[key for key in previous.keys() if key not in symbols],
+            initial=False,
+            fingerprint=fingerprint,
+        )
+
+        self.log.info(
+            f"Exchange info changed: {len(delta.added)} added, "
+            f"{len(delta.removed)} removed"
+        )
+
+        return delta
+
+    def acknowledge(self, delta: ExchangeInfoDelta) -> None:
+        """The delta was applied, the next one is relative to it"""
+
+        with self._lock:
+            self._fingerprint = delta.fingerprint
+            self._symbols = delta.symbols
+
+    def on_destroy(self) -> None:
+        self._session.close()
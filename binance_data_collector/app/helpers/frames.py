@@ -0,0 +1,119 @@
+# coding=utf-8
+"""Cheap scanners for Binance combined stream frames.
+
+Combined stream frames are always serialized as
+`{"stream":"<symbol>@<channel>","data":{...}}` without whitespace, so the
+stream name and the update ids of depth diffs can be read without decoding
+the payload. The same holds for the lines of JSON data files, which store
+the frames as received. Snapshots and gaps are written by `json.dumps`,
+with a space after each colon.
+"""
+from __future__ import annotations
+
+__all__ = [
+    "STREAM_PREFIX",
+    "FrameInfo",
+    "get_frame_info",
+    "scan_frame_info",
+    "scan_stream",
+    "scan_update_ids",
+]
+
+import re
+import typing
+
+STREAM_PREFIX: bytes = b'{"stream":"'
+
+# first and last update id of a depth diff event
+FIRST_UPDATE_ID: re.Pattern = re.compile(rb'"U":(\d+)')
+LAST_UPDATE_ID: re.Pattern = re.compile(rb'"u":(\d+)')
+# event time (ms) of stream events, local time (ns) of snapshots and gaps
+EVENT_TIME: re.Pattern = re.compile(rb'"E":(\d+)')
+LOCAL_TIME: re.Pattern = re.compile(rb'"time":\s*(\d+)')
+TRADE_ID: re.Pattern = re.compile(rb'"t":(\d+)')
+SNAPSHOT_UPDATE_ID: re.Pattern = re.compile(rb'"lastUpdateId":\s*(\d+)')
+
+# event time in ms, first and last id (update or trade id), all optional
+FrameInfo: typing.TypeAlias = tuple[int | None, int | None, int | None]
+
+
+def scan_stream(payload: bytes) -> str | None:
+    """Return the stream name of a combined stream frame or None"""
+
+    if not payload.startswith(STREAM_PREFIX):
+        return None
+
+    end: int = payload.find(b'"', len(STREAM_PREFIX))
+
+    if end < 0:
+        return None
+
+    return payload[len(STREAM_PREFIX):end].decode("ascii")
+
+
+def scan_update_ids(payload: bytes) -> tuple[int, int] | None:
+    """Return the first and last update id of a depth diff frame or None"""
+
+    first: re.Match | None = FIRST_UPDATE_ID.search(payload)
+    last: re.Match | None = LAST_UPDATE_ID.search(payload)
+
+    if first is None or last is None:
+        return None
+
+    return int(first.group(1)), int(last.group(1))
+
+
+def scan_frame_info(payload: bytes) -> FrameInfo:
+    """Return the event time and the id range of a frame"""
+
+    event_time: re.Match | None = EVENT_TIME.search(payload)
+
+    if event_time is not None:
+        time_ms: int | None = int(event_time.group(1))
+    else:
+        local_time: re.Match | None = LOCAL_TIME.search(payload)
+        time_ms: int | None = (
+            int(local_time.group(1)) // 1_000_000
+            if local_time is not None else None
+        )
+
+    update_ids: tuple[int, int] | None = scan_update_ids(payload=payload)
+
+    if update_ids is not None:
+        return time_ms, update_ids[0], update_ids[1]
+
+    trade_id: re.Match | None = TRADE_ID.search(payload)
+
+    if trade_id is not None:
+        return time_ms, int(trade_id.group(1)), int(trade_id.group(1))
+
+    snapshot_update_id: re.Match | None = SNAPSHOT_UPDATE_ID.search(payload)
+
+    if snapshot_update_id is not None:
+        return time_ms, int(snapshot_update_id.group(1)), int(snapshot_update_id.group(1))
+
+    return time_ms, None, None
+
+
+def get_frame_info(frame: dict[str, typing.Any]) -> FrameInfo:
+    """Return the event time and the id range of a decoded frame"""
+
+    data: dict[str, typing.Any] = frame.get("data", frame)
+
+    if "E" in data:
+        time_ms: int | None = data["E"]
+    elif "time" in frame:
+        time_ms: int | None = frame["time"] // 1_000_000
+    else:
+        time_ms: int | None = None
+
+    if "U" in data and "u" in data:
+        return time_ms, data["U"], data["u"]
+
+    if "t" in data:
+        return time_ms, data["t"], data["t"]
+
+    if "lastUpdateId" in data:
+        return time_ms, data["lastUpdateId"], data["lastUpdateId"]
+
+    return time_ms, None, None
@@ -0,0 +1,190 @@
+# coding=utf-8
+from __future__ import annotations
+
+__all__ = ["DropPolicy", "IngestQueue", "IngestQueueMetrics"]
+
+import dataclasses
+import enum
+import queue
+import threading
+import typing
+
+from binance_data_collector.log import LoggingMixin
+from binance_data_collector.rxpy import Observable, Subject
+
+T = typing.TypeVar("T")
+
+_STOP: object = object()
+
+
+class DropPolicy(enum.Enum):
+    DROP_NEWEST = "DROP_NEWEST"
+    DROP_OLDEST = "DROP_OLDEST"
+
+
+@dataclasses.dataclass(frozen=True)
+class IngestQueueMetrics(object):
+    workers: int
+    capacity: int
+    depth: int
+    enqueued: int
+    processed: int
+    dropped: int
+    paused: bool
+
+
+class _Partition(object):
+    def __init__(self, capacity: int) -> None:
+        self.capacity: int = capacity
+        # SimpleQueue is implemented in C and never blocks on put
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.thread: threading.Thread | None = None
+
+        self.enqueued: int = 0
+        self.processed: int = 0
+        self.dropped: int = 0
+
+
+class IngestQueue(LoggingMixin, typing.Generic[T]):
+    """Bounded hand-off between a producer thread and a pool of workers.
+
+    Items are partitioned by key and every partition is drained by a single
+    worker, so the order of items with the same key is kept. Crossing the
+    high watermark emits True on `pressure` (the producer should stop
+    reading), draining below the low watermark emits False. A full
+    partition drops items according to the drop policy.
+
+    Pausing stops reading the sockets, control frames included: a pause
+    longer than the ping timeout of either side drops the connection,
+    which is then reconnected (and resnapshotted). Size the queue so that
+    pauses stay well below that.
+    """
+
+    def __init__(
+        self,
+        handler: typing.Callable[[T], None],
+        workers: int = 2,
+        capacity: int = 100000,
+        policy: DropPolicy = DropPolicy.DROP_NEWEST,
+        high_watermark: float = 0.8,
+        low_watermark: float = 0.5,
+    ) -> None:
+        self._handler: typing.Callable[[T], None] = handler
+        self._policy: DropPolicy = policy
+
+        workers = max(1, workers)
+        self._partitions: list[_Partition] = [
+            _Partition(capacity=max(1, capacity // workers))
+            for _ in range(workers)
+        ]
+
+        self._high: int = int(self._partitions[0].capacity * high_watermark)
+        self._low: int = int(self._partitions[0].capacity * low_watermark)
+
+        self._paused: bool = False
+        self._pressure: Subject[bool] = Subject()
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def pressure(self) -> Observable[bool]:
+        return self._pressure.as_observable()
+
+    def _set_paused(self, paused: bool) -> None:
+        with self._lock:
+            if self._paused == paused:
+                return
+
+            self._paused = paused
+
+            # emitted under the lock, so the observers get the changes in
+            # order (they must not block, nor call back into the queue)
+            self._pressure.next(value=paused)
+
+        self.log.warning(
+            "Ingest queue above high watermark, pause reading"
+            if paused else
+            "Ingest queue below low watermark, resume reading"
+        )
+
+    def put(self, key: str, item: T) -> bool:
+        """Enqueue the item, returns False if an item was dropped"""
+
+        partition: _Partition = \
+            self._partitions[hash(key) % len(self._partitions)]
+        depth: int = partition.queue.qsize()
+
+        if depth >= self._high and not self._paused:
+            self._set_paused(paused=True)
+
+        if depth >= partition.capacity:
+            partition.dropped += 1
+
+            if self._policy == DropPolicy.DROP_NEWEST:
+                return False
+
+            try:
+                partition.queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            partition.queue.put(item)
+            partition.enqueued += 1
+
+            return False
+
+        partition.queue.put(item)
+        partition.enqueued += 1
+
+        return True
+
+    def _work(self, partition: _Partition) -> None:
+        while True:
+            item: T | object = partition.queue.get()
+
+            if item is _STOP:
+                break
+
+            try:
+                self._handler(item)
+            except Exception as e:
+                self.log.exception("Could not handle item", exc_info=e)
+
+            partition.processed += 1
+
+            if self._paused and self._get_depth() <= self._low:
+                self._set_paused(paused=False)
+
+    def _get_depth(self) -> int:
+        return max(p.queue.qsize() for p in self._partitions)
+
+    def start(self) -> None:
+        for i, partition in enumerate(self._partitions):
+            partition.thread = threading.Thread(
+                target=self._work,
+                args=(partition,),
+                name=f"ingest-{i}",
+                daemon=True,
+            )
+            partition.thread.start()
+
+    def stop(self) -> None:
+        """Stop the workers after the already queued items are handled"""
+
+        for partition in self._partitions:
+            partition.queue.put(_STOP)
+
+        for partition in self._partitions:
+            if partition.thread is not None:
+                partition.thread.join()
+                partition.thread = None
+
+    def get_metrics(self) -> IngestQueueMetrics:
+        return IngestQueueMetrics(
+            workers=len(self._partitions),
+            capacity=sum(p.capacity for p in self._partitions),
+            depth=sum(p.queue.qsize() for p in self._partitions),
+            enqueued=sum(p.enqueued for p in self._partitions),
+            processed=sum(p.processed for p in self._partitions),
+            dropped=sum(p.dropped for p in self._partitions),
+            paused=self._paused,
+        )
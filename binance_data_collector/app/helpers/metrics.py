@@ -0,0 +1,67 @@
+# coding=utf-8
+from __future__ import annotations
+
+__all__ = ["RateCounter"]
+
+import time
+
+
+class RateCounter(object):
+    """Count events in one second buckets over a sliding window.
+
+    Only the owner thread should call `add()`, `rate()` may be called from
+    any thread (it can be off by the events of a single bucket).
+    """
+
+    def __init__(self, window_s: int = 10) -> None:
+        self._window_s: int = window_s
+
+        self._buckets: list[int] = [0] * window_s
+        self._second: int = int(time.monotonic())
+        self._total: int = 0
+
+    @property
+    def total(self) -> int:
+        return self._total
+
+    def _roll(self, second: int) -> None:
+        elapsed: int = second - self._second
+
+        if elapsed <= 0:
+            return
+
+        for i in range(1, min(elapsed, self._window_s) + 1):
+            self._buckets[(self._second + i) % self._window_s] = 0
+
+        self._second = second
+
+    def add(self, n: int = 1) -> None:
+        second: int = int(time.monotonic())
+
+        if second != self._second:
+            self._roll(second=second)
+
+        self._buckets[second % self._window_s] += n
+        self._total += n
+
+    def rate(self) -> float:
+        """Events per second over the completed buckets of the window"""
+
+        second: int = int(time.monotonic())
+        current: int = second % self._window_s
+
+        if second - self._second >= self._window_s:
+            return 0.0
+
+        # buckets not touched since the last add are stale
+        stale: set[int] = {
+            (self._second + i) % self._window_s
+            for i in range(1, second - self._second + 1)
+        }
+
+        count: int = sum(
+            value for i, value in enumerate(self._buckets)
+            if i != current and i not in stale
+        )
+
+        return count / (self._window_s - 1)
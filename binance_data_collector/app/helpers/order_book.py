@@ -0,0 +1,240 @@
+# coding=utf-8
+from __future__ import annotations
+
+__all__ = ["BookSide", "OrderBook", "OrderBookView"]
+
+import collections
+import dataclasses
+import heapq
+import threading
+import typing
+
+from binance_data_collector.log import LoggingMixin
+
+# price and quantity, as strings to keep the precision of the exchange
+Level: typing.TypeAlias = tuple[str, str]
+
+
+@dataclasses.dataclass(frozen=True)
+class OrderBookView(object):
+    symbol: str
+    synced: bool
+    last_update_id: int | None
+    bids: list[Level]
+    asks: list[Level]
+
+
+class BookSide(object):
+    """Price levels of one side, ordered from the best price by a heap.
+
+    Bids are keyed by the negated price, so both sides are ascending and the
+    best level is always the smallest key. Removed levels stay in the heap
+    until they reach its top (lazy deletion), so an update is O(log n). The
+    heap is rebuilt once it holds as many removed keys as live ones.
+    """
+
+    def __init__(self, descending: bool) -> None:
+        self._sign: float = -1.0 if descending else 1.0
+
+        self._heap: list[float] = []
+        # keys in the heap, live or removed
+        self._keys: set[float] = set()
+        self._levels: dict[float, Level] = {}
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._keys.clear()
+        self._levels.clear()
+
+    def update(self, price: str, quantity: str) -> None:
+        key: float = self._sign * float(price)
+
+        if float(quantity) == 0.0:
+            if self._levels.pop(key, None) is not None:
+                self._compact()
+
+            return
+
+        if key not in self._keys:
+            heapq.heappush(self._heap, key)
+            self._keys.add(key)
+
+        self._levels[key] = (price, quantity)
+
+    def _compact(self) -> None:
+        if len(self._heap) < 64 or len(self._heap) < 2 * len(self._levels):
+            return
+
+        self._heap = list(self._levels.keys())
+        heapq.heapify(self._heap)
+        self._keys = set(self._heap)
+
+    def best(self) -> Level | None:
+        # drop the removed levels on top
+        while len(self._heap) > 0 and self._heap[0] not in self._levels:
+            self._keys.discard(heapq.heappop(self._heap))
+
+        if len(self._heap) == 0:
+            return None
+
+        return self._levels[self._heap[0]]
+
+    def get_levels(self, depth: int) -> list[Level]:
+        """Best levels, walks the heap from the top without popping"""
+
+        levels: list[Level] = []
+        # (key, position in the heap) of the nodes to visit
+        frontier: list[tuple[float, int]] = [(self._heap[0], 0)] if self._heap else []
+
+        while len(frontier) > 0 and len(levels) < depth:
+            key, i = heapq.heappop(frontier)
+
+            level: Level | None = self._levels.get(key, None)
+
+            if level is not None:
+                levels.append(level)
+
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self._heap):
+                    heapq.heappush(frontier, (self._heap[child], child))
+
+        return levels
+
+
+class OrderBook(LoggingMixin):
+    """Local L2 book maintained from a REST snapshot and depth diffs.
+
+    Follows the procedure documented by Binance: diffs are buffered until a
+    snapshot arrives, diffs older than the snapshot are dropped and every
+    applied diff must continue the previous one (`U` <= last `u` + 1).
+    A gap resets the book to buffering until the next snapshot.
+    """
+
+    def __init__(self, symbol: str, max_buffered: int = 10000) -> None:
+        self._symbol: str = symbol
+
+        self._bids: BookSide = BookSide(descending=True)
+        self._asks: BookSide = BookSide(descending=False)
+
+        self._last_update_id: int | None = None
+        self._buffer: collections.deque[dict[str, typing.Any]] = \
+            collections.deque(maxlen=max_buffered)
+
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def symbol(self) -> str:
+        return self._symbol
+
+    @property
+    def synced(self) -> bool:
+        return self._last_update_id is not None
+
+    @property
+    def last_update_id(self) -> int | None:
+        return self._last_update_id
+
+    def _apply(self, diff: dict[str, typing.Any]) -> None:
+        for price, quantity in diff["b"]:
+            self._bids.update(price=price, quantity=quantity)
+
+        for price, quantity in diff["a"]:
+            self._asks.update(price=price, quantity=quantity)
+
+        self._last_update_id = diff["u"]
+
+    def _reset(self) -> None:
+        self._bids.clear()
+        self._asks.clear()
+        self._last_update_id = None
+
+    def apply_diff(self, diff: dict[str, typing.Any]) -> bool:
+        """Apply a depth diff event, returns False if a gap was detected"""
+
+        with self._lock:
+            if self._last_update_id is None:
+                self._buffer.append(diff)
+
+                return True
+
+            if diff["u"] <= self._last_update_id:
+                return True
+
+            # the first diff after a snapshot may overlap it
+            if diff["U"] > self._last_update_id + 1:
+                self.log.warning(
+                    f"Gap in depth diffs of [{self._symbol}] "
+                    f"(expected: {self._last_update_id + 1}, got: {diff['U']})"
+                )
+
+                self._reset()
+                self._buffer.append(diff)
+
+                return False
+
+            self._apply(diff=diff)
+
+            return True
+
+    def apply_snapshot(self, snapshot: dict[str, typing.Any]) -> bool:
+        """Sync the book from a REST snapshot, returns True if synced"""
+
+        with self._lock:
+            if self._last_update_id is not None:
+                # a synced book is at least as recent as the diffs received
+                return True
+
+            last_update_id: int = snapshot["lastUpdateId"]
+
+            while len(self._buffer) > 0 and self._buffer[0]["u"] <= last_update_id:
+                self._buffer.popleft()
+
+            if len(self._buffer) > 0 and self._buffer[0]["U"] > last_update_id + 1:
+                self.log.warning(
+                    f"Snapshot of [{self._symbol}] is older than the buffered "
+                    f"diffs, waiting for the next one"
+                )
+
+                return False
+
+            for price, quantity in snapshot["bids"]:
+                self._bids.update(price=price, quantity=quantity)
+
+            for price, quantity in snapshot["asks"]:
+                self._asks.update(price=price, quantity=quantity)
+
+            self._last_update_id = last_update_id
+
+            while len(self._buffer) > 0:
+                diff: dict[str, typing.Any] = self._buffer.popleft()
+
+                if diff["U"] > self._last_update_id + 1:
+                    self.log.warning(f"Gap in buffered depth diffs of [{self._symbol}]")
+
+                    self._reset()
+                    self._buffer.appendleft(diff)
+
+                    return False
+
+                self._apply(diff=diff)
+
+            return True
+
+    def top(self) -> tuple[Level | None, Level | None]:
+        """Best bid and ask"""
+
+        with self._lock:
+            return self._bids.best(), self._asks.best()
+
+    def get_view(self, depth: int) -> OrderBookView:
+        with self._lock:
+            return OrderBookView(
+                symbol=self._symbol,
+                synced=self._last_update_id is not None,
+                last_update_id=self._last_update_id,
+                bids=self._bids.get_levels(depth=depth),
+                asks=self._asks.get_levels(depth=depth),
+            )
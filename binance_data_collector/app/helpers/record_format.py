@@ -0,0 +1,483 @@
+# coding=utf-8
+"""Record formats of the data files.
+
+The JSON format stores every combined stream frame as a line of text. The
+binary format packs trade and depth diff frames into fixed width records,
+prices and quantities as int64 scaled by the precision of the symbol:
+
+    file header  u8 type=0, 4s magic, u8 version, u8 kind, u8 price scale,
+                 u8 quantity scale, u8 text decimals, u8 length + stream
+    trade        u8 type=1, q event time, q receive time, q trade id,
+                 q price, q quantity, q trade time, u8 flags (m, M)
+    depth diff   u8 type=2, q event time, q receive time, q first update id,
+                 q last update id, I bids, I asks, (q price, q quantity)...
+                 every price as the difference to the previous one
+    raw frame    u8 type=3, q receive time, I length, JSON frame
+
+A file header starts every compressed block of the data file (and precedes
+any change of stream), so every block can be decoded on its own.
+Frames which do not fit the fixed layout (unknown fields, more decimals than
+the scale) are kept as raw frames, so decoding always gives back the frames
+as received.
+"""
+from __future__ import annotations
+
+__all__ = [
+    "RecordEncoder",
+    "JsonRecordEncoder",
+    "BinaryRecordEncoder",
+    "RecordKind",
+    "Record",
+    "create_encoder",
+    "get_scale",
+    "iter_records",
+    "decode_records",
+]
+
+import abc
+import dataclasses
+import enum
+import struct
+import time
+import typing
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+MAGIC: bytes = b"BDCR"
+VERSION: int = 1
+# decimals of the price and quantity strings of the exchange
+TEXT_DECIMALS: int = 8
+
+HEADER_TYPE: int = 0
+TRADE_TYPE: int = 1
+DEPTH_TYPE: int = 2
+RAW_TYPE: int = 3
+
+HEADER: struct.Struct = struct.Struct("<B4sBBBBBB")
+TRADE: struct.Struct = struct.Struct("<BqqqqqqB")
+DEPTH: struct.Struct = struct.Struct("<BqqqqII")
+RAW: struct.Struct = struct.Struct("<BqI")
+
+TRADE_KEYS: tuple[str, ...] = ("e", "E", "s", "t", "p", "q", "T", "m", "M")
+DEPTH_KEYS: tuple[str, ...] = ("e", "E", "s", "U", "u", "b", "a")
+
+
+class RecordKind(enum.IntEnum):
+    TRADE = 1
+    DEPTH = 2
+
+
+def get_scale(size: str | None) -> int:
+    """Decimals of a tick or step size (e.g. `0.01000000` -> 2)"""
+
+    if size is None or '.' not in size:
+        return TEXT_DECIMALS
+
+    decimals: str = size.split('.', 1)[1].rstrip('0')
+
+    if len(decimals) > 0:
+        return len(decimals)
+
+    return 0 if float(size) > 0 else TEXT_DECIMALS
+
+
+class PrecisionError(ValueError):
+    pass
+
+
+def _to_scaled(text: str, scale: int) -> int:
+    """Scaled integer of a decimal string with TEXT_DECIMALS decimals"""
+
+    if len(text) <= TEXT_DECIMALS or text[-TEXT_DECIMALS - 1] != '.':
+        raise PrecisionError(f"Unexpected decimal [{text}]")
+
+    value: int = int(text.replace('.', '', 1))
+
+    if scale == TEXT_DECIMALS:
+        return value
+
+    value, remainder = divmod(value, 10 ** (TEXT_DECIMALS - scale))
+
+    if remainder != 0:
+        raise PrecisionError(f"[{text}] exceeds {scale} decimals")
+
+    return value
+
+
+def _from_scaled(value: int, scale: int, decimals: int) -> str:
+    text: str = str(value * 10 ** (decimals - scale)).rjust(decimals + 1, '0')
+
+    return f"{text[:-decimals]}.{text[-decimals:]}" if decimals else text
+
+
+class RecordEncoder(metaclass=abc.ABCMeta):
+    """Turn the frames of a channel into the records of its data file"""
+
+    name: str
+
+    def reset(self) -> None:
+        """Called before the first record of every block"""
+
+    @abc.abstractmethod
+    def encode_raw(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def encode_data(self, data: dict[str, typing.Any]) -> bytes:
+        raise NotImplementedError
+
+
+class JsonRecordEncoder(RecordEncoder):
+    name: str = "json"
+
+    def encode_raw(self, data: bytes) -> bytes:
+        return data + b'\n'
+
+    def encode_data(self, data: dict[str, typing.Any]) -> bytes:
+        return json.dumps(data).encode("utf8") + b'\n'
+
+
+class BinaryRecordEncoder(RecordEncoder):
+    """Encode the frames of a single data file, in order"""
+
+    name: str = "bin"
+
+    def __init__(
+        self,
+        kind: RecordKind,
+        price_scale: int = TEXT_DECIMALS,
+        quantity_scale: int = TEXT_DECIMALS,
+    ) -> None:
+        self._kind: RecordKind = kind
+        self._price_scale: int = price_scale
+        self._quantity_scale: int = quantity_scale
+
+        # stream of the last written file header
+        self._stream: str | None = None
+        self._header_pending: bool = True
+
+    def reset(self) -> None:
+        self._header_pending = True
+
+    def _header(self, stream: str | None) -> bytes:
+        """File header if the record starts a block or changes the stream"""
+
+        if stream is None:
+            if not self._header_pending:
+                return b""
+
+            # a raw frame, keep the stream of the previous header
+            stream = self._stream or ""
+        elif not self._header_pending and stream == self._stream:
+            return b""
+
+        self._stream = stream
+        self._header_pending = False
+
+        stream: bytes = stream.encode("utf8")
+
+        return HEADER.pack(
+            HEADER_TYPE,
+            MAGIC,
+            VERSION,
+            self._kind,
+            self._price_scale,
+            self._quantity_scale,
+            TEXT_DECIMALS,
+            len(stream),
+        ) + stream
+
+    def encode_raw(self, data: bytes) -> bytes:
+        try:
+            return self._encode(frame=json.loads(data), raw=data)
+        except ValueError:
+            return self._encode_raw(data=data, received_at=time.time_ns())
+
+    def _encode_raw(self, data: bytes, received_at: int) -> bytes:
+        return (
+            self._header(stream=None)
+            + RAW.pack(RAW_TYPE, received_at, len(data))
+            + data
+        )
+
+    def encode_data(self, data: dict[str, typing.Any]) -> bytes:
+        return self._encode(frame=data, raw=None)
+
+    def _encode(
+        self,
+        frame: dict[str, typing.Any],
+        raw: bytes | None,
+    ) -> bytes:
+        received_at: int = time.time_ns()
+
+        try:
+            stream: str = frame["stream"]
+            data: dict[str, typing.Any] = frame["data"]
+
+            # the decoder derives the symbol from the stream
+            if data["s"] != stream.split('@', 1)[0].upper():
+                raise PrecisionError("Unexpected symbol")
+
+            if self._kind == RecordKind.TRADE:
+                record: bytes = self._encode_trade(data=data, received_at=received_at)
+            else:
+                record: bytes = self._encode_depth(data=data, received_at=received_at)
+
+            return self._header(stream=stream) + record
+        except (PrecisionError, KeyError, TypeError, AttributeError, struct.error):
+            if raw is None:
+                raw = json.dumps(frame).encode("utf8")
+
+            return self._encode_raw(data=raw, received_at=received_at)
+
+    def _encode_trade(self, data: dict[str, typing.Any], received_at: int) -> bytes:
+        if (
+            tuple(data.keys()) != TRADE_KEYS
+            or data["e"] != "trade"
+            or type(data["m"]) is not bool
+            or type(data["M"]) is not bool
+        ):
+            raise PrecisionError("Unexpected trade fields")
+
+        return TRADE.pack(
+            TRADE_TYPE,
+            data["E"],
+            received_at,
+            data["t"],
+            _to_scaled(text=data["p"], scale=self._price_scale),
+            _to_scaled(text=data["q"], scale=self._quantity_scale),
+            data["T"],
+            int(data["m"]) | int(data["M"]) << 1,
+        )
+
+    def _encode_depth(self, data: dict[str, typing.Any], received_at: int) -> bytes:
+        if tuple(data.keys()) != DEPTH_KEYS or data["e"] != "depthUpdate":
+            raise PrecisionError("Unexpected depth fields")
+
+        price_scale: int = self._price_scale
+        quantity_scale: int = self._quantity_scale
+
+        levels: list[int] = []
+        previous: int = 0
+
+        # the levels are sorted, small differences compress well
+        for price, quantity in (*data["b"], *data["a"]):
+            scaled: int = _to_scaled(text=price, scale=price_scale)
+
+            levels.append(scaled - previous)
+            levels.append(_to_scaled(text=quantity, scale=quantity_scale))
+
+            previous = scaled
+
+        return DEPTH.pack(
+            DEPTH_TYPE,
+            data["E"],
+            received_at,
+            data["U"],
+            data["u"],
+            len(data["b"]),
+            len(data["a"]),
+        ) + struct.pack(f"<{len(levels)}q", *levels)
+
+
+def create_encoder(
+    name: str,
+    channel: str,
+    tick_size: str | None = None,
+    step_size: str | None = None,
+) -> RecordEncoder:
+    """Encoder of a channel, the binary format only covers trades and diffs"""
+
+    if name == JsonRecordEncoder.name:
+        return JsonRecordEncoder()
+
+    if name != BinaryRecordEncoder.name:
+        raise RuntimeError(f"Unsupported data file format: `{name}`")
+
+    kinds: dict[str, RecordKind] = {
+        "trade": RecordKind.TRADE,
+        "depth": RecordKind.DEPTH,
+    }
+
+    if channel not in kinds:
+        return JsonRecordEncoder()
+
+    return BinaryRecordEncoder(
+        kind=kinds[channel],
+        price_scale=get_scale(size=tick_size),
+        quantity_scale=get_scale(size=step_size),
+    )
+
+
+@dataclasses.dataclass(frozen=True)
+class Record(object):
+    """A decoded record, `frame` is the frame as received"""
+
+    received_at: int
+    event_time: int | None
+    # trade id, or the first/last update id of a depth diff
+    first_id: int | None
+    last_id: int | None
+    frame: dict[str, typing.Any] | None = None
+    raw: bytes | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class _Header(object):
+    kind: RecordKind
+    price_scale: int
+    quantity_scale: int
+    decimals: int
+    stream: str
+    symbol: str
+
+
+def _read_header(data: bytes, offset: int) -> tuple[_Header, int]:
+    _, magic, version, kind, price_scale, quantity_scale, decimals, length = \
+        HEADER.unpack_from(data, offset)
+
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Unsupported data file (version {version})")
+
+    offset += HEADER.size
+    stream: str = data[offset:offset + length].decode("utf8")
+
+    return _Header(
+        kind=RecordKind(kind),
+        price_scale=price_scale,
+        quantity_scale=quantity_scale,
+        decimals=decimals,
+        stream=stream,
+        symbol=stream.split('@', 1)[0].upper(),
+    ), offset + length
+
+
+def iter_records(data: bytes, frames: bool = True) -> typing.Iterator[Record]:
+    """Decode the records of binary data, the frames only if asked for"""
+
+    header: _Header | None = None
+    offset: int = 0
+    size: int = len(data)
+
+    while offset < size:
+        record_type: int = data[offset]
+
+        if record_type == HEADER_TYPE:
+            header, offset = _read_header(data=data, offset=offset)
+
+            continue
+
+        if record_type == RAW_TYPE:
+            _, received_at, length = RAW.unpack_from(data, offset)
+            offset += RAW.size
+
+            raw: bytes = data[offset:offset + length]
+            offset += length
+
+            yield Record(
+                received_at=received_at,
+                event_time=None,
+                first_id=None,
+                last_id=None,
+                raw=raw,
+            )
+
+            continue
+
+        if header is None:
+            raise ValueError("Record before the file header")
+
+        if record_type == TRADE_TYPE:
+            (
+                _, event_time, received_at, trade_id,
+                price, quantity, trade_time, flags,
+            ) = TRADE.unpack_from(data, offset)
+            offset += TRADE.size
+
+            frame: dict[str, typing.Any] | None = None
+
+            if frames:
+                frame = {
+                    "stream": header.stream,
+                    "data": {
+                        "e": "trade",
+                        "E": event_time,
+                        "s": header.symbol,
+                        "t": trade_id,
+                        "p": _from_scaled(price, header.price_scale, header.decimals),
+                        "q": _from_scaled(quantity, header.quantity_scale, header.decimals),
+                        "T": trade_time,
+                        "m": bool(flags & 1),
+                        "M": bool(flags & 2),
+                    },
+                }
+
+            yield Record(
+                received_at=received_at,
+                event_time=event_time,
+                first_id=trade_id,
+                last_id=trade_id,
+                frame=frame,
+            )
+        elif record_type == DEPTH_TYPE:
+            _, event_time, received_at, first, last, bids, asks = \
+                DEPTH.unpack_from(data, offset)
+            offset += DEPTH.size
+
+            count: int = 2 * (bids + asks)
+            levels: tuple[int, ...] = struct.unpack_from(f"<{count}q", data, offset)
+            offset += count * 8
+
+            frame: dict[str, typing.Any] | None = None
+
+            if frames:
+                price_scale: int = header.price_scale
+                quantity_scale: int = header.quantity_scale
+                decimals: int = header.decimals
+
+                pairs: list[list[str]] = []
+                price: int = 0
+
+                for i in range(0, count, 2):
+                    price += levels[i]
+
+                    pairs.append([
+                        _from_scaled(price, price_scale, decimals),
+                        _from_scaled(levels[i + 1], quantity_scale, decimals),
+                    ])
+
+                frame = {
+                    "stream": header.stream,
+                    "data": {
+                        "e": "depthUpdate",
+                        "E": event_time,
+                        "s": header.symbol,
+                        "U": first,
+                        "u": last,
+                        "b": pairs[:bids],
+                        "a": pairs[bids:],
+                    },
+                }
+
+            yield Record(
+                received_at=received_at,
+                event_time=event_time,
+                first_id=first,
+                last_id=last,
+                frame=frame,
+            )
+        else:
+            raise ValueError(f"Unknown record type {record_type} at {offset}")
+
+
+def decode_records(data: bytes) -> typing.Iterator[bytes]:
+    """JSON lines of binary data, as the JSON format would have stored it"""
+
+    for record in iter_records(data=data):
+        if record.raw is not None:
+            yield record.raw + b'\n'
+        else:
+            yield json.dumps(record.frame).encode("utf8") + b'\n'
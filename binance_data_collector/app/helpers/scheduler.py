@@ -0,0 +1,276 @@
+# coding=utf-8
+from __future__ import annotations
+
+__all__ = ["Job", "JobMetrics", "Scheduler"]
+
+import concurrent.futures
+import dataclasses
+import functools
+import heapq
+import itertools
+import math
+import threading
+import time
+import typing
+
+from binance_data_collector.api import Injectable
+from binance_data_collector.api.lifecycle import OnDestroy, OnInit
+from binance_data_collector.environments import environment
+from binance_data_collector.log import LoggingMixin
+
+
+@dataclasses.dataclass(frozen=True)
+class JobMetrics(object):
+    name: str
+    jobs: int
+    runs: int
+    # runs left out because the previous one was still running
+    skipped: int
+    failures: int
+    run_time_ms_avg: float
+    run_time_ms_max: float
+    lateness_ms_avg: float
+    lateness_ms_max: float
+
+
+class Job(object):
+    def __init__(
+        self,
+        name: str,
+        callback: typing.Callable[[], typing.Any],
+        period_s: float | None,
+    ) -> None:
+        self.name: str = name
+        self.callback: typing.Callable[[], typing.Any] = callback
+        self.period_s: float | None = period_s
+
+        self.cancelled: bool = False
+        self.running: bool = False
+        self.idle: threading.Event = threading.Event()
+        self.idle.set()
+
+    def __repr__(self) -> str:
+        return f"Job(name={self.name}, period_s={self.period_s})"
+
+
+class _JobStats(object):
+    def __init__(self) -> None:
+        self.jobs: int = 0
+        self.runs: int = 0
+        self.skipped: int = 0
+        self.failures: int = 0
+        self.run_time_s: float = 0.0
+        self.run_time_s_max: float = 0.0
+        self.lateness_s: float = 0.0
+        self.lateness_s_max: float = 0.0
+
+
+@Injectable()
+class Scheduler(LoggingMixin, OnInit, OnDestroy):
+    """Run jobs at monotonic deadlines on a pool of worker threads.
+
+    Deadlines are kept in a heap and waited for by a single dispatcher
+    thread, which never runs a job itself. A periodic job is scheduled
+    from its previous deadline, not from its last run, so it does not
+    drift. A run is skipped if the previous one is still in progress.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, int, Job]] = []
+        self._sequence: typing.Iterator[int] = itertools.count()
+
+        self._executor: concurrent.futures.ThreadPoolExecutor = \
+            concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(1, environment.scheduler_workers),
+                thread_name_prefix="scheduler",
+            )
+        self._thread: threading.Thread = threading.Thread(
+            target=self._dispatch,
+            name="scheduler",
+            daemon=True,
+        )
+
+        self._stats: dict[str, _JobStats] = {}
+
+        self._stopped: bool = False
+        self._condition: threading.Condition = threading.Condition()
+
+    def _push(self, job: Job, deadline: float) -> None:
+        # must be called with the condition held
+        heapq.heappush(self._heap, (deadline, next(self._sequence), job))
+
+        self._condition.notify()
+
+    def _add(self, job: Job, delay_s: float) -> Job:
+        with self._condition:
+            self._stats.setdefault(job.name, _JobStats()).jobs += 1
+            self._push(job=job, deadline=time.monotonic() + max(0.0, delay_s))
+
+        return job
+
+    def call_later(
+        self,
+        name: str,
+        delay_s: float,
+        callback: typing.Callable[[], typing.Any],
+    ) -> Job:
+        """Run the callback once after the delay"""
+
+        return self._add(
+            job=Job(name=name, callback=callback, period_s=None),
+            delay_s=delay_s,
+        )
+
+    def call_every(
+        self,
+        name: str,
+        period_s: float,
+        callback: typing.Callable[[], typing.Any],
+        delay_s: float = 0.0,
+    ) -> Job:
+        """Run the callback every period, the first time after the delay"""
+
+        return self._add(
+            job=Job(name=name, callback=callback, period_s=period_s),
+            delay_s=delay_s,
+        )
+
+    def cancel(self, job: Job) -> None:
+        """Cancel the job and wait for its running callback to return.
+
+        Must not be called from the callback of the job itself.
+        """
+
+        with self._condition:
+            if not job.cancelled:
+                job.cancelled = True
+                self._stats[job.name].jobs -= 1
+
+        job.idle.wait()
+
+    def _run(self, job: Job, deadline: float) -> None:
+        started_at: float = time.monotonic()
+        failed: bool = False
+
+        try:
+            job.callback()
+        except Exception as e:
+            failed = True
+
+            self.log.exception(f"Job [{job.name}] failed", exc_info=e)
+        finally:
+            run_time_s: float = time.monotonic() - started_at
+            lateness_s: float = started_at - deadline
+
+            with self._condition:
+                stats: _JobStats = self._stats[job.name]
+                stats.runs += 1
+                stats.failures += int(failed)
+                stats.run_time_s += run_time_s
+                stats.run_time_s_max = max(stats.run_time_s_max, run_time_s)
+                stats.lateness_s += lateness_s
+                stats.lateness_s_max = max(stats.lateness_s_max, lateness_s)
+
+                job.running = False
+                job.idle.set()
+
+    def _next_deadline(self, job: Job, deadline: float, now: float) -> float:
+        deadline += job.period_s
+
+        if deadline <= now:
+            # far behind, skip the missed runs instead of bursting them
+            missed: int = math.ceil((now - deadline) / job.period_s)
+
+            self._stats[job.name].skipped += missed
+            deadline += missed * job.period_s
+
+        return deadline
+
+    def _dispatch(self) -> None:
+        with self._condition:
+            while not self._stopped:
+                if len(self._heap) == 0:
+                    self._condition.wait()
+
+                    continue
+
+                deadline, _, job = self._heap[0]
+                now: float = time.monotonic()
+
+                if deadline > now:
+                    self._condition.wait(timeout=deadline - now)
+
+                    continue
+
+                heapq.heappop(self._heap)
+
+                if job.cancelled:
+                    continue
+
+                if job.period_s is not None:
+                    self._push(
+                        job=job,
+                        deadline=self._next_deadline(
+                            job=job,
+                            deadline=deadline,
+                            now=now,
+                        ),
+                    )
+
+                if job.running:
+                    self._stats[job.name].skipped += 1
+
+                    continue
+
+                job.running = True
+                job.idle.clear()
+
+                try:
+                    self._executor.submit(self._run, job, deadline).add_done_callback(
+                        functools.partial(self._release, job),
+                    )
+                except RuntimeError:
+                    # the executor is shut down
+                    job.running = False
+                    job.idle.set()
+
+    def _release(self, job: Job, future: concurrent.futures.Future) -> None:
+        # a run cancelled at shutdown never reaches _run
+        if future.cancelled():
+            with self._condition:
+                job.running = False
+                job.idle.set()
+
+    def get_metrics(self) -> list[JobMetrics]:
+        with self._condition:
+            return [
+                JobMetrics(
+                    name=name,
+                    jobs=stats.jobs,
+                    runs=stats.runs,
+                    skipped=stats.skipped,
+                    failures=stats.failures,
+                    run_time_ms_avg=(
+                        stats.run_time_s / stats.runs * 1000
+                        if stats.runs > 0 else 0.0
+                    ),
+                    run_time_ms_max=stats.run_time_s_max * 1000,
+                    lateness_ms_avg=(
+                        stats.lateness_s / stats.runs * 1000
+                        if stats.runs > 0 else 0.0
+                    ),
+                    lateness_ms_max=stats.lateness_s_max * 1000,
+                )
+                for name, stats in self._stats.items()
+            ]
+
+    def on_init(self) -> None:
+        self._thread.start()
+
+    def on_destroy(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+        self._thread.join()
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,330 @@
+# coding=utf-8
+"""Time segments of the data files and their finalisation.
+
+A segment is written to `<name>.partial` (indexed by `<name>.partial.idx`)
+and only renamed to its final name once it is closed, so a final name
+always holds a complete file. The rename is followed by an entry in the
+`manifest.jsonl` of the directory.
+
+Partial files left behind by a crash are cut back to their last indexed
+block, which drops at most the block being written, and finalised the
+same way by `recover_partials`. Partial files without an index are not
+ours to cut, they are renamed to `<name>.orphan` and kept for inspection.
+"""
+from __future__ import annotations
+
+__all__ = [
+    "DAY_MINUTES",
+    "MANIFEST_NAME",
+    "ORPHAN_SUFFIX",
+    "PARTIAL_SUFFIX",
+    "SegmentCallback",
+    "SegmentFile",
+    "SegmentInfo",
+    "append_manifest",
+    "commit_segment",
+    "finalize_partial",
+    "find_partials",
+    "format_segment",
+    "get_partial_path",
+    "get_segment_start",
+    "recover_partials",
+    "to_ms",
+]
+
+import dataclasses
+import datetime
+import hashlib
+import logging
+import os
+import threading
+import typing
+from pathlib import Path
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+from .block_index import (
+    BlockIndex,
+    BlockInfo,
+    BlockStats,
+    ENTRY,
+    INDEX_HEADER,
+    get_index_path,
+    load_index,
+)
+
+DAY_MINUTES: int = 24 * 60
+PARTIAL_SUFFIX: str = ".partial"
+ORPHAN_SUFFIX: str = ".orphan"
+MANIFEST_NAME: str = "manifest.jsonl"
+
+# serializes the appends of the segments of a directory
+manifest_lock: threading.Lock = threading.Lock()
+
+
+def get_partial_path(path: Path) -> Path:
+    return path.with_name(path.name + PARTIAL_SUFFIX)
+
+
+def get_segment_start(now: datetime.datetime, minutes: int) -> datetime.datetime:
+    """Start of the segment of `now`, segments are aligned to midnight"""
+
+    midnight: datetime.datetime = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed: int = (now.hour * 60 + now.minute) // minutes * minutes
+
+    return midnight + datetime.timedelta(minutes=elapsed)
+
+
+def format_segment(start: datetime.datetime, minutes: int) -> str:
+    """`ts` of the file name, the date alone for daily segments"""
+
+    if minutes == DAY_MINUTES:
+        return start.date().isoformat()
+
+    # no colons, they are not allowed in every file system
+    return start.strftime("%Y-%m-%dT%H-%M")
+
+
+def to_ms(dt: datetime.datetime) -> int:
+    return int(dt.timestamp() * 1000)
+
+
+@dataclasses.dataclass(frozen=True)
+class SegmentFile(object):
+    """Summary of a finalised data file"""
+
+    path: Path
+    symbol: str
+    name: str
+    start_ms: int
+    end_ms: int
+    blocks: int
+    records: int
+    # compressed, as stored
+    size: int
+    raw_size: int
+    min_time: int
+    max_time: int
+    first_id: int
+    last_id: int
+    sha256: str
+
+
+SegmentCallback: typing.TypeAlias = typing.Callable[[SegmentFile], None]
+
+
+@dataclasses.dataclass(frozen=True)
+class SegmentInfo(object):
+    """Manifest entry of a segment, paths are relative to the data root"""
+
+    symbol: str
+    name: str
+    path: str
+    start_ms: int
+    end_ms: int
+    blocks: int
+    records: int
+    size: int
+    raw_size: int
+    min_time: int
+    max_time: int
+    first_id: int
+    last_id: int
+    sha256: str
+    recovered: bool = False
+
+    @classmethod
+    def create(
+        cls,
+        segment: SegmentFile,
+        data_root: Path,
+        recovered: bool = False,
+    ) -> SegmentInfo:
+        return cls(
+            symbol=segment.symbol,
+            name=segment.name,
+            path=segment.path.relative_to(data_root).as_posix(),
+            start_ms=segment.start_ms,
+            end_ms=segment.end_ms,
+            blocks=segment.blocks,
+            records=segment.records,
+            size=segment.size,
+            raw_size=segment.raw_size,
+            min_time=segment.min_time,
+            max_time=segment.max_time,
+            first_id=segment.first_id,
+            last_id=segment.last_id,
+            sha256=segment.sha256,
+            recovered=recovered,
+        )
+
+
+def sync_directory(path: Path) -> None:
+    """Persist the renames in a directory"""
+
+    fd: int = os.open(path, os.O_RDONLY)
+
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def commit_segment(path: Path, sync: bool = True) -> None:
+    """Rename the partial files of `path` to their final names"""
+
+    # the index first, a final data file always has its final index
+    partial_path: Path = get_partial_path(path=path)
+    partial_index_path: Path = get_index_path(path=partial_path)
+
+    if partial_index_path.exists():
+        os.replace(partial_index_path, get_index_path(path=path))
+
+    os.replace(partial_path, path)
+
+    if sync:
+        sync_directory(path=path.parent)
+
+
+def append_manifest(info: SegmentInfo, directory: Path, sync: bool = True) -> None:
+    line: bytes = json.dumps(dataclasses.asdict(info)).encode("utf8") + b'\n'
+
+    with manifest_lock:
+        with open(directory / MANIFEST_NAME, mode="ab", buffering=0) as f:
+            f.write(line)
+
+            if sync:
+                os.fsync(f.fileno())
+
+
+def finalize_partial(path: Path) -> SegmentFile | None:
+    """Repair, checksum and commit the partial files of `path`.
+
+    Blocks past the last index entry may be torn and are cut off, as are
+    entries pointing past the data. Returns None for an empty segment,
+    whose partial files are removed. A partial file without an index is
+    renamed to its orphan name and raises ValueError, as does an index
+    which is not ours (left in place).
+    """
+
+    partial_path: Path = get_partial_path(path=path)
+    index_path: Path = get_index_path(path=partial_path)
+
+    # the crash came between the renames of the index and the data
+    if not index_path.exists() and get_index_path(path=path).exists():
+        os.replace(get_index_path(path=path), index_path)
+
+    size: int = partial_path.stat().st_size
+
+    if not index_path.exists():
+        if size == 0:
+            partial_path.unlink()
+
+            return None
+
+        orphan_path: Path = path.with_name(path.name + ORPHAN_SUFFIX)
+        os.replace(partial_path, orphan_path)
+
+        raise ValueError(f"No index for `{partial_path}`, kept as `{orphan_path.name}`")
+
+    index: BlockIndex = load_index(index_path=index_path)
+
+    blocks: list[BlockInfo] = [b for b in index.blocks if b.end <= size]
+
+    if len(blocks) == 0:
+        partial_path.unlink()
+        index_path.unlink(missing_ok=True)
+
+        return None
+
+    # blocks are contiguous, the valid data ends with the last kept one
+    end: int = blocks[-1].end
+    os.truncate(partial_path, end)
+    os.truncate(index_path, INDEX_HEADER.size + len(blocks) * ENTRY.size)
+
+    digest: hashlib._Hash = hashlib.sha256()
+
+    with open(partial_path, mode="rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    stats: BlockStats = BlockStats()
+    for block in blocks:
+        stats.merge(info=block)
+
+    commit_segment(path=path)
+
+    return SegmentFile(
+        path=path,
+        symbol=index.symbol,
+        name=index.name,
+        start_ms=index.start_ms,
+        end_ms=index.end_ms,
+        blocks=len(blocks),
+        records=stats.records,
+        size=end,
+        raw_size=sum(b.size for b in blocks),
+        min_time=stats.min_time,
+        max_time=stats.max_time,
+        first_id=stats.first_id,
+        last_id=stats.last_id,
+        sha256=digest.hexdigest(),
+    )
+
+
+def recover_partials(directory: Path) -> list[SegmentFile]:
+    """Finalise the partial data files left in a directory.
+
+    A file which cannot be finalised is logged and skipped, it does not
+    stop the recovery of the others.
+    """
+
+    if not directory.is_dir():
+        return []
+
+    recovered: list[SegmentFile] = []
+
+    for partial_path in sorted(directory.glob(f"*{PARTIAL_SUFFIX}")):
+        path: Path = partial_path.with_name(partial_path.name[:-len(PARTIAL_SUFFIX)])
+
+        if path.exists():
+            continue
+
+        try:
+            segment: SegmentFile | None = finalize_partial(path=path)
+        except Exception as e:
+            logging.getLogger(__name__).exception(
+                f"Could not recover `{partial_path}`",
+                exc_info=e,
+            )
+
+            continue
+
+        if segment is not None:
+            recovered.append(segment)
+
+    return recovered
+
+
+def find_partials(directory: Path, name: str) -> list[Path]:
+    """Partial data files of a route being written, oldest segment first"""
+
+    if not directory.is_dir():
+        return []
+
+    partials: list[tuple[int, Path]] = []
+
+    for partial_path in directory.glob(f"*{PARTIAL_SUFFIX}"):
+        try:
+            index: BlockIndex = load_index(index_path=get_index_path(path=partial_path))
+        except (FileNotFoundError, ValueError):
+            # committed meanwhile, or not ours
+            continue
+
+        if index.name == name:
+            partials.append((index.start_ms, partial_path))
+
+    return [path for _, path in sorted(partials)]
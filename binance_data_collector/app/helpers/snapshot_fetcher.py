@@ -0,0 +1,306 @@
+# coding=utf-8
+from __future__ import annotations
+
+__all__ = ["SnapshotFetcher", "SnapshotMetrics", "WeightBudget"]
+
+import collections
+import concurrent.futures
+import dataclasses
+import threading
+import time
+import typing
+
+import requests
+import requests.adapters
+
+from binance_data_collector.log import LoggingMixin
+
+from binance_data_collector.app.models.currency_pair import CurrencyPair
+
+DEPTH_URL: str = "https://api.binance.com/api/v3/depth"
+USED_WEIGHT_HEADER: str = "X-MBX-USED-WEIGHT-1M"
+
+
+def get_depth_weight(limit: int) -> int:
+    """Request weight of the depth endpoint for the given limit"""
+
+    if limit <= 100:
+        return 5
+
+    if limit <= 500:
+        return 25
+
+    if limit <= 1000:
+        return 50
+
+    return 250
+
+
+SnapshotCallback: typing.TypeAlias = typing.Callable[
+    [CurrencyPair, dict[str, typing.Any]],
+    None,
+]
+
+
+@dataclasses.dataclass(frozen=True)
+class SnapshotMetrics(object):
+    workers: int
+    requests: int
+    failures: int
+    throttled: int
+    # as reported by the last response, shared by everything on the IP
+    used_weight: int
+    weight_budget: int
+    # sent by this process in the current and the previous minute
+    sent_weight: int
+    sent_weight_last: int
+    latency_ms_avg: float
+    latency_ms_max: float
+
+
+class WeightBudget(object):
+    """Request weight allowed per minute, synced with the server headers.
+
+    The server counts the weight of the IP in fixed one minute windows, its
+    count can be higher than the local one (other processes on the IP).
+    The processes of a cluster split the limit, each one sends at most its
+    `share` while the count of the IP stays below the whole `limit`.
+    """
+
+    def __init__(self, limit: int, share: int | None = None) -> None:
+        self._limit: int = limit
+        self._share: int = limit if share is None else share
+
+        self._window: int = self._get_window()
+        # of the IP, synced with the server
+        self._used: int = 0
+        # by this process, in the current and the previous window
+        self._sent: int = 0
+        self._sent_last: int = 0
+        self._blocked_until: float = 0.0
+        self._closed: bool = False
+
+        self._condition: threading.Condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def used(self) -> int:
+        return self._used
+
+    @property
+    def sent(self) -> tuple[int, int]:
+        """Weight sent in the current and the previous window"""
+
+        with self._condition:
+            self._roll()
+
+            return self._sent, self._sent_last
+
+    @staticmethod
+    def _get_window() -> int:
+        return int(time.time() // 60)
+
+    def _roll(self) -> None:
+        window: int = self._get_window()
+
+        if window != self._window:
+            self._sent_last = self._sent if window == self._window + 1 else 0
+            self._window = window
+            self._used = 0
+            self._sent = 0
+
+    def acquire(self, weight: int) -> bool:
+        """Wait until the weight fits the budget, returns True if it waited"""
+
+        waited: bool = False
+
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Weight budget is closed")
+
+                self._roll()
+
+                now: float = time.time()
+
+                if now < self._blocked_until:
+                    timeout_s: float = self._blocked_until - now
+                elif (
+                    self._used + weight <= self._limit
+                    and
+                    self._sent + weight <= self._share
+                ):
+                    self._used += weight
+                    self._sent += weight
+
+                    return waited
+                else:
+                    timeout_s: float = (self._window + 1) * 60 - now
+
+                waited = True
+                self._condition.wait(timeout=timeout_s)
+
+    def update(self, used: int) -> None:
+        with self._condition:
+            self._roll()
+            self._used = max(self._used, used)
+
+    def block(self, seconds: float) -> None:
+        """Stop sending requests, the server asked to back off"""
+
+        with self._condition:
+            self._blocked_until = max(self._blocked_until, time.time() + seconds)
+
+    def close(self) -> None:
+        """Release the waiting requests, those fail"""
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class SnapshotFetcher(LoggingMixin):
+    """Fetch depth snapshots concurrently over a pooled HTTP session.
+
+    Every request waits for room in the weight budget first, so a burst of
+    snapshots is spread over as many minutes as the budget requires instead
+    of running into 429 responses.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        weight_budget: int = 3000,
+        weight_share: int | None = None,
+        limit: int = 1000,
+        timeout_s: float = 10.0,
+    ) -> None:
+        self._workers: int = max(1, workers)
+        self._limit: int = limit
+        self._weight: int = get_depth_weight(limit=limit)
+        self._timeout_s: float = timeout_s
+
+        # keep the connections alive, one for every worker
+        self._session: requests.Session = requests.Session()
+        self._session.mount(
+            "https://",
+            requests.adapters.HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=self._workers,
+            ),
+        )
+
+        self._executor: concurrent.futures.ThreadPoolExecutor = \
+            concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._workers,
+                thread_name_prefix="snapshot",
+            )
+
+        self._budget: WeightBudget = WeightBudget(
+            limit=weight_budget,
+            share=weight_share,
+        )
+
+        self._requests: int = 0
+        self._failures: int = 0
+        self._throttled: int = 0
+        self._latencies_ms: collections.deque[float] = \
+            collections.deque(maxlen=1000)
+
+        self._lock: threading.Lock = threading.Lock()
+
+    def fetch(self, currency_pair: CurrencyPair) -> dict[str, typing.Any]:
+        if self._budget.acquire(weight=self._weight):
+            with self._lock:
+                self._throttled += 1
+
+        started_at: float = time.monotonic()
+
+        response: requests.Response = self._session.get(
+            url=DEPTH_URL,
+            params={"symbol": currency_pair.upper(''), "limit": self._limit},
+            timeout=self._timeout_s,
+        )
+
+        latency_ms: float = (time.monotonic() - started_at) * 1000
+
+        used_weight: str | None = response.headers.get(USED_WEIGHT_HEADER, None)
+
+        if used_weight is not None:
+            self._budget.update(used=int(used_weight))
+
+        with self._lock:
+            self._requests += 1
+            self._latencies_ms.append(latency_ms)
+
+        if response.status_code in (418, 429):
+            retry_after_s: float = float(response.headers.get("Retry-After", 60))
+
+            self.log.warning(
+                f"Request weight exceeded, backing off for {retry_after_s} s"
+            )
+
+            self._budget.block(seconds=retry_after_s)
+
+        response.raise_for_status()
+
+        return response.json()
+
+    def _fetch_and_handle(
+        self,
+        currency_pair: CurrencyPair,
+        callback: SnapshotCallback,
+    ) -> None:
+        try:
+            callback(currency_pair, self.fetch(currency_pair=currency_pair))
+        except Exception as e:
+            with self._lock:
+                self._failures += 1
+
+            self.log.exception(
+                f"Could not snapshot symbol [{currency_pair.symbol}]",
+                exc_info=e,
+            )
+
+    def submit(
+        self,
+        currency_pair: CurrencyPair,
+        callback: SnapshotCallback,
+    ) -> concurrent.futures.Future:
+        """Fetch a single snapshot in the background"""
+
+        return self._executor.submit(
+            self._fetch_and_handle,
+            currency_pair,
+            callback,
+        )
+
+    def get_metrics(self) -> SnapshotMetrics:
+        sent, sent_last = self._budget.sent
+
+        with self._lock:
+            latencies_ms: list[float] = list(self._latencies_ms)
+
+            return SnapshotMetrics(
+                workers=self._workers,
+                requests=self._requests,
+                failures=self._failures,
+                throttled=self._throttled,
+                used_weight=self._budget.used,
+                weight_budget=self._budget.limit,
+                sent_weight=sent,
+                sent_weight_last=sent_last,
+                latency_ms_avg=(
+                    sum(latencies_ms) / len(latencies_ms)
+                    if len(latencies_ms) > 0 else 0.0
+                ),
+                latency_ms_max=max(latencies_ms, default=0.0),
+            )
+
+    def close(self) -> None:
+        self._budget.close()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._session.close()
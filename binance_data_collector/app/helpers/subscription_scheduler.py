@@ -0,0 +1,316 @@
+# coding=utf-8
+from __future__ import annotations
+
+__all__ = ["SubscriptionScheduler", "TokenBucket"]
+
+import dataclasses
+import enum
+import functools
+import itertools
+import threading
+import time
+import typing
+
+from binance_data_collector.log import LoggingMixin
+
+
+class TokenBucket(object):
+    def __init__(self, rate: float, capacity: float) -> None:
+        self._rate: float = rate
+        self._capacity: float = capacity
+
+        self._tokens: float = capacity
+        self._updated_at: float = time.monotonic()
+
+    def _refill(self) -> None:
+        now: float = time.monotonic()
+
+        self._tokens = min(
+            self._capacity,
+            self._tokens + (now - self._updated_at) * self._rate,
+        )
+        self._updated_at = now
+
+    def consume(self, tokens: float = 1.0) -> bool:
+        self._refill()
+
+        if self._tokens < tokens:
+            return False
+
+        self._tokens -= tokens
+
+        return True
+
+    def delay(self, tokens: float = 1.0) -> float:
+        """Seconds until the requested amount of tokens is available"""
+
+        self._refill()
+
+        return max(0.0, (tokens - self._tokens) / self._rate)
+
+
+class SubscriptionMethod(enum.Enum):
+    SUBSCRIBE = "SUBSCRIBE"
+    UNSUBSCRIBE = "UNSUBSCRIBE"
+
+
+@dataclasses.dataclass()
+class PendingRequest(object):
+    method: SubscriptionMethod
+    streams: list[str]
+    sent_at: float
+    attempts: int
+
+
+SendCallback: typing.TypeAlias = typing.Callable[[dict[str, typing.Any]], None]
+CallLaterCallback: typing.TypeAlias = typing.Callable[
+    [float, typing.Callable[[], typing.Any]],
+    None,
+]
+
+
+class SubscriptionScheduler(LoggingMixin):
+    """Pack stream (un)subscriptions into paced frames and track their acks.
+
+    Requests can be queued from any thread, frames are sent by ticks which
+    run through `call_later` (on the reactor thread). While the connection
+    is down requests are dropped, the full stream set is passed again to
+    `connect()`.
+    """
+
+    def __init__(
+        self,
+        send: SendCallback,
+        call_later: CallLaterCallback,
+        messages_per_second: float = 4.0,
+        streams_per_message: int = 200,
+        ack_timeout_s: float = 10.0,
+        max_attempts: int = 3,
+    ) -> None:
+        self._send: SendCallback = send
+        self._call_later: CallLaterCallback = call_later
+
+        self._bucket: TokenBucket = TokenBucket(
+            rate=messages_per_second,
+            capacity=messages_per_second,
+        )
+        self._streams_per_message: int = streams_per_message
+        self._ack_timeout_s: float = ack_timeout_s
+        self._max_attempts: int = max_attempts
+
+        self._ids: typing.Iterator[int] = itertools.count(start=1)
+        # insertion ordered, the method of the latest request for the stream
+        self._queue: dict[str, SubscriptionMethod] = {}
+        self._attempts: dict[str, int] = {}
+        self._pending_subscribe: dict[int, PendingRequest] = {}
+        self._pending_unsubscribe: dict[int, PendingRequest] = {}
+
+        self._connected: bool = False
+        # monotonic deadline of the armed tick, earlier ticks make it stale
+        self._deadline: float | None = None
+        self._ticks: typing.Iterator[int] = itertools.count(start=1)
+        self._tick_key: int = 0
+
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending_subscribe) + len(self._pending_unsubscribe)
+
+    def _schedule(self, delay_s: float) -> None:
+        # must be called with the lock held
+        deadline: float = time.monotonic() + delay_s
+
+        if self._deadline is not None and self._deadline <= deadline:
+            return
+
+        # the armed tick may wait for an ack timeout, arm an earlier one
+        self._deadline = deadline
+        self._tick_key = next(self._ticks)
+        self._call_later(
+            delay_s,
+            functools.partial(self._tick, key=self._tick_key),
+        )
+
+    def _enqueue(
+        self,
+        method: SubscriptionMethod,
+        streams: typing.Iterable[str],
+    ) -> None:
+        with self._lock:
+            if not self._connected:
+                return
+
+            for stream in streams:
+                queued: SubscriptionMethod | None = self._queue.get(stream)
+
+                if queued is not None and queued != method:
+                    # the opposite request was not sent yet, they cancel out
+                    self._queue.pop(stream)
+                    self._attempts.pop(stream, None)
+                else:
+                    self._queue[stream] = method
+
+            if len(self._queue) > 0:
+                self._schedule(delay_s=0.0)
+
+    def subscribe(self, streams: typing.Iterable[str]) -> None:
+        self._enqueue(method=SubscriptionMethod.SUBSCRIBE, streams=streams)
+
+    def unsubscribe(self, streams: typing.Iterable[str]) -> None:
+        self._enqueue(method=SubscriptionMethod.UNSUBSCRIBE, streams=streams)
+
+    def connect(self, streams: typing.Iterable[str]) -> None:
+        """Start over on a fresh connection, subscribe to all streams"""
+
+        with self._lock:
+            self._clear()
+            self._connected = True
+
+        self.subscribe(streams=streams)
+
+    def disconnect(self) -> None:
+        with self._lock:
+            self._clear()
+            self._connected = False
+
+    def _clear(self) -> None:
+        self._queue.clear()
+        self._attempts.clear()
+        self._pending_subscribe.clear()
+        self._pending_unsubscribe.clear()
+
+    def _get_pending_for(
+        self,
+        method: SubscriptionMethod,
+    ) -> dict[int, PendingRequest]:
+        if method == SubscriptionMethod.SUBSCRIBE:
+            return self._pending_subscribe
+
+        return self._pending_unsubscribe
+
+    def acknowledge(self, key: int, error: typing.Any | None = None) -> None:
+        with self._lock:
+            request: PendingRequest | None = None
+
+            if key in self._pending_subscribe:
+                request = self._pending_subscribe.pop(key)
+            elif key in self._pending_unsubscribe:
+                request = self._pending_unsubscribe.pop(key)
+
+            if request is None:
+                return
+
+            for stream in request.streams:
+                self._attempts.pop(stream, None)
+
+        if error is not None:
+            self.log.error(
+                f"{request.method.value} of {len(request.streams)} streams "
+                f"failed: {error}"
+            )
+
+    def _expire(self, now: float) -> None:
+        for pending in [self._pending_subscribe, self._pending_unsubscribe]:
+            for key, request in list(pending.items()):
+                if now - request.sent_at < self._ack_timeout_s:
+                    continue
+
+                pending.pop(key)
+
+                if request.attempts >= self._max_attempts:
+                    self.log.error(
+                        f"{request.method.value} of {len(request.streams)} "
+                        f"streams was not acknowledged, giving up"
+                    )
+
+                    continue
+
+                self.log.warning(
+                    f"{request.method.value} of {len(request.streams)} "
+                    f"streams was not acknowledged, retrying"
+                )
+
+                # retries go first, unless the stream has a newer request
+                self._queue = {
+                    **{
+                        stream: request.method
+                        for stream in request.streams
+                        if stream not in self._queue
+                    },
+                    **self._queue,
+                }
+
+    def _take_frame(self, now: float) -> dict[str, typing.Any]:
+        method: SubscriptionMethod = next(iter(self._queue.values()))
+
+        streams: list[str] = []
+        for stream, value in list(self._queue.items()):
+            if len(streams) >= self._streams_per_message:
+                break
+
+            if value == method:
+                streams.append(stream)
+                self._queue.pop(stream)
+
+        attempts: int = 1 + max(self._attempts.get(s, 0) for s in streams)
+        for stream in streams:
+            self._attempts[stream] = attempts
+
+        key: int = next(self._ids)
+        self._get_pending_for(method=method)[key] = PendingRequest(
+            method=method,
+            streams=streams,
+            sent_at=now,
+            attempts=attempts,
+        )
+
+        return {"method": method.value, "params": streams, "id": key}
+
+    def _next_delay(self, now: float) -> float | None:
+        if len(self._queue) > 0:
+            return self._bucket.delay()
+
+        requests: list[PendingRequest] = [
+            *self._pending_subscribe.values(),
+            *self._pending_unsubscribe.values(),
+        ]
+
+        if len(requests) == 0:
+            return None
+
+        oldest: float = min(request.sent_at for request in requests)
+
+        return max(0.0, oldest + self._ack_timeout_s - now)
+
+    def _tick(self, key: int) -> None:
+        frames: list[dict[str, typing.Any]] = []
+
+        with self._lock:
+            # replaced by an earlier tick
+            if key != self._tick_key:
+                return
+
+            self._deadline = None
+
+            if not self._connected:
+                return
+
+            now: float = time.monotonic()
+
+            self._expire(now=now)
+
+            while len(self._queue) > 0 and self._bucket.consume():
+                frames.append(self._take_frame(now=now))
+
+            delay_s: float | None = self._next_delay(now=now)
+
+            if delay_s is not None:
+                self._schedule(delay_s=delay_s)
+
+        for frame in frames:
+            self._send(frame)
@@ -23,12 +23,16 @@ from binance_data_collector.api import Injectable
 from binance_data_collector.log import LoggingMixin, get_logger_for
 from binance_data_collector.rxpy import Observable, Subject, Subscription
 
+from .frames import scan_stream
+
 
 @dataclasses.dataclass(frozen=True)
 class WebSocketMessage(object):
     symbol: str
     channel: str
-    data: dict[str, typing.Any]
+    data: dict[str, typing.Any] | None = None
+    # the undecoded frame in raw mode
+    raw: bytes | None = None
 
 
 class WebSocketEventType(enum.Enum):
@@ -44,9 +48,11 @@ class WebSocketEvent(object):
 
 
 class WebSocketClientProtocol(websocket.WebSocketClientProtocol):
-    def __init__(self) -> None:
+    def __init__(self, raw: bool = False) -> None:
         super().__init__()
 
+        self._raw: bool = raw
+
         self._message: Subject[WebSocketMessage] = Subject()
         self._event: Subject[WebSocketEvent] = Subject()
 
@@ -72,11 +78,30 @@ class WebSocketClientProtocol(websocket.WebSocketClientProtocol):
         except AttributeError:
             self._logger.warning("AttributeError silenced at TCP keepalive")
 
+    def _process_raw_payload(self, payload: bytes) -> bool:
+        stream: str | None = scan_stream(payload=payload)
+
+        if stream is None:
+            return False
+
+        symbol, channel, *_ = stream.split('@')
+
+        self._message.next(
+            value=WebSocketMessage(symbol=symbol, channel=channel, raw=payload),
+        )
+
+        return True
+
     def _process_payload(self, payload: bytes) -> None:
         try:
+            # control messages are not stream frames, those are decoded
+            if self._raw and self._process_raw_payload(payload=payload):
+                return
+
             message: dict[str, typing.Any] = json.loads(payload.decode("utf-8"))
 
-            self._logger.debug(f"Message received: {message}")
+            if self._logger.isEnabledFor(logging.DEBUG):
+                self._logger.debug(f"Message received: {message}")
 
             if "stream" in message:
                 symbol, channel, *_ = message["stream"].split('@')
@@ -90,11 +115,18 @@ class WebSocketClientProtocol(websocket.WebSocketClientProtocol):
                 )
 
                 self._logger.debug("Message processed.")
-            elif "result" in message and message["result"] is None:
+            elif "id" in message and (
+                ("result" in message and message["result"] is None)
+                or
+                "error" in message
+            ):
                 self._event.next(
                     value=WebSocketEvent(
                         type=WebSocketEventType.CONTROL_MESSAGE,
-                        context={"id": message["id"]}
+                        context={
+                            "id": message["id"],
+                            "error": message.get("error", None),
+                        }
                     ),
                 )
             else:
@@ -107,6 +139,11 @@ class WebSocketClientProtocol(websocket.WebSocketClientProtocol):
 
         self._init_tcp_keepalive()
 
+        if self.factory.paused:
+            self.transport.pauseProducing()
+
+    def onOpen(self) -> None:
+        # control messages are only accepted after the handshake
         self._logger.info("WebSocket connected!")
 
         self._event.next(
@@ -138,9 +175,17 @@ class WebSocketClientFactory(
 
     protocol: websocket.WebSocketClientProtocol = WebSocketClientProtocol
 
-    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+    def __init__(
+        self,
+        *args: typing.Any,
+        raw: bool = False,
+        **kwargs: typing.Any,
+    ) -> None:
         super().__init__(*args, **kwargs)
 
+        self._raw: bool = raw
+        self._paused: bool = False
+
         self._message: Subject[WebSocketMessage] = Subject()
         self._event: Subject[WebSocketEvent] = Subject()
 
@@ -157,10 +202,31 @@ class WebSocketClientFactory(
     def events(self) -> Observable[WebSocketEvent]:
         return self._event.as_observable()
 
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
     def send_message(self, message: dict[str, typing.Any]) -> None:
         if self._protocol_instance is not None:
             self._protocol_instance.send_message(message=message)
 
+    def set_paused(self, paused: bool) -> None:
+        """Stop or restart reading the socket (applied to reconnects too)"""
+
+        self._paused = paused
+
+        if (
+            self._protocol_instance is None
+            or
+            self._protocol_instance.transport is None
+        ):
+            return
+
+        if paused:
+            self._protocol_instance.transport.pauseProducing()
+        else:
+            self._protocol_instance.transport.resumeProducing()
+
     def _destroy_subscriptions(self) -> None:
         for subscription in self._subscriptions:
             subscription.unsubscribe()
@@ -170,7 +236,7 @@ class WebSocketClientFactory(
 
         self._destroy_subscriptions()
 
-        self._protocol_instance = self.protocol()
+        self._protocol_instance = self.protocol(raw=self._raw)
         self._protocol_instance.factory = self
         self._subscriptions.append(
             self._protocol_instance.messages.subscribe(
@@ -220,6 +286,9 @@ class WebSocketConnection(object):
     def send_message(self, message: dict[str, typing.Any]) -> None:
         self._factory.send_message(message=message)
 
+    def set_paused(self, paused: bool) -> None:
+        self._factory.set_paused(paused=paused)
+
     def open(self) -> None:
         if self._connector is not None:
             return
@@ -241,8 +310,15 @@ class WebSocketManager(threading.Thread, LoggingMixin, OnInit, OnDestroy):
 
         self._connections: dict[str, WebSocketConnection] = {}
 
-    def create_connection(self, url: str) -> WebSocketConnection:
-        factory: WebSocketClientFactory = WebSocketClientFactory(url=url)
+    def create_connection(
+        self,
+        url: str,
+        raw: bool = False,
+    ) -> WebSocketConnection:
+        factory: WebSocketClientFactory = WebSocketClientFactory(
+            url=url,
+            raw=raw,
+        )
         connection: WebSocketConnection = WebSocketConnection(factory=factory)
 
         reactor.callFromThread(connection.open)
@@ -254,6 +330,21 @@ class WebSocketManager(threading.Thread, LoggingMixin, OnInit, OnDestroy):
         reactor.callFromThread(connection.close)
         self._connections.pop(connection.id, None)
 
+    def set_paused(self, paused: bool) -> None:
+        """Pause or resume reading on every connection (backpressure)"""
+
+        for connection in list(self._connections.values()):
+            reactor.callFromThread(connection.set_paused, paused)
+
+    def call_later(
+        self,
+        delay_s: float,
+        callable_: typing.Callable[[], typing.Any],
+    ) -> None:
+        """Run the callable on the reactor thread after the delay"""
+
+        reactor.callFromThread(reactor.callLater, delay_s, callable_)
+
     def run(self) -> None:
         reactor.run(installSignalHandlers=False)
 
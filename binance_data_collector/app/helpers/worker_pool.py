@@ -0,0 +1,537 @@
+# coding=utf-8
+from __future__ import annotations
+
+__all__ = ["DataCollectorCluster", "run_worker"]
+
+import concurrent.futures
+import dataclasses
+import datetime
+import itertools
+import logging
+import logging.handlers
+import multiprocessing
+import multiprocessing.connection
+import threading
+import time
+import typing
+
+from binance_data_collector.api import Application, Injectable
+from binance_data_collector.api.lifecycle import OnDestroy, OnInit
+from binance_data_collector.environments import environment
+from binance_data_collector.log import LoggingMixin
+
+from binance_data_collector.app.models.currency_pair import CurrencyPair
+
+from .data_collector import CollectorMetrics, DataCollector
+from .order_book import OrderBookView
+from .scheduler import Scheduler
+
+Connection: typing.TypeAlias = multiprocessing.connection.Connection
+
+# methods of the DataCollector of a worker which can be called by the parent
+WORKER_METHODS: frozenset[str] = frozenset(
+    {
+        "add_currency_pair",
+        "remove_currency_pair",
+        "update_currency_pair",
+        "get_order_book",
+        "get_metrics",
+    }
+)
+
+# the backoff of the restarts doubles up to this, a worker which lived
+# longer counts as recovered
+RESTART_BACKOFF_MAX_S: float = 60.0
+
+# metrics which are not additive over the workers
+# the weight is counted per IP by the server, every worker sees the same
+SHARED_METRICS: frozenset[str] = frozenset({"used_weight", "weight_budget"})
+# averages and the counters they are weighted by
+AVERAGE_METRICS: dict[str, str] = {
+    "latency_ms_avg": "requests",
+    "run_time_ms_avg": "runs",
+    "lateness_ms_avg": "runs",
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class WorkerRequest(object):
+    # None if no reply is expected
+    id: int | None
+    method: str
+    kwargs: dict[str, typing.Any]
+
+
+@dataclasses.dataclass(frozen=True)
+class WorkerReply(object):
+    id: int
+    result: typing.Any = None
+    error: str | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class WorkerHealth(object):
+    index: int
+    last_message_dts: dict[str, datetime.datetime | None]
+
+
+def _handle_request(
+    collector: DataCollector,
+    request: WorkerRequest,
+) -> WorkerReply | None:
+    result: typing.Any = None
+    error: str | None = None
+
+    try:
+        if request.method not in WORKER_METHODS:
+            raise RuntimeError(f"Unsupported method: `{request.method}`")
+
+        result = getattr(collector, request.method)(**request.kwargs)
+    except Exception as e:
+        logging.getLogger(__name__).exception(
+            f"Could not handle [{request.method}]",
+            exc_info=e,
+        )
+
+        error = str(e)
+
+    if request.id is None:
+        return None
+
+    return WorkerReply(id=request.id, result=result, error=error)
+
+
+def run_worker(
+    index: int,
+    connection: Connection,
+    log_queue: multiprocessing.Queue,
+    log_level: int,
+    workers: int,
+) -> None:
+    """Entry point of a worker process, serves requests until stopped"""
+
+    # set by the command line of the parent, not by the environment
+    environment.workers = workers
+    # done by the parent before the workers were spawned
+    environment.catalog_backfill = False
+
+    # records are handled by the handlers of the parent
+    root: logging.Logger = logging.getLogger()
+    root.handlers.clear()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(log_level)
+
+    # the module imports this one
+    from binance_data_collector.app.app_module import WorkerModule
+
+    app: Application = Application(module=WorkerModule)
+    collector: DataCollector = app.get(DataCollector)
+
+    app.init()
+
+    interval_s: float = environment.worker_health_interval_s
+    next_health: float = time.monotonic()
+
+    try:
+        while True:
+            timeout_s: float = max(0.0, next_health - time.monotonic())
+
+            if connection.poll(timeout_s):
+                request: WorkerRequest | None = connection.recv()
+
+                if request is None:
+                    break
+
+                reply: WorkerReply | None = _handle_request(
+                    collector=collector,
+                    request=request,
+                )
+
+                if reply is not None:
+                    connection.send(reply)
+
+            if time.monotonic() >= next_health:
+                connection.send(
+                    WorkerHealth(
+                        index=index,
+                        last_message_dts=collector.get_last_message_dts(),
+                    )
+                )
+
+                next_health = time.monotonic() + interval_s
+    except (EOFError, OSError):
+        root.warning(f"Worker [{index}] lost its parent")
+    finally:
+        app.destroy()
+
+
+class WorkerHandle(LoggingMixin):
+    """Parent side of a worker process, restarts the worker if it dies.
+
+    Restarts back off exponentially and stop after `WORKER_MAX_RESTARTS`
+    failures in a row, so a worker crashing on start-up does not respawn
+    in a tight loop.
+    """
+
+    def __init__(self, index: int, log_queue: multiprocessing.Queue) -> None:
+        self._index: int = index
+        self._log_queue: multiprocessing.Queue = log_queue
+
+        self._context: multiprocessing.context.SpawnContext = \
+            multiprocessing.get_context("spawn")
+        self._process: multiprocessing.Process | None = None
+        self._connection: Connection | None = None
+
+        self._ids: typing.Iterator[int] = itertools.count(start=1)
+        self._futures: dict[int, concurrent.futures.Future] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+        self._currency_pairs: dict[str, CurrencyPair] = {}
+        self._health: WorkerHealth | None = None
+        self._started_at: float = 0.0
+        self._restarts: int = 0
+        self._stopping: threading.Event = threading.Event()
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def size(self) -> int:
+        return len(self._currency_pairs)
+
+    @property
+    def health(self) -> WorkerHealth | None:
+        return self._health
+
+    def start(self) -> None:
+        connection, child_connection = self._context.Pipe()
+
+        self._process = self._context.Process(
+            target=run_worker,
+            args=(
+                self._index,
+                child_connection,
+                self._log_queue,
+                logging.getLogger().level,
+                environment.workers,
+            ),
+            name=f"collector-worker-{self._index}",
+            daemon=True,
+        )
+        self._process.start()
+        child_connection.close()
+
+        self._started_at = time.monotonic()
+
+        self._connection = connection
+
+        threading.Thread(
+            target=self._read,
+            args=(connection,),
+            name=f"collector-worker-{self._index}-reader",
+            daemon=True,
+        ).start()
+
+        self.log.info(
+            f"Worker [{self._index}] started (pid: {self._process.pid})"
+        )
+
+        # a restarted worker takes over the symbols of the old one
+        for currency_pair in list(self._currency_pairs.values()):
+            self.send(method="add_currency_pair", currency_pair=currency_pair)
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+        if self._process is None:
+            return
+
+        try:
+            with self._lock:
+                self._connection.send(None)
+        except (OSError, ValueError):
+            pass
+
+        self._process.join(timeout=30)
+
+        if self._process.is_alive():
+            self._process.terminate()
+
+    def _send(self, request: WorkerRequest) -> None:
+        # not started yet, `start` sends the currency pairs
+        if self._connection is None:
+            return
+
+        try:
+            with self._lock:
+                self._connection.send(request)
+        except (OSError, ValueError) as e:
+            self.log.error(f"Worker [{self._index}] unreachable: {e}")
+
+    def send(self, method: str, **kwargs: typing.Any) -> None:
+        self._send(WorkerRequest(id=None, method=method, kwargs=kwargs))
+
+    def call(self, method: str, **kwargs: typing.Any) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+
+        with self._lock:
+            key: int = next(self._ids)
+            self._futures[key] = future
+
+        self._send(WorkerRequest(id=key, method=method, kwargs=kwargs))
+
+        return future
+
+    def add(self, currency_pair: CurrencyPair) -> None:
+        self._currency_pairs[currency_pair.symbol] = currency_pair
+        self.send(method="add_currency_pair", currency_pair=currency_pair)
+
+    def remove(self, currency_pair: CurrencyPair) -> None:
+        self._currency_pairs.pop(currency_pair.symbol, None)
+        self.send(method="remove_currency_pair", currency_pair=currency_pair)
+
+    def update(self, currency_pair: CurrencyPair) -> None:
+        # the worker has a copy of the pair, not the instance of the parent
+        self._currency_pairs[currency_pair.symbol] = currency_pair
+        self.send(method="update_currency_pair", currency_pair=currency_pair)
+
+    def _read(self, connection: Connection) -> None:
+        while True:
+            try:
+                message: WorkerReply | WorkerHealth = connection.recv()
+            except (EOFError, OSError):
+                break
+
+            if isinstance(message, WorkerHealth):
+                self._health = message
+            elif isinstance(message, WorkerReply):
+                with self._lock:
+                    future: concurrent.futures.Future | None = \
+                        self._futures.pop(message.id, None)
+
+                if future is None:
+                    continue
+
+                if message.error is None:
+                    future.set_result(message.result)
+                else:
+                    future.set_exception(RuntimeError(message.error))
+
+        with self._lock:
+            futures: list[concurrent.futures.Future] = \
+                list(self._futures.values())
+            self._futures.clear()
+
+        for future in futures:
+            future.set_exception(RuntimeError("Worker connection lost"))
+
+        if not self._stopping.is_set():
+            self._restart()
+
+    def _restart(self) -> None:
+        self._health = None
+
+        if time.monotonic() - self._started_at > RESTART_BACKOFF_MAX_S:
+            self._restarts = 0
+
+        if self._restarts >= environment.worker_max_restarts:
+            self.log.error(
+                f"Worker [{self._index}] died {self._restarts + 1} times in "
+                f"a row, giving up"
+            )
+
+            return
+
+        delay_s: float = min(
+            RESTART_BACKOFF_MAX_S,
+            environment.worker_restart_backoff_s * 2 ** self._restarts,
+        )
+        self._restarts += 1
+
+        self.log.error(
+            f"Worker [{self._index}] died, restarting in {delay_s:.1f}s"
+        )
+
+        # stopped meanwhile
+        if self._stopping.wait(timeout=delay_s):
+            return
+
+        self.start()
+
+
+def _merge_field(values: list[typing.Any], name: str) -> typing.Any:
+    fields: list[typing.Any] = [getattr(v, name) for v in values]
+
+    if name in SHARED_METRICS or name.endswith("_max"):
+        return max(fields)
+
+    if name in AVERAGE_METRICS:
+        weights: list[typing.Any] = [
+            getattr(v, AVERAGE_METRICS[name]) for v in values
+        ]
+
+        if sum(weights) == 0:
+            return 0.0
+
+        return sum(f * w for f, w in zip(fields, weights)) / sum(weights)
+
+    return _merge(values=fields)
+
+
+def _merge(values: list[typing.Any]) -> typing.Any:
+    """Merge metrics of the workers: sum counters, join lists.
+
+    Maxima and the metrics shared by the workers take the maximum, averages
+    are weighted by their counter.
+    """
+
+    first: typing.Any = values[0]
+
+    if dataclasses.is_dataclass(first):
+        return type(first)(
+            **{
+                field.name: _merge_field(values=values, name=field.name)
+                for field in dataclasses.fields(first)
+            }
+        )
+
+    if isinstance(first, bool):
+        return any(values)
+
+    if isinstance(first, (int, float)):
+        return sum(values)
+
+    if isinstance(first, list):
+        return [item for value in values for item in value]
+
+    return first
+
+
+@Injectable()
+class DataCollectorCluster(LoggingMixin, OnInit, OnDestroy):
+    """DataCollector which spreads the symbols over worker processes.
+
+    Every worker runs its own reactor, DataCollector and DataFileManager,
+    the parent only keeps the assignment of the symbols. The workers are
+    spawned by `on_init`, symbols assigned before are sent once they run.
+    """
+
+    def __init__(self, scheduler: Scheduler) -> None:
+        self._scheduler: Scheduler = scheduler
+
+        context: multiprocessing.context.SpawnContext = \
+            multiprocessing.get_context("spawn")
+
+        self._log_queue: multiprocessing.Queue = context.Queue()
+        self._log_listener: logging.handlers.QueueListener = \
+            logging.handlers.QueueListener(
+                self._log_queue,
+                *logging.getLogger().handlers,
+                respect_handler_level=True,
+            )
+        self._log_listener.start()
+
+        self._workers: list[WorkerHandle] = [
+            WorkerHandle(index=i, log_queue=self._log_queue)
+            for i in range(max(1, environment.workers))
+        ]
+
+        self._assignments: dict[str, WorkerHandle] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def add_currency_pair(self, currency_pair: CurrencyPair) -> None:
+        with self._lock:
+            if currency_pair.symbol in self._assignments:
+                return
+
+            worker: WorkerHandle = min(self._workers, key=lambda w: w.size)
+            self._assignments[currency_pair.symbol] = worker
+
+            worker.add(currency_pair=currency_pair)
+
+    def remove_currency_pair(self, currency_pair: CurrencyPair) -> None:
+        with self._lock:
+            worker: WorkerHandle | None = self._assignments.pop(
+                currency_pair.symbol,
+                None,
+            )
+
+            if worker is not None:
+                worker.remove(currency_pair=currency_pair)
+
+    def update_currency_pair(self, currency_pair: CurrencyPair) -> None:
+        with self._lock:
+            worker: WorkerHandle | None = self._assignments.get(
+                currency_pair.symbol,
+                None,
+            )
+
+            if worker is not None:
+                worker.update(currency_pair=currency_pair)
+
+    def get_last_message_dt_for(
+        self,
+        currency_pair: CurrencyPair,
+    ) -> datetime.datetime | None:
+        worker: WorkerHandle | None = self._assignments.get(
+            currency_pair.symbol,
+            None,
+        )
+
+        if worker is None or worker.health is None:
+            return None
+
+        return worker.health.last_message_dts.get(currency_pair.symbol, None)
+
+    def get_order_book(
+        self,
+        currency_pair: CurrencyPair,
+        depth: int = 20,
+    ) -> OrderBookView | None:
+        worker: WorkerHandle | None = self._assignments.get(
+            currency_pair.symbol,
+            None,
+        )
+
+        if worker is None:
+            return None
+
+        return worker.call(
+            method="get_order_book",
+            currency_pair=currency_pair,
+            depth=depth,
+        ).result(timeout=5)
+
+    def get_metrics(self) -> CollectorMetrics:
+        futures: list[concurrent.futures.Future] = [
+            worker.call(method="get_metrics") for worker in self._workers
+        ]
+
+        metrics: list[CollectorMetrics] = []
+        for future in futures:
+            try:
+                metrics.append(future.result(timeout=5))
+            except Exception as e:
+                self.log.warning(f"Could not get worker metrics: {e}")
+
+        if len(metrics) == 0:
+            raise RuntimeError("No worker is available")
+
+        merged: CollectorMetrics = _merge(values=metrics)
+
+        # the jobs of the parent, e.g. the exchange info refresh
+        return dataclasses.replace(
+            merged,
+            jobs=[*merged.jobs, *self._scheduler.get_metrics()],
+        )
+
+    def on_init(self) -> None:
+        for worker in self._workers:
+            worker.start()
+
+    def on_destroy(self) -> None:
+        for worker in self._workers:
+            worker.stop()
+
+        self._log_listener.stop()
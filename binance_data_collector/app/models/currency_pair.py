@@ -30,6 +30,9 @@ class CurrencyPair(Model):  # noqa
     base: str
     quote: str
     status: CurrencyPairStatus = CurrencyPairStatus.CREATED
+    # price and quantity filters of the exchange (e.g. `0.01000000`)
+    tick_size: str | None = None
+    step_size: str | None = None
 
     def upper(self, separator: str = '_') -> str:
         return f"{self.base.upper()}{separator}{self.quote.upper()}"
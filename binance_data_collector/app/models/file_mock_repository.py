@@ -1,7 +1,9 @@
 # coding=utf-8
 from __future__ import annotations
 
+import contextlib
 import datetime
+import itertools
 import threading
 import typing
 from pathlib import Path
@@ -18,14 +20,36 @@ from binance_data_collector.app.models.repository import (
 
 
 class FileMockRepository(typing.Generic[T], Repository[T]):
-    def __init__(self, path: Path) -> None:
+    """Repository keeping every entity in memory, persisted to a JSON file.
+
+    Equality queries on the fields listed in `indexes` are answered from
+    secondary indexes, in time proportional to the result and in the order
+    of the entries, like a full scan. The indexes reflect the saved state,
+    they are updated by create, update and delete only: an entity mutated
+    but not written yet is found by its saved values, and checked against
+    the query with its current ones.
+    """
+
+    def __init__(self, path: Path, indexes: list[str] | None = None) -> None:
         self._path: Path = path
 
         self._formatter: JsonFormatter = JsonFormatter()
         # cache entries since collection is small
         self._entries: dict[str, T] = {}
 
-        self._lock: threading.Lock = threading.Lock()
+        # field -> value -> uuid -> entity, ordered like the entries
+        self._indexes: dict[str, dict[typing.Any, dict[str, T]]] = {
+            name: {} for name in indexes or []
+        }
+        # uuid -> values of the indexed fields as last written
+        self._keys: dict[str, tuple[typing.Any, ...]] = {}
+        # uuid -> position of the entry, orders the results of the indexes
+        self._positions: dict[str, int] = {}
+        self._counter: typing.Iterator[int] = itertools.count()
+        # nesting level of the open batches, the file is written by the outermost
+        self._depth: int = 0
+
+        self._lock: threading.RLock = threading.RLock()
 
     def load(self) -> None:
         """This is a hack since s__orig_class__ is created after __init__()"""
@@ -38,14 +62,78 @@ class FileMockRepository(typing.Generic[T], Repository[T]):
 
             class_: typing.Type = getattr(self, "__orig_class__")
 
-            self._entries: dict[str, T] = self._formatter.loads(
+            entries: dict[str, T] = self._formatter.loads(
                 obj=text,
                 cls=dict[str, typing.get_args(class_)[0]],
             )
 
+            self._entries = {}
+            self._keys = {}
+            self._positions = {}
+
+            for index in self._indexes.values():
+                index.clear()
+
+            for uuid, item in entries.items():
+                self._put(uuid=uuid, item=item)
+
+    def _put(self, uuid: str, item: T) -> None:
+        self._unindex(uuid=uuid)
+
+        self._entries[uuid] = item
+
+        if len(self._indexes) == 0:
+            return
+
+        if uuid not in self._positions:
+            self._positions[uuid] = next(self._counter)
+
+        keys: tuple[typing.Any, ...] = tuple(
+            getattr(item, name) for name in self._indexes.keys()
+        )
+
+        for index, key in zip(self._indexes.values(), keys):
+            index.setdefault(key, {})[uuid] = item
+
+        self._keys[uuid] = keys
+
+    def _remove(self, uuid: str) -> None:
+        self._unindex(uuid=uuid)
+
+        self._entries.pop(uuid, None)
+        self._positions.pop(uuid, None)
+
+    def _unindex(self, uuid: str) -> None:
+        keys: tuple[typing.Any, ...] | None = self._keys.pop(uuid, None)
+
+        if keys is None:
+            return
+
+        for index, key in zip(self._indexes.values(), keys):
+            bucket: dict[str, T] = index[key]
+            bucket.pop(uuid, None)
+
+            if len(bucket) == 0:
+                del index[key]
+
     def _update_file(self) -> None:
+        if self._depth > 0:
+            return
+
         self._path.write_text(self._formatter.dumps(obj=self._entries))
 
+    @contextlib.contextmanager
+    def batch(self) -> typing.Iterator[None]:
+        with self._lock:
+            self._depth += 1
+
+            try:
+                yield
+            finally:
+                self._depth -= 1
+
+                self._update_file()
+
     def _is_match(self, item: T, query: dict[str, typing.Any]) -> bool:
         return all(
             [
@@ -56,10 +144,28 @@ class FileMockRepository(typing.Generic[T], Repository[T]):
         )
 
     def find(self, query: dict[str, typing.Any] | None = None) -> list[T]:
+        query = {k: v for k, v in (query or {}).items() if v is not None}
+
         with self._lock:
+            candidates: typing.Iterable[T] = self._entries.values()
+
+            buckets: list[dict[str, T]] = [
+                self._indexes[key].get(value, {})
+                for key, value in query.items()
+                if key in self._indexes
+            ]
+
+            # start from the smallest bucket of the queried indexes
+            if len(buckets) > 0:
+                bucket: dict[str, T] = min(buckets, key=len)
+                candidates = [
+                    bucket[uuid]
+                    for uuid in sorted(bucket, key=self._positions.__getitem__)
+                ]
+
             return [
-                item for item in list(self._entries.values())
-                if query is None or self._is_match(item=item, query=query)
+                item for item in list(candidates)
+                if self._is_match(item=item, query=query)
             ]
 
     def create(self, item: T) -> T:
@@ -67,12 +173,24 @@ class FileMockRepository(typing.Generic[T], Repository[T]):
             if self._entries.get(item.uuid, None) is not None:
                 raise EntityAlreadyExistsException()
 
-            self._entries[item.uuid] = item
+            self._put(uuid=item.uuid, item=item)
 
             self._update_file()
 
             return item
 
+    def create_many(self, items: list[T]) -> list[T]:
+        with self._lock:
+            if any(self._entries.get(item.uuid, None) is not None for item in items):
+                raise EntityAlreadyExistsException()
+
+            for item in items:
+                self._put(uuid=item.uuid, item=item)
+
+            self._update_file()
+
+            return items
+
     def read(self, uuid: str) -> T:
         with self._lock:
             if self._entries.get(uuid, None) is None:
@@ -86,14 +204,41 @@ class FileMockRepository(typing.Generic[T], Repository[T]):
                 raise EntityNotFoundException()
 
             item.updated_at = datetime.datetime.now(tz=TZ)
-            self._entries[uuid] = item
+            self._put(uuid=uuid, item=item)
 
             self._update_file()
 
             return item
 
+    def update_many(self, items: list[T]) -> list[T]:
+        with self._lock:
+            if any(self._entries.get(item.uuid, None) is None for item in items):
+                raise EntityNotFoundException()
+
+            updated_at: datetime.datetime = datetime.datetime.now(tz=TZ)
+
+            for item in items:
+                item.updated_at = updated_at
+                self._put(uuid=item.uuid, item=item)
+
+            self._update_file()
+
+            return items
+
+    def upsert_many(self, items: list[T]) -> list[T]:
+        with self._lock:
+            updated_at: datetime.datetime = datetime.datetime.now(tz=TZ)
+
+            for item in items:
+                item.updated_at = updated_at
+                self._put(uuid=item.uuid, item=item)
+
+            self._update_file()
+
+            return items
+
     def delete(self, uuid: str) -> None:
         with self._lock:
-            self._entries.pop(uuid, None)
+            self._remove(uuid=uuid)
 
             self._update_file()
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import abc
+import contextlib
 import dataclasses
 import datetime
 import typing
@@ -37,6 +38,12 @@ class Repository(typing.Generic[T], metaclass=abc.ABCMeta):
     def create(self, item: T) -> T:
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def create_many(self, items: list[T]) -> list[T]:
+        """Create all items at once, none of them if one already exists"""
+
+        raise NotImplementedError
+
     @abc.abstractmethod
     def read(self, uuid: str) -> T:
         raise NotImplementedError
@@ -45,6 +52,24 @@ class Repository(typing.Generic[T], metaclass=abc.ABCMeta):
     def update(self, uuid: str, item: typing.Any) -> T:
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def update_many(self, items: list[T]) -> list[T]:
+        """Update all items at once, none of them if one does not exist"""
+
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def upsert_many(self, items: list[T]) -> list[T]:
+        """Create the new items and update the existing ones at once"""
+
+        raise NotImplementedError
+
     @abc.abstractmethod
     def delete(self, uuid: str) -> None:
         raise NotImplementedError
+
+    @contextlib.contextmanager
+    def batch(self) -> typing.Iterator[None]:
+        """Persist the writes made inside as a single unit of work"""
+
+        yield
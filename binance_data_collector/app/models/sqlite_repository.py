@@ -0,0 +1,354 @@
+# coding=utf-8
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import datetime
+import enum
+import sqlite3
+import threading
+import typing
+from pathlib import Path
+
+from binance_data_collector.api.lifecycle import OnDestroy
+from binance_data_collector.app.constants import TZ
+from binance_data_collector.serialization import JsonFormatter
+
+from binance_data_collector.app.models.repository import (
+    EntityAlreadyExistsException,
+    EntityNotFoundException,
+    Repository,
+    T,
+)
+
+
+def to_column(value: typing.Any) -> typing.Any:
+    """Value of an indexed field as stored in its column"""
+
+    if isinstance(value, enum.Enum):
+        return value.value
+
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+
+    return value
+
+
+class SqliteRepository(typing.Generic[T], Repository[T], OnDestroy):
+    """Repository storing every entity as a JSON document in a SQLite table.
+
+    The fields listed in `indexes` are copied to indexed columns, equality
+    queries on those are answered by SQLite. Writes inside `batch()` are
+    committed in a single transaction. Loaded entities are kept in an
+    identity map, so every read of an entity returns the same instance (as
+    the FileMockRepository does). A rolled back transaction reloads the
+    entities it wrote into the same instances, those it created are evicted.
+
+    An empty table is filled from `import_path` on load, a JSON file of the
+    FileMockRepository, so switching the backend keeps the entities. The
+    file is renamed to `<name>.imported` afterwards.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        cls: typing.Type[T],
+        table: str,
+        indexes: list[str] | None = None,
+        import_path: Path | None = None,
+    ) -> None:
+        self._path: Path = path
+        self._cls: typing.Type[T] = cls
+        self._table: str = table
+        self._indexes: list[str] = indexes or []
+        self._import_path: Path | None = import_path
+
+        self._formatter: JsonFormatter = JsonFormatter()
+        self._entries: dict[str, T] = {}
+        # uuids written by the open transaction, with their instance before it
+        self._written: dict[str, T | None] = {}
+
+        self._connection: sqlite3.Connection | None = None
+        # nesting level of the open transactions
+        self._depth: int = 0
+
+        self._lock: threading.RLock = threading.RLock()
+
+    def load(self) -> None:
+        with self._lock:
+            # transactions are handled explicitly
+            self._connection = sqlite3.connect(
+                database=self._path,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+
+            columns: str = "".join(f", {name} TEXT" for name in self._indexes)
+
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._table} "
+                f"(uuid TEXT PRIMARY KEY, data TEXT NOT NULL{columns})"
+            )
+
+            for name in self._indexes:
+                self._connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS ix_{self._table}_{name} "
+                    f"ON {self._table} ({name})"
+                )
+
+            if self._import_path is not None and self._import_path.exists():
+                self._import(path=self._import_path)
+
+    def _import(self, path: Path) -> None:
+        row: tuple[int] = self._connection.execute(
+            f"SELECT COUNT(*) FROM {self._table}"
+        ).fetchone()
+
+        if row[0] > 0:
+            return
+
+        entries: dict[str, T] = self._formatter.loads(
+            obj=path.read_text(),
+            cls=dict[str, self._cls],
+        )
+
+        with self.batch():
+            self._connection.executemany(
+                self._get_insert_sql(),
+                [(uuid, *self._dump(item=item)) for uuid, item in entries.items()],
+            )
+
+        # an emptied table must not be filled again by the next load
+        path.replace(path.with_name(path.name + ".imported"))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def on_destroy(self) -> None:
+        self.close()
+
+    @contextlib.contextmanager
+    def batch(self) -> typing.Iterator[None]:
+        with self._lock:
+            if self._depth == 0:
+                self._connection.execute("BEGIN")
+
+            self._depth += 1
+
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+
+                if self._depth == 0:
+                    self._connection.execute("ROLLBACK")
+                    self._reload_written()
+
+                raise
+            else:
+                self._depth -= 1
+
+                if self._depth == 0:
+                    self._connection.execute("COMMIT")
+                    self._written.clear()
+
+    def _track(self, uuids: typing.Iterable[str]) -> None:
+        # must be called with the lock held, inside a batch
+        for uuid in uuids:
+            if uuid not in self._written:
+                self._written[uuid] = self._entries.get(uuid, None)
+
+    def _reload_written(self) -> None:
+        """Reset the instances written by a rolled back transaction"""
+
+        for uuid, item in self._written.items():
+            row: tuple[str] | None = self._connection.execute(
+                f"SELECT data FROM {self._table} WHERE uuid = ?",
+                (uuid,),
+            ).fetchone()
+
+            # created by the transaction or not loaded before it
+            if row is None or item is None:
+                self._entries.pop(uuid, None)
+
+                continue
+
+            committed: T = self._formatter.loads(obj=row[0], cls=self._cls)
+
+            # the callers keep the instance they read
+            for field in dataclasses.fields(committed):
+                setattr(item, field.name, getattr(committed, field.name))
+
+            self._entries[uuid] = item
+
+        self._written.clear()
+
+    def _dump(self, item: T) -> tuple[typing.Any, ...]:
+        return (
+            self._formatter.dumps(obj=item),
+            *[to_column(getattr(item, name)) for name in self._indexes],
+        )
+
+    def _load(self, uuid: str, data: str) -> T:
+        item: T | None = self._entries.get(uuid, None)
+
+        if item is None:
+            item = self._formatter.loads(obj=data, cls=self._cls)
+            self._entries[uuid] = item
+
+        return item
+
+    def find(self, query: dict[str, typing.Any] | None = None) -> list[T]:
+        query = {k: v for k, v in (query or {}).items() if v is not None}
+
+        indexed: dict[str, typing.Any] = {
+            k: to_column(v) for k, v in query.items() if k in self._indexes
+        }
+        rest: dict[str, typing.Any] = {
+            k: v for k, v in query.items() if k not in self._indexes
+        }
+
+        sql: str = f"SELECT uuid, data FROM {self._table}"
+
+        if len(indexed) > 0:
+            sql += " WHERE " + " AND ".join(f"{k} = ?" for k in indexed.keys())
+
+        with self._lock:
+            rows: list[tuple[str, str]] = self._connection.execute(
+                sql,
+                tuple(indexed.values()),
+            ).fetchall()
+
+            items: list[T] = [self._load(uuid=u, data=d) for u, d in rows]
+
+        return [
+            item for item in items
+            if all(getattr(item, k) == v for k, v in rest.items())
+        ]
+
+    def _get_insert_sql(self) -> str:
+        names: str = "".join(f", {name}" for name in self._indexes)
+        values: str = ", ?" * len(self._indexes)
+
+        return (
+            f"INSERT INTO {self._table} (uuid, data{names}) "
+            f"VALUES (?, ?{values})"
+        )
+
+    def _get_update_sql(self) -> str:
+        assignments: str = "".join(f", {name} = ?" for name in self._indexes)
+
+        return f"UPDATE {self._table} SET data = ?{assignments} WHERE uuid = ?"
+
+    def create(self, item: T) -> T:
+        return self.create_many(items=[item])[0]
+
+    def create_many(self, items: list[T]) -> list[T]:
+        with self.batch():
+            self._track(uuids=[item.uuid for item in items])
+
+            try:
+                self._connection.executemany(
+                    self._get_insert_sql(),
+                    [(item.uuid, *self._dump(item=item)) for item in items],
+                )
+            except sqlite3.IntegrityError as e:
+                raise EntityAlreadyExistsException() from e
+
+            for item in items:
+                self._entries[item.uuid] = item
+
+        return items
+
+    def read(self, uuid: str) -> T:
+        with self._lock:
+            row: tuple[str] | None = self._connection.execute(
+                f"SELECT data FROM {self._table} WHERE uuid = ?",
+                (uuid,),
+            ).fetchone()
+
+            if row is None:
+                raise EntityNotFoundException()
+
+            return self._load(uuid=uuid, data=row[0])
+
+    def update(self, uuid: str, item: T) -> T:
+        with self.batch():
+            self._track(uuids=[uuid])
+
+            item.updated_at = datetime.datetime.now(tz=TZ)
+
+            cursor: sqlite3.Cursor = self._connection.execute(
+                self._get_update_sql(),
+                (*self._dump(item=item), uuid),
+            )
+
+            if cursor.rowcount == 0:
+                raise EntityNotFoundException()
+
+            self._entries[uuid] = item
+
+        return item
+
+    def update_many(self, items: list[T]) -> list[T]:
+        with self.batch():
+            self._track(uuids=[item.uuid for item in items])
+
+            updated_at: datetime.datetime = datetime.datetime.now(tz=TZ)
+
+            for item in items:
+                item.updated_at = updated_at
+
+            cursor: sqlite3.Cursor = self._connection.executemany(
+                self._get_update_sql(),
+                [(*self._dump(item=item), item.uuid) for item in items],
+            )
+
+            # the rows of all parameter sets, the batch is rolled back
+            if cursor.rowcount < len(items):
+                raise EntityNotFoundException()
+
+            for item in items:
+                self._entries[item.uuid] = item
+
+        return items
+
+    def upsert_many(self, items: list[T]) -> list[T]:
+        assignments: str = "".join(
+            f", {name} = excluded.{name}" for name in self._indexes
+        )
+
+        with self.batch():
+            self._track(uuids=[item.uuid for item in items])
+
+            updated_at: datetime.datetime = datetime.datetime.now(tz=TZ)
+
+            for item in items:
+                item.updated_at = updated_at
+
+            self._connection.executemany(
+                f"{self._get_insert_sql()} ON CONFLICT (uuid) DO UPDATE "
+                f"SET data = excluded.data{assignments}",
+                [(item.uuid, *self._dump(item=item)) for item in items],
+            )
+
+            for item in items:
+                self._entries[item.uuid] = item
+
+        return items
+
+    def delete(self, uuid: str) -> None:
+        with self.batch():
+            self._track(uuids=[uuid])
+
+            self._connection.execute(
+                f"DELETE FROM {self._table} WHERE uuid = ?",
+                (uuid,),
+            )
+
+            self._entries.pop(uuid, None)
@@ -1,6 +1,8 @@
 # coding=utf-8
 __all__ = ["cli"]
 
+import dataclasses
+import json
 import logging.config
 import typing
 from pathlib import Path
@@ -9,7 +11,11 @@ import click
 from ruamel.yaml import YAML
 
 from binance_data_collector.api import Application
-from binance_data_collector.app.app_module import AppModule
+from binance_data_collector.environments import environment
+from binance_data_collector.app.app_module import AppModule, ClusterAppModule
+from binance_data_collector.app.helpers.block_index import DataFileReader
+from binance_data_collector.app.helpers.catalog import Catalog
+from binance_data_collector.app.helpers.data_file_manager import create_codec_for
 
 from .constants import DEFAULT_LOGGING_CONFIG
 
@@ -36,7 +42,105 @@ def cli(config: typing.Optional[Path] = None, debug: bool = False) -> None:
 
 
 @cli.command()
-def start() -> None:
-    app: Application = Application(module=AppModule)
+@click.option(
+    "--workers",
+    type=int,
+    default=environment.workers,
+    help="Number of collector processes.",
+)
+def start(workers: int = 1) -> None:
+    # the workers split the snapshot weight budget
+    environment.workers = workers
+
+    if workers > 1:
+        app: Application = Application(module=ClusterAppModule)
+    else:
+        app: Application = Application(module=AppModule)
 
     app.listen(port=3000)
+
+
+@cli.command()
+@click.argument("path", type=Path)
+@click.option(
+    "--output",
+    type=click.File(mode="wb"),
+    default="-",
+    help="Path of the JSON lines (stdout by default).",
+)
+@click.option(
+    "--from",
+    "from_ms",
+    type=int,
+    default=None,
+    help="First event time in ms.",
+)
+@click.option(
+    "--to",
+    "to_ms",
+    type=int,
+    default=None,
+    help="Last event time in ms.",
+)
+def decode(
+    path: Path,
+    output: typing.BinaryIO,
+    from_ms: int | None = None,
+    to_ms: int | None = None,
+) -> None:
+    """Decode a data file into JSON lines, optionally of a time range only."""
+
+    reader: DataFileReader = DataFileReader(path=path, codec=create_codec_for(path=path))
+
+    for line in reader.iter_lines(from_ms=from_ms, to_ms=to_ms):
+        output.write(line)
+
+
+@cli.command()
+@click.option("--symbol", type=str, default=None, help="Symbol, e.g. BTCUSDT.")
+@click.option("--name", type=str, default=None, help="Route, e.g. depth.")
+@click.option(
+    "--from",
+    "from_ms",
+    type=int,
+    default=None,
+    help="First event time in ms.",
+)
+@click.option(
+    "--to",
+    "to_ms",
+    type=int,
+    default=None,
+    help="Last event time in ms.",
+)
+@click.option(
+    "--rebuild",
+    type=bool,
+    is_flag=True,
+    help="Add the manifest entries of the data root first.",
+)
+def catalog(
+    symbol: str | None = None,
+    name: str | None = None,
+    from_ms: int | None = None,
+    to_ms: int | None = None,
+    rebuild: bool = False,
+) -> None:
+    """List the data file segments overlapping a time range as JSON lines."""
+
+    segment_catalog: Catalog = Catalog()
+
+    try:
+        if rebuild:
+            count: int = segment_catalog.rebuild()
+            logging.getLogger(__name__).info(f"Added {count} manifest entries")
+
+        for segment in segment_catalog.find(
+            symbol=symbol,
+            name=name,
+            from_ms=from_ms,
+            to_ms=to_ms,
+        ):
+            click.echo(json.dumps(dataclasses.asdict(segment)))
+    finally:
+        segment_catalog.close()
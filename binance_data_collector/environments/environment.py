@@ -24,7 +24,56 @@ def load_dot_env():
 load_dot_env()
 
 
+def get_optional_int(key: str) -> int | None:
+    value: str | None = os.environ.get(key, None)
+
+    return int(value) if value else None
+
+
 class environment:
     data_root: str = os.environ.get("DATA_ROOT", "/data")
-    data_file_name_pattern: str = os.environ.get("DATA_FILE_NAME_PATTERN", "{name}_{ts}.json.gz")
+    repository_backend: str = os.environ.get("REPOSITORY_BACKEND", "file")
+    data_file_name_pattern: str = os.environ.get("DATA_FILE_NAME_PATTERN", "{name}_{ts}.{format}{ext}")
+    # json, or bin for packed trade and depth records
+    data_file_format: str = os.environ.get("DATA_FILE_FORMAT", "json")
+    # length of the data files in minutes (UTC, aligned to midnight), 60 for hourly files
+    data_file_segment_minutes: int = int(os.environ.get("DATA_FILE_SEGMENT_MINUTES", "1440"))
+    data_file_codec: str = os.environ.get("DATA_FILE_CODEC", "gzip")
+    # unset means the default level of the codec
+    data_file_codec_level: int | None = get_optional_int("DATA_FILE_CODEC_LEVEL")
+    data_file_codec_threads: int = int(os.environ.get("DATA_FILE_CODEC_THREADS", "0"))
+    data_file_flush_size: int = int(os.environ.get("DATA_FILE_FLUSH_SIZE", str(1024 * 1024)))
+    data_file_flush_interval_s: float = float(os.environ.get("DATA_FILE_FLUSH_INTERVAL_S", "5"))
+    data_file_fsync_policy: str = os.environ.get("DATA_FILE_FSYNC_POLICY", "INTERVAL")
+    data_file_fsync_interval_s: float = float(os.environ.get("DATA_FILE_FSYNC_INTERVAL_S", "30"))
+    data_file_max_open: int = int(os.environ.get("DATA_FILE_MAX_OPEN", "1024"))
+    data_file_writers: int = int(os.environ.get("DATA_FILE_WRITERS", "2"))
+    refresh_period_s: float = float(os.environ.get("REFRESH_PERIOD_S", "60"))
+    idle_check_period_s: float = float(os.environ.get("IDLE_CHECK_PERIOD_S", "60"))
+    scheduler_workers: int = int(os.environ.get("SCHEDULER_WORKERS", "4"))
+    metrics_log_interval_s: float = float(os.environ.get("METRICS_LOG_INTERVAL_S", "60"))
     snapshot_period_s: int = int(os.environ.get("SNAPSHOT_PERIOD_S", "60"))
+    snapshot_workers: int = int(os.environ.get("SNAPSHOT_WORKERS", "4"))
+    # the IP limit is 6000, leave room for everything else on the IP, the
+    # worker processes get an equal share each
+    snapshot_weight_budget: int = int(os.environ.get("SNAPSHOT_WEIGHT_BUDGET", "3000"))
+    websocket_connections: int = int(os.environ.get("WEBSOCKET_CONNECTIONS", "4"))
+    streams_per_connection: int = int(os.environ.get("STREAMS_PER_CONNECTION", "1024"))
+    websocket_messages_per_second: float = float(os.environ.get("WEBSOCKET_MESSAGES_PER_SECOND", "4"))
+    streams_per_subscribe_message: int = int(os.environ.get("STREAMS_PER_SUBSCRIBE_MESSAGE", "200"))
+    subscribe_ack_timeout_s: float = float(os.environ.get("SUBSCRIBE_ACK_TIMEOUT_S", "10"))
+    raw_ingestion: bool = os.environ.get("RAW_INGESTION", "false").lower() == "true"
+    ingest_workers: int = int(os.environ.get("INGEST_WORKERS", "2"))
+    # reading pauses above 80% of the queue, a pause longer than the ping timeout drops the connection
+    ingest_queue_size: int = int(os.environ.get("INGEST_QUEUE_SIZE", "100000"))
+    ingest_drop_policy: str = os.environ.get("INGEST_DROP_POLICY", "DROP_NEWEST")
+    # the order book parses every depth diff, which defeats raw ingestion,
+    # so it is off by default with it and the order book API returns 404
+    order_book: bool = os.environ.get("ORDER_BOOK", str(not raw_ingestion)).lower() == "true"
+    workers: int = int(os.environ.get("WORKERS", "1"))
+    # add the manifest entries missing from the catalog on start
+    catalog_backfill: bool = os.environ.get("CATALOG_BACKFILL", "true").lower() == "true"
+    worker_health_interval_s: float = float(os.environ.get("WORKER_HEALTH_INTERVAL_S", "5"))
+    # the backoff doubles with every restart in a row
+    worker_restart_backoff_s: float = float(os.environ.get("WORKER_RESTART_BACKOFF_S", "1"))
+    worker_max_restarts: int = int(os.environ.get("WORKER_MAX_RESTARTS", "5"))
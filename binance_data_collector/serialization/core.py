@@ -6,6 +6,8 @@ from pathlib import Path
 
 import jsons
 
+from . import plans
+
 
 T = typing.TypeVar("T")
 D = typing.TypeVar("D")
@@ -72,7 +74,10 @@ class ClassDeserializer(Deserializer[T]):
 
 class Parameters(object):
     def as_dict(self) -> dict:
-        return {key: value for key, value in self.__dict__ if value is not None}
+        return {
+            key: value for key, value in self.__dict__.items()
+            if value is not None
+        }
 
 
 class Formatter(metaclass=abc.ABCMeta):
@@ -96,9 +101,22 @@ class Formatter(metaclass=abc.ABCMeta):
         ...
 
     def dump(self, obj: object, **kwargs) -> dict:
+        # planned classes (and containers of them) skip jsons
+        if len(kwargs) == 0:
+            data: typing.Any = plans.dump_value(obj)
+
+            if data is not None:
+                return data
+
         return jsons.dump(obj, fork_inst=self._fork_inst, **kwargs)  # noqa
 
     def load(self, obj: object, cls: typing.Type[T], **kwargs) -> T:
+        if len(kwargs) == 0:
+            loader: typing.Optional[plans.Converter] = plans.get_loader(cls)
+
+            if loader is not None:
+                return loader(obj)
+
         return jsons.load(obj, cls=cls, fork_inst=self._fork_inst, **kwargs)
 
     def dumps(self, obj: T, **kwargs) -> str:
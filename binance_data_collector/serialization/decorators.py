@@ -1,9 +1,31 @@
 # coding=utf-8
+import dataclasses
 import typing
 
 import jsons
 
 from .core import ClassDeserializer, ClassSerializer, StateHolder, T
+from .plans import PLAN_ATTRIBUTE, ClassPlan, UnsupportedTypeError, compile_plan
+
+
+@dataclasses.dataclass(frozen=True)
+class PlanSerializer(ClassSerializer[T]):
+    """Used by jsons for planned classes nested in other values"""
+
+    plan: typing.Optional[ClassPlan] = None
+
+    def __call__(self, obj: T, **kwargs) -> dict:
+        return self.plan.dump(obj)
+
+
+@dataclasses.dataclass(frozen=True)
+class PlanDeserializer(ClassDeserializer[T]):
+    """Used by jsons for planned classes nested in other values"""
+
+    plan: typing.Optional[ClassPlan] = None
+
+    def __call__(self, obj: dict, cls: type, **kwargs) -> T:
+        return self.plan.load(obj)
 
 
 def _set_serializer(cls: typing.Type[T], serializer: ClassSerializer[T]) -> None:
@@ -107,15 +129,33 @@ def serializable(
     fork_inst: typing.Type[StateHolder] = StateHolder,
 ) -> typing.Callable[[typing.Type[T]], typing.Type[T]]:
     def class_wrapper(cls: typing.Type[T]) -> typing.Type[T]:
+        serializer: ClassSerializer[T] = _pop_serializer(cls=cls)
+        deserializer: ClassDeserializer[T] = _pop_deserializer(cls=cls)
+
+        # the annotations are needed to compile, they are cleaned below
+        try:
+            plan: ClassPlan = compile_plan(
+                cls=cls,
+                serializer=serializer,
+                deserializer=deserializer,
+            )
+        except UnsupportedTypeError:
+            pass
+        else:
+            setattr(cls, PLAN_ATTRIBUTE, plan)
+
+            serializer = PlanSerializer(plan=plan)
+            deserializer = PlanDeserializer(plan=plan)
+
         _clean_dataclass_class_variables(cls=cls)
 
         jsons.set_serializer(
-            _pop_serializer(cls=cls),
+            serializer,
             cls=cls,
             fork_inst=fork_inst,
         )
         jsons.set_deserializer(
-            _pop_deserializer(cls=cls),
+            deserializer,
             cls=cls,
             fork_inst=fork_inst,
         )
@@ -5,7 +5,6 @@ import enum
 import io
 import typing
 
-import jsons
 from ruamel.yaml import YAML
 
 try:
@@ -37,32 +36,14 @@ class JsonFormatter(Formatter):
         super().__init__(fork_inst)
 
         self._parameters: JsonParameters = parameters
+        # the parameters are immutable, convert them once
+        self._kwargs: dict[str, typing.Any] = parameters.as_dict()
 
     def _convert_obj_to_str(self, data: object) -> str:
-        return json.dumps(
-            data,
-            **typing.cast(
-                dict,
-                jsons.dump(
-                    self._parameters,
-                    cls=JsonParameters,
-                    strip_nulls=True,
-                ),
-            ),
-        )
+        return json.dumps(data, **self._kwargs)
 
     def _convert_str_to_obj(self, data: str) -> object:
-        return json.loads(
-            data,
-            **typing.cast(
-                dict,
-                jsons.dump(
-                    self._parameters,
-                    cls=JsonParameters,
-                    strip_nulls=True,
-                ),
-            ),
-        )
+        return json.loads(data, **self._kwargs)
 
 
 @dataclasses.dataclass(frozen=True, kw_only=True)
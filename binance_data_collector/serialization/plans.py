@@ -0,0 +1,347 @@
+# coding=utf-8
+"""Compiled (de)serialization plans of dataclasses.
+
+A plan resolves the type of every field once and turns it into a chain of
+plain converter functions, so dumping and loading an instance does no type
+inspection at all. Types a plan cannot handle are left to jsons.
+"""
+import dataclasses
+import datetime
+import enum
+import types
+import typing
+
+if typing.TYPE_CHECKING:
+    from .core import ClassDeserializer, ClassSerializer
+
+__all__ = [
+    "ClassPlan",
+    "UnsupportedTypeError",
+    "compile_plan",
+    "dump_value",
+    "get_loader",
+    "get_plan",
+]
+
+T = typing.TypeVar("T")
+Converter = typing.Callable[[typing.Any], typing.Any]
+
+PLAN_ATTRIBUTE: str = "__serialization_plan__"
+PRIMITIVES: tuple[type, ...] = (str, int, float, bool, type(None))
+
+
+class UnsupportedTypeError(TypeError):
+    pass
+
+
+def _identity(value: typing.Any) -> typing.Any:
+    return value
+
+
+def _dump_datetime(value: datetime.datetime) -> str:
+    # RFC3339 as written by jsons: microseconds only if set, UTC as `Z`
+    text: str = value.isoformat(
+        timespec="microseconds" if value.microsecond else "seconds",
+    )
+
+    if text.endswith("+00:00"):
+        text = text[:-6] + 'Z'
+
+    return text
+
+
+def _load_datetime(value: str) -> datetime.datetime:
+    if value.endswith('Z'):
+        value = value[:-1] + "+00:00"
+
+    return datetime.datetime.fromisoformat(value)
+
+
+def _dump_enum(value: enum.Enum) -> typing.Any:
+    return value.value
+
+
+def _is_optional(tp: typing.Any) -> bool:
+    return (
+        typing.get_origin(tp) in (typing.Union, types.UnionType)
+        and
+        type(None) in typing.get_args(tp)
+    )
+
+
+def _get_optional_type(tp: typing.Any) -> typing.Any:
+    args: list[typing.Any] = [
+        arg for arg in typing.get_args(tp) if arg is not type(None)
+    ]
+
+    if len(args) != 1:
+        raise UnsupportedTypeError(f"Union {tp} is not supported")
+
+    return args[0]
+
+
+def _compile(tp: typing.Any, dump: bool) -> Converter:
+    """Converter of values of the type, `dump` selects the direction"""
+
+    if tp is typing.Any or tp in PRIMITIVES:
+        return _identity
+
+    if _is_optional(tp):
+        converter: Converter = _compile(tp=_get_optional_type(tp), dump=dump)
+
+        return lambda value: None if value is None else converter(value)
+
+    origin: typing.Any = typing.get_origin(tp)
+    args: tuple[typing.Any, ...] = typing.get_args(tp)
+
+    if origin is list:
+        item: Converter = _compile(tp=args[0] if args else typing.Any, dump=dump)
+
+        if item is _identity:
+            return list
+
+        return lambda value: [item(v) for v in value]
+
+    if origin is dict:
+        key: Converter = _compile(tp=args[0] if args else typing.Any, dump=dump)
+        item: Converter = _compile(tp=args[1] if args else typing.Any, dump=dump)
+
+        return lambda value: {key(k): item(v) for k, v in value.items()}
+
+    if origin is not None:
+        raise UnsupportedTypeError(f"Type {tp} is not supported")
+
+    if isinstance(tp, type) and issubclass(tp, datetime.datetime):
+        return _dump_datetime if dump else _load_datetime
+
+    if isinstance(tp, type) and issubclass(tp, enum.Enum):
+        return _dump_enum if dump else tp
+
+    if dataclasses.is_dataclass(tp):
+        # resolved on use, the plan of a nested class may not exist yet
+        if dump:
+            return lambda value: get_plan(cls=tp).dump(value)
+
+        return lambda value: get_plan(cls=tp).load(value)
+
+    raise UnsupportedTypeError(f"Type {tp} is not supported")
+
+
+@dataclasses.dataclass(frozen=True)
+class FieldPlan(object):
+    name: str
+    key: str
+    dump: Converter
+    load: Converter
+    init: bool
+
+
+class ClassPlan(object):
+    """Dump and load instances of a dataclass with precompiled converters"""
+
+    def __init__(
+        self,
+        cls: type,
+        fields: list[FieldPlan],
+        strip_nulls: bool = False,
+        key_transformer: typing.Optional[typing.Callable[[str], str]] = None,
+    ) -> None:
+        self._cls: type = cls
+        self._fields: list[FieldPlan] = fields
+        self._strip_nulls: bool = strip_nulls
+
+        self._fields_by_name: dict[str, FieldPlan] = {f.name: f for f in fields}
+        # keys of the loaded document -> field names
+        self._key_transformer: typing.Optional[typing.Callable[[str], str]] = \
+            key_transformer
+
+    @property
+    def cls(self) -> type:
+        return self._cls
+
+    def dump(self, obj: typing.Any) -> dict[str, typing.Any]:
+        data: dict[str, typing.Any] = {}
+
+        for f in self._fields:
+            value: typing.Any = getattr(obj, f.name)
+
+            if value is None:
+                if not self._strip_nulls:
+                    data[f.key] = None
+            else:
+                data[f.key] = f.dump(value)
+
+        return data
+
+    def load(self, data: dict[str, typing.Any]) -> typing.Any:
+        kwargs: dict[str, typing.Any] = {}
+        late: dict[str, typing.Any] = {}
+
+        for key, value in data.items():
+            if self._key_transformer is not None:
+                key = self._key_transformer(key)
+
+            f: typing.Optional[FieldPlan] = self._fields_by_name.get(key, None)
+
+            if f is None:
+                continue
+
+            value = None if value is None else f.load(value)
+
+            if f.init:
+                kwargs[f.name] = value
+            else:
+                late[f.name] = value
+
+        obj: typing.Any = self._cls(**kwargs)
+
+        for name, value in late.items():
+            object.__setattr__(obj, name, value)
+
+        return obj
+
+
+def compile_plan(
+    cls: typing.Type[T],
+    serializer: typing.Optional["ClassSerializer"] = None,
+    deserializer: typing.Optional["ClassDeserializer"] = None,
+) -> ClassPlan:
+    """Compile the plan of a dataclass, raises UnsupportedTypeError.
+
+    The type hints are resolved here, so it must be called while the class
+    annotations are intact.
+    """
+
+    if not dataclasses.is_dataclass(cls):
+        raise UnsupportedTypeError(f"{cls} is not a dataclass")
+
+    strip_nulls: bool = False
+    strip_privates: bool = False
+    strip_attr: tuple[str, ...] = ()
+    key_transformer: typing.Optional[typing.Callable[[str], str]] = None
+
+    if serializer is not None:
+        # options only the generic jsons path implements
+        if serializer.verbose or not serializer.strip_properties:
+            raise UnsupportedTypeError("Serializer options are not supported")
+
+        strip_nulls = serializer.strip_nulls
+        strip_privates = serializer.strip_privates
+        strip_attr = (
+            (serializer.strip_attr,)
+            if isinstance(serializer.strip_attr, str)
+            else tuple(serializer.strip_attr or ())
+        )
+        key_transformer = serializer.key_transformer
+
+    hints: dict[str, typing.Any] = typing.get_type_hints(cls)
+    fields: list[FieldPlan] = []
+
+    for f in dataclasses.fields(cls):
+        if f.name in strip_attr:
+            continue
+
+        if strip_privates and f.name.startswith('_'):
+            continue
+
+        tp: typing.Any = hints.get(f.name, typing.Any)
+
+        fields.append(
+            FieldPlan(
+                name=f.name,
+                key=key_transformer(f.name) if key_transformer else f.name,
+                dump=_compile(tp=tp, dump=True),
+                load=_compile(tp=tp, dump=False),
+                init=f.init,
+            )
+        )
+
+    return ClassPlan(
+        cls=cls,
+        fields=fields,
+        strip_nulls=strip_nulls,
+        key_transformer=(
+            deserializer.key_transformer if deserializer is not None else None
+        ),
+    )
+
+
+def get_plan(cls: type) -> ClassPlan:
+    """Plan of the class, compiled on first use for plain dataclasses"""
+
+    plan: typing.Optional[ClassPlan] = cls.__dict__.get(PLAN_ATTRIBUTE, None)
+
+    if plan is None:
+        plan = compile_plan(cls=cls)
+        setattr(cls, PLAN_ATTRIBUTE, plan)
+
+    return plan
+
+
+def _has_plan(tp: typing.Any) -> bool:
+    if isinstance(tp, type) and PLAN_ATTRIBUTE in tp.__dict__:
+        return True
+
+    return any(_has_plan(tp=arg) for arg in typing.get_args(tp))
+
+
+_loaders: dict[typing.Any, typing.Optional[Converter]] = {}
+
+
+def get_loader(tp: typing.Any) -> typing.Optional[Converter]:
+    """Compiled loader of a type which involves a planned class, or None"""
+
+    try:
+        return _loaders[tp]
+    except KeyError:
+        pass
+    except TypeError:
+        # unhashable type hint
+        return None
+
+    loader: typing.Optional[Converter] = None
+
+    if _has_plan(tp=tp):
+        try:
+            loader = _compile(tp=tp, dump=False)
+        except UnsupportedTypeError:
+            loader = None
+
+    _loaders[tp] = loader
+
+    return loader
+
+
+class _Fallback(Exception):
+    pass
+
+
+def _dump(obj: typing.Any) -> typing.Any:
+    if type(obj) in PRIMITIVES:
+        return obj
+
+    plan: typing.Optional[ClassPlan] = \
+        type(obj).__dict__.get(PLAN_ATTRIBUTE, None)
+
+    if plan is not None:
+        return plan.dump(obj)
+
+    if type(obj) is dict:
+        if not all(type(k) is str for k in obj.keys()):
+            raise _Fallback()
+
+        return {k: _dump(v) for k, v in obj.items()}
+
+    if type(obj) is list:
+        return [_dump(v) for v in obj]
+
+    raise _Fallback()
+
+
+def dump_value(obj: typing.Any) -> typing.Any:
+    """Dump containers of planned instances, None if jsons is needed"""
+
+    try:
+        return _dump(obj)
+    except _Fallback:
+        return None
@@ -0,0 +1,96 @@
+# coding=utf-8
+import typing
+import uuid
+from pathlib import Path
+
+import pytest
+
+from binance_data_collector.environments import environment
+from binance_data_collector.rxpy import Subject
+
+
+class FakeScheduler(object):
+    """Records the jobs instead of running them"""
+
+    def __init__(self) -> None:
+        self.jobs: list[dict[str, typing.Any]] = []
+
+    def call_later(self, **kwargs: typing.Any) -> dict[str, typing.Any]:
+        self.jobs.append(kwargs)
+
+        return kwargs
+
+    def call_every(self, **kwargs: typing.Any) -> dict[str, typing.Any]:
+        self.jobs.append(kwargs)
+
+        return kwargs
+
+    def cancel(self, job: typing.Any) -> None:
+        if job in self.jobs:
+            self.jobs.remove(job)
+
+
+class FakeConnection(object):
+    def __init__(self, url: str) -> None:
+        self.id: str = str(uuid.uuid4())
+        self.url: str = url
+        self.messages: Subject = Subject()
+        self.events: Subject = Subject()
+        self.sent: list[dict[str, typing.Any]] = []
+
+    def send_message(self, message: dict[str, typing.Any]) -> None:
+        self.sent.append(message)
+
+
+class FakeWebSocketManager(object):
+    """Hands out connections which never connect by themselves"""
+
+    def __init__(self) -> None:
+        self.connections: dict[str, FakeConnection] = {}
+        self.calls: list[tuple[float, typing.Callable[[], typing.Any]]] = []
+
+    def create_connection(self, url: str, raw: bool = False) -> FakeConnection:
+        connection: FakeConnection = FakeConnection(url=url)
+        self.connections[connection.id] = connection
+
+        return connection
+
+    def delete_connection(self, connection: FakeConnection) -> None:
+        self.connections.pop(connection.id, None)
+
+    def set_paused(self, paused: bool) -> None:
+        pass
+
+    def call_later(self, delay_s: float, callable_: typing.Callable[[], typing.Any]) -> None:
+        self.calls.append((delay_s, callable_))
+
+
+@pytest.fixture()
+def data_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(environment, "data_root", str(tmp_path))
+    monkeypatch.setattr(environment, "data_file_flush_size", 2000)
+    monkeypatch.setattr(environment, "data_file_fsync_policy", "NEVER")
+
+    return tmp_path
+
+
+@pytest.fixture()
+def scheduler() -> FakeScheduler:
+    return FakeScheduler()
+
+
+def trade_frame(i: int) -> dict[str, typing.Any]:
+    return {
+        "stream": "btcusdt@trade",
+        "data": {
+            "e": "trade",
+            "E": 1000 + i,
+            "s": "BTCUSDT",
+            "t": i,
+            "p": "1.01000000",
+            "q": "2.00300000",
+            "T": 1000 + i,
+            "m": True,
+            "M": False,
+        },
+    }
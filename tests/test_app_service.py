@@ -0,0 +1,109 @@
+# coding=utf-8
+import concurrent.futures
+import json
+import typing
+
+import pytest
+
+from binance_data_collector.api import HTTPException
+from binance_data_collector.app.app_service import AppService
+from binance_data_collector.app.helpers.catalog import Catalog
+from binance_data_collector.app.helpers.data_file_manager import DataFileManager
+from binance_data_collector.app.helpers.segments import (
+    PARTIAL_SUFFIX,
+    SegmentInfo,
+    finalize_partial,
+)
+from binance_data_collector.app.models.currency_pair import CurrencyPair
+
+from conftest import trade_frame
+
+
+class FakeRepository(object):
+    def __init__(self, currency_pair: CurrencyPair) -> None:
+        self._currency_pair: CurrencyPair = currency_pair
+
+    def read(self, uuid: str) -> CurrencyPair:
+        return self._currency_pair
+
+
+@pytest.mark.parametrize("before_query", [True, False])
+def test_segment_closed_while_listing_is_read_once(data_root, scheduler, before_query):
+    currency_pair: CurrencyPair = CurrencyPair(base="BTC", quote="USDT")
+    catalog: Catalog = Catalog()
+    manager: DataFileManager = DataFileManager(scheduler=scheduler, catalog=catalog)
+
+    for i in range(300):
+        manager.get_file(currency_pair=currency_pair, name="trade").write_data(
+            data=trade_frame(i),
+        )
+
+    manager.get_file(currency_pair=currency_pair, name="trade").flush()
+
+    find: typing.Callable[..., list[SegmentInfo]] = catalog.find
+
+    def close() -> None:
+        for partial_path in (data_root / "btc_usdt").glob(f"*{PARTIAL_SUFFIX}"):
+            segment = finalize_partial(
+                path=partial_path.with_name(partial_path.name.removesuffix(PARTIAL_SUFFIX)),
+            )
+            catalog.add(info=SegmentInfo.create(segment=segment, data_root=catalog.data_root))
+
+    # the segment is closed while the segments are listed
+    def close_and_find(**kwargs: typing.Any) -> list[SegmentInfo]:
+        if before_query:
+            close()
+
+        segments: list[SegmentInfo] = find(**kwargs)
+
+        if not before_query:
+            close()
+
+        return segments
+
+    catalog.find = close_and_find
+
+    service: AppService = AppService(
+        data_collector=None,
+        catalog=catalog,
+        repository=FakeRepository(currency_pair=currency_pair),
+    )
+
+    lines: list[bytes] = b"".join(
+        service.get_data(uuid=currency_pair.uuid, channel="trade"),
+    ).splitlines()
+
+    assert [json.loads(line)["data"]["t"] for line in lines] == list(range(300))
+
+    catalog.close()
+
+
+@pytest.mark.parametrize("method", ["start_currency_pairs", "stop_currency_pairs"])
+def test_bulk_operations_require_a_filter(method):
+    service: AppService = AppService(
+        data_collector=None,
+        catalog=None,
+        repository=FakeRepository(currency_pair=CurrencyPair(base="BTC", quote="USDT")),
+    )
+
+    with pytest.raises(HTTPException) as e:
+        getattr(service, method)(query={"base": None, "quote": None, "status": None})
+
+    assert e.value.status_code == 400
+
+
+def test_order_book_timeout_is_a_gateway_timeout():
+    class SlowCollector(object):
+        def get_order_book(self, currency_pair: CurrencyPair, depth: int) -> None:
+            raise concurrent.futures.TimeoutError()
+
+    service: AppService = AppService(
+        data_collector=SlowCollector(),
+        catalog=None,
+        repository=FakeRepository(currency_pair=CurrencyPair(base="BTC", quote="USDT")),
+    )
+
+    with pytest.raises(HTTPException) as e:
+        service.get_order_book(uuid="uuid", depth=20)
+
+    assert e.value.status_code == 504
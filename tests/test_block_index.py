@@ -0,0 +1,94 @@
+# coding=utf-8
+import json
+from pathlib import Path
+
+import pytest
+
+from binance_data_collector.environments import environment
+from binance_data_collector.app.helpers.block_index import DataFileReader
+from binance_data_collector.app.helpers.catalog import Catalog
+from binance_data_collector.app.helpers.data_file_manager import (
+    DataFile,
+    DataFileManager,
+    create_codec_for,
+)
+from binance_data_collector.app.models.currency_pair import CurrencyPair
+
+from conftest import trade_frame
+
+
+def write_segment(data_root: Path, scheduler, times: list[int]) -> Path:
+    """Closed data file of trades at the event times, 25 records per block"""
+
+    catalog: Catalog = Catalog()
+    manager: DataFileManager = DataFileManager(scheduler=scheduler, catalog=catalog)
+    manager.on_init()
+
+    currency_pair: CurrencyPair = CurrencyPair(base="BTC", quote="USDT")
+
+    for i, time_ms in enumerate(times):
+        frame = trade_frame(i)
+        frame["data"]["E"] = time_ms
+
+        data_file: DataFile = manager.get_file(currency_pair=currency_pair, name="trade")
+        data_file.write_data(data=frame)
+
+        if i % 25 == 24:
+            data_file.flush()
+
+    manager.on_destroy()
+
+    [segment] = catalog.find(symbol="BTCUSDT", name="trade")
+    catalog.close()
+
+    return data_root / segment.path
+
+
+def read_times(reader: DataFileReader, from_ms: int, to_ms: int) -> list[int]:
+    return [
+        json.loads(line)["data"]["E"]
+        for line in reader.iter_lines(from_ms=from_ms, to_ms=to_ms)
+    ]
+
+
+@pytest.fixture()
+def reader_of(data_root, scheduler, monkeypatch):
+    # flushed by the helper only
+    monkeypatch.setattr(environment, "data_file_flush_size", 1024 * 1024)
+
+    def reader_of(times: list[int]) -> DataFileReader:
+        path: Path = write_segment(data_root=data_root, scheduler=scheduler, times=times)
+
+        return DataFileReader(path=path, codec=create_codec_for(path=path))
+
+    return reader_of
+
+
+def test_range_reads_only_the_blocks_it_overlaps(reader_of):
+    reader: DataFileReader = reader_of([1000 + i for i in range(200)])
+
+    assert len(reader.blocks) == 8
+    # records 1060 to 1080 are in the third and fourth block
+    assert reader.find_blocks(from_ms=1060, to_ms=1080) == reader.blocks[2:4]
+    assert reader.find_blocks(from_ms=2000) == []
+    assert reader.find_blocks(to_ms=999) == []
+    assert reader.find_blocks() == reader.blocks
+
+    assert read_times(reader, from_ms=1060, to_ms=1080) == list(range(1060, 1081))
+
+
+def test_late_records_are_found_in_earlier_blocks(reader_of):
+    times: list[int] = [1000 + i for i in range(200)]
+    # a record of the sixth block arrived early, one of the first block late
+    times[10], times[140] = times[140], times[10]
+
+    reader: DataFileReader = reader_of(times)
+
+    # the first block holds 1140, the sixth one 1010
+    assert reader.find_blocks(from_ms=1140, to_ms=1140) == reader.blocks[:6]
+    assert reader.find_blocks(from_ms=1010, to_ms=1010) == reader.blocks[:6]
+
+    assert read_times(reader, from_ms=1140, to_ms=1140) == [1140]
+    assert read_times(reader, from_ms=1005, to_ms=1015) == [
+        1005, 1006, 1007, 1008, 1009, 1011, 1012, 1013, 1014, 1015, 1010,
+    ]
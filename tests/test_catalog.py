@@ -0,0 +1,126 @@
+# coding=utf-8
+import json
+from pathlib import Path
+
+from binance_data_collector.app.helpers.catalog import Catalog
+from binance_data_collector.app.helpers.data_file_manager import DataFileManager
+from binance_data_collector.app.helpers.segments import MANIFEST_NAME
+from binance_data_collector.app.models.currency_pair import CurrencyPair
+from binance_data_collector.environments import environment
+
+from conftest import FakeScheduler, trade_frame
+
+
+def write_segments(data_root: Path, scheduler: FakeScheduler, crash: bool) -> None:
+    catalog: Catalog = Catalog()
+    manager: DataFileManager = DataFileManager(scheduler=scheduler, catalog=catalog)
+    currency_pair: CurrencyPair = CurrencyPair(base="BTC", quote="USDT")
+
+    # without started writers nothing is written behind the simulated crash
+    if not crash:
+        manager.on_init()
+
+    for i in range(300):
+        manager.get_file(currency_pair=currency_pair, name="trade").write_data(
+            data=trade_frame(i),
+        )
+
+    if crash:
+        manager.get_file(currency_pair=currency_pair, name="trade").flush()
+    else:
+        manager.on_destroy()
+
+    catalog.close()
+
+
+def test_recovered_before_on_init_is_cataloged(data_root, scheduler):
+    write_segments(data_root=data_root, scheduler=scheduler, crash=True)
+
+    # the routes are opened (and recovered) while the providers are created
+    catalog: Catalog = Catalog()
+    manager: DataFileManager = DataFileManager(scheduler=scheduler, catalog=catalog)
+    manager.open_routes(
+        currency_pair=CurrencyPair(base="BTC", quote="USDT"),
+        names=["trade"],
+    )
+
+    segments = catalog.find(symbol="BTCUSDT", name="trade")
+
+    assert len(segments) == 1
+    assert segments[0].recovered
+    assert segments[0].records == 300
+
+    catalog.close()
+
+
+def test_on_init_backfills_from_manifest(data_root, scheduler):
+    write_segments(data_root=data_root, scheduler=scheduler, crash=False)
+
+    (data_root / "catalog.db").unlink()
+
+    catalog: Catalog = Catalog()
+    assert catalog.find() == []
+
+    catalog.on_init()
+
+    manifest: Path = data_root / "btc_usdt" / MANIFEST_NAME
+    entry = json.loads(manifest.read_text().splitlines()[0])
+
+    assert [segment.path for segment in catalog.find()] == [entry["path"]]
+
+    catalog.close()
+
+
+def test_find_by_time_range(data_root, scheduler):
+    write_segments(data_root=data_root, scheduler=scheduler, crash=False)
+
+    catalog: Catalog = Catalog()
+
+    assert len(catalog.find(symbol="btcusdt", from_ms=1100, to_ms=1200)) == 1
+    assert catalog.find(symbol="BTCUSDT", from_ms=1300) == []
+    assert catalog.find(symbol="BTCUSDT", to_ms=999) == []
+    assert catalog.find(name="depth") == []
+
+    catalog.close()
+
+
+def test_backfill_reads_new_manifest_lines_only(data_root, scheduler):
+    write_segments(data_root=data_root, scheduler=scheduler, crash=False)
+
+    catalog: Catalog = Catalog()
+
+    assert catalog.rebuild(full=False) == 1
+    assert catalog.rebuild(full=False) == 0
+
+    manifest: Path = data_root / "btc_usdt" / MANIFEST_NAME
+    line: str = manifest.read_text().splitlines()[0]
+    entry = {**json.loads(line), "path": "btc_usdt/other"}
+
+    # a torn line is left for the next backfill
+    with open(manifest, mode="a") as f:
+        f.write(json.dumps(entry)[:10])
+
+    assert catalog.rebuild(full=False) == 0
+
+    with open(manifest, mode="a") as f:
+        f.write(json.dumps(entry)[10:] + "\n")
+
+    assert catalog.rebuild(full=False) == 1
+    assert len(catalog.find()) == 2
+    assert catalog.rebuild() == 2
+
+    catalog.close()
+
+
+def test_backfill_is_skipped_in_workers(data_root, scheduler, monkeypatch):
+    write_segments(data_root=data_root, scheduler=scheduler, crash=False)
+    (data_root / "catalog.db").unlink()
+
+    monkeypatch.setattr(environment, "catalog_backfill", False)
+
+    catalog: Catalog = Catalog()
+    catalog.on_init()
+
+    assert catalog.find() == []
+
+    catalog.close()
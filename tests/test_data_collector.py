@@ -0,0 +1,188 @@
+# coding=utf-8
+import concurrent.futures
+import typing
+
+import pytest
+
+from binance_data_collector.environments import environment
+from binance_data_collector.app.helpers import data_collector
+from binance_data_collector.app.helpers.catalog import Catalog
+from binance_data_collector.app.helpers.data_collector import DataCollector
+from binance_data_collector.app.helpers.data_file_manager import DataFileManager
+from binance_data_collector.app.helpers.web_socket_manager import (
+    WebSocketEvent,
+    WebSocketEventType,
+    WebSocketMessage,
+)
+from binance_data_collector.app.models.currency_pair import CurrencyPair
+
+from conftest import FakeScheduler, FakeWebSocketManager
+
+
+@pytest.fixture()
+def collector(data_root, scheduler) -> typing.Iterator[DataCollector]:
+    catalog: Catalog = Catalog()
+    manager: DataFileManager = DataFileManager(scheduler=scheduler, catalog=catalog)
+    manager.on_init()
+
+    collector: DataCollector = DataCollector(
+        data_file_manager=manager,
+        web_socket_manager=FakeWebSocketManager(),
+        scheduler=scheduler,
+    )
+    # no requests to the exchange
+    collector.snapshots: list[str] = []
+    collector._request_snapshot = lambda currency_pair: collector.snapshots.append(
+        currency_pair.symbol,
+    )
+
+    yield collector
+
+    collector.on_destroy()
+    manager.on_destroy()
+    catalog.close()
+
+
+def test_late_snapshot_of_a_removed_pair_is_dropped(collector):
+    currency_pair: CurrencyPair = CurrencyPair(base="BTC", quote="USDT")
+
+    collector.add_currency_pair(currency_pair=currency_pair)
+    collector.remove_currency_pair(currency_pair=currency_pair)
+
+    collector._handle_snapshot(
+        currency_pair=currency_pair,
+        data={"lastUpdateId": 1, "bids": [], "asks": []},
+    )
+
+    assert collector._data_file_manager.route(symbol="btcusdt", name="snapshot") is None
+
+
+def test_shard_subscribes_every_stream_on_connect(collector):
+    btc: CurrencyPair = CurrencyPair(base="BTC", quote="USDT")
+    eth: CurrencyPair = CurrencyPair(base="ETH", quote="USDT")
+
+    # a single shard
+    collector._connections = 1
+
+    collector.add_currency_pair(currency_pair=btc)
+    collector.add_currency_pair(currency_pair=eth)
+
+    [shard] = collector._shards.values()
+
+    locked: list[bool] = []
+    connect = shard.scheduler.connect
+
+    def record_and_connect(streams: list[str]) -> None:
+        locked.append(data_collector.lock.locked())
+        connect(streams=streams)
+
+    shard.scheduler.connect = record_and_connect
+
+    collector._handle_shard_event(
+        shard=shard,
+        event=WebSocketEvent(type=WebSocketEventType.CONNECTED),
+    )
+
+    # requests made before the connection are dropped, not sent
+    assert shard.connection.url.endswith("/stream")
+    assert shard.connection.sent == []
+    assert locked == [True]
+    assert shard.scheduler.queued == 4
+
+
+def depth_message(first: int, last: int, bids=(), asks=()) -> WebSocketMessage:
+    return WebSocketMessage(
+        symbol="btcusdt",
+        channel="depth",
+        data={"data": {"U": first, "u": last, "b": list(bids), "a": list(asks)}},
+    )
+
+
+def test_gap_in_update_ids_requests_a_snapshot(collector):
+    currency_pair: CurrencyPair = CurrencyPair(base="BTC", quote="USDT")
+
+    collector.add_currency_pair(currency_pair=currency_pair)
+
+    collector._check_update_ids(currency_pair=currency_pair, message=depth_message(1, 5))
+    collector._check_update_ids(currency_pair=currency_pair, message=depth_message(6, 8))
+    # a replayed diff is not a gap
+    collector._check_update_ids(currency_pair=currency_pair, message=depth_message(3, 7))
+
+    assert collector.snapshots == ["btcusdt"]
+    assert collector._gaps == 0
+
+    collector._check_update_ids(currency_pair=currency_pair, message=depth_message(10, 12))
+
+    assert collector.snapshots == ["btcusdt", "btcusdt"]
+    assert collector._gaps == 1
+    assert collector._currency_pairs["btcusdt"].last_update_id == 12
+
+
+def test_order_book_gap_and_stale_snapshot_request_a_snapshot(collector, monkeypatch):
+    monkeypatch.setattr(environment, "order_book", True)
+
+    currency_pair: CurrencyPair = CurrencyPair(base="BTC", quote="USDT")
+
+    collector.add_currency_pair(currency_pair=currency_pair)
+    collector._update_order_book(symbol="btcusdt", message=depth_message(20, 25))
+
+    collector._handle_snapshot(
+        currency_pair=currency_pair,
+        data={"lastUpdateId": 10, "bids": [], "asks": []},
+    )
+
+    assert collector.snapshots == ["btcusdt"]
+
+    collector._handle_snapshot(
+        currency_pair=currency_pair,
+        data={"lastUpdateId": 22, "bids": [["9.0", "1"]], "asks": []},
+    )
+    collector._update_order_book(symbol="btcusdt", message=depth_message(26, 27))
+
+    assert collector.snapshots == ["btcusdt"]
+
+    collector._update_order_book(symbol="btcusdt", message=depth_message(30, 31))
+
+    assert collector.snapshots == ["btcusdt", "btcusdt"]
+
+
+class FakeSnapshotFetcher(object):
+    def __init__(self) -> None:
+        self.futures: list[concurrent.futures.Future] = []
+
+    def submit(self, currency_pair: CurrencyPair, callback) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self.futures.append(future)
+
+        return future
+
+    def close(self) -> None:
+        pass
+
+
+def test_snapshot_requested_while_in_flight_is_fetched_again(collector):
+    currency_pair: CurrencyPair = CurrencyPair(base="BTC", quote="USDT")
+
+    collector.add_currency_pair(currency_pair=currency_pair)
+
+    fetcher: FakeSnapshotFetcher = FakeSnapshotFetcher()
+    collector._snapshot_fetcher.close()
+    collector._snapshot_fetcher = fetcher
+    # the real requests, not the ones recorded by the fixture
+    request_snapshot = collector._request_snapshot = DataCollector._request_snapshot.__get__(collector)
+
+    request_snapshot(currency_pair=currency_pair)
+    request_snapshot(currency_pair=currency_pair)
+    request_snapshot(currency_pair=currency_pair)
+
+    assert len(fetcher.futures) == 1
+
+    fetcher.futures[0].set_result(None)
+
+    # the requests made in flight are merged into one
+    assert len(fetcher.futures) == 2
+
+    fetcher.futures[1].set_result(None)
+
+    assert len(fetcher.futures) == 2
+    assert collector._snapshots_in_flight == set()
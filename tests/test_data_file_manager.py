@@ -0,0 +1,181 @@
+# coding=utf-8
+import datetime
+
+import pytest
+
+from binance_data_collector.environments import environment
+from binance_data_collector.app.helpers import data_file_manager
+from binance_data_collector.app.helpers.catalog import Catalog
+from binance_data_collector.app.helpers.data_file_manager import (
+    DataFile,
+    DataFileManager,
+    FileHandleCache,
+    FileHandleMetrics,
+)
+from binance_data_collector.app.models.currency_pair import CurrencyPair
+
+from conftest import trade_frame
+
+
+def test_rollover_retires_files_outside_the_lock(data_root, scheduler, monkeypatch):
+    catalog: Catalog = Catalog()
+    manager: DataFileManager = DataFileManager(scheduler=scheduler, catalog=catalog)
+    manager.on_init()
+
+    currency_pair: CurrencyPair = CurrencyPair(base="BTC", quote="USDT")
+
+    for i in range(100):
+        manager.get_file(currency_pair=currency_pair, name="trade").write_data(
+            data=trade_frame(i),
+        )
+
+    locked: list[bool] = []
+    retire = DataFile.retire
+
+    def record_and_retire(self: DataFile, successor: DataFile) -> None:
+        locked.append(data_file_manager.lock.locked())
+        retire(self, successor=successor)
+
+    monkeypatch.setattr(DataFile, "retire", record_and_retire)
+
+    old: DataFile = manager.route(symbol=currency_pair.symbol, name="trade")
+    manager._rollover(ts=old.ts + datetime.timedelta(days=1))
+
+    new: DataFile = manager.route(symbol=currency_pair.symbol, name="trade")
+
+    assert locked == [False]
+    assert new is not old
+
+    manager.on_destroy()
+
+    segments = catalog.find(symbol="BTCUSDT", name="trade")
+
+    assert [segment.records for segment in segments] == [100]
+
+    catalog.close()
+
+
+def test_routes_are_closed_outside_the_lock(data_root, scheduler, monkeypatch):
+    catalog: Catalog = Catalog()
+    manager: DataFileManager = DataFileManager(scheduler=scheduler, catalog=catalog)
+    manager.on_init()
+
+    btc: CurrencyPair = CurrencyPair(base="BTC", quote="USDT")
+    eth: CurrencyPair = CurrencyPair(base="ETH", quote="USDT")
+
+    manager.open_routes(currency_pair=btc, names=["trade", "depth"])
+    manager.open_routes(currency_pair=eth, names=["trade"])
+
+    locked: list[bool] = []
+    close = DataFile.close
+
+    def record_and_close(self: DataFile) -> None:
+        locked.append(data_file_manager.lock.locked())
+        close(self)
+
+    monkeypatch.setattr(DataFile, "close", record_and_close)
+
+    manager.close_routes(currency_pair=btc)
+
+    assert manager.route(symbol=btc.symbol, name="trade") is None
+    assert manager.route(symbol=eth.symbol, name="trade") is not None
+
+    manager.on_destroy()
+
+    assert locked == [False, False, False]
+
+    catalog.close()
+
+
+def test_name_pattern_without_extension_is_rejected(data_root, scheduler, monkeypatch):
+    monkeypatch.setattr(environment, "data_file_name_pattern", "{name}_{ts}.{format}")
+
+    catalog: Catalog = Catalog()
+
+    with pytest.raises(RuntimeError):
+        DataFileManager(scheduler=scheduler, catalog=catalog)
+
+    catalog.close()
+
+
+class FakeDataFile(object):
+    def __init__(self, busy: bool = False) -> None:
+        self.busy: bool = busy
+        self.released: int = 0
+
+    def release(self, blocking: bool = True) -> bool:
+        if self.busy:
+            return False
+
+        self.released += 1
+
+        return True
+
+
+def test_handle_cache_evicts_the_least_recently_used_file():
+    cache: FileHandleCache = FileHandleCache(capacity=2)
+    a, b, c = FakeDataFile(), FakeDataFile(), FakeDataFile()
+
+    cache.acquire(data_file=a)
+    cache.acquire(data_file=b)
+    cache.acquire(data_file=a)
+    cache.acquire(data_file=c)
+
+    assert (a.released, b.released, c.released) == (0, 1, 0)
+    assert cache.get_metrics() == FileHandleMetrics(
+        capacity=2,
+        open=2,
+        hits=1,
+        misses=3,
+        evictions=1,
+    )
+
+
+def test_handle_cache_keeps_a_file_being_flushed():
+    cache: FileHandleCache = FileHandleCache(capacity=1)
+    busy, idle = FakeDataFile(busy=True), FakeDataFile()
+
+    cache.acquire(data_file=busy)
+    cache.acquire(data_file=idle)
+
+    assert busy.released == 0
+    assert cache.get_metrics().open == 2
+    assert cache.get_metrics().evictions == 0
+
+    # evicted by the next miss once it is done
+    busy.busy = False
+    cache.acquire(data_file=FakeDataFile())
+
+    assert busy.released == 1
+
+
+def test_evicted_files_are_reopened_for_append(data_root, scheduler, monkeypatch):
+    monkeypatch.setattr(environment, "data_file_max_open", 1)
+    # flushed by the test only
+    monkeypatch.setattr(environment, "data_file_flush_size", 1024 * 1024)
+
+    catalog: Catalog = Catalog()
+    manager: DataFileManager = DataFileManager(scheduler=scheduler, catalog=catalog)
+    manager.on_init()
+
+    btc: CurrencyPair = CurrencyPair(base="BTC", quote="USDT")
+    eth: CurrencyPair = CurrencyPair(base="ETH", quote="USDT")
+
+    for i in range(100):
+        for currency_pair in (btc, eth):
+            data_file: DataFile = manager.get_file(currency_pair=currency_pair, name="trade")
+            data_file.write_data(data=trade_frame(i))
+
+            if i % 10 == 9:
+                data_file.flush()
+
+    evictions: int = manager._handles.get_metrics().evictions
+
+    manager.on_destroy()
+
+    # every flush but the first one evicts the other file
+    assert evictions == 19
+    assert [s.records for s in catalog.find(symbol="BTCUSDT", name="trade")] == [100]
+    assert [s.records for s in catalog.find(symbol="ETHUSDT", name="trade")] == [100]
+
+    catalog.close()
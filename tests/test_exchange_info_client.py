@@ -0,0 +1,74 @@
+# coding=utf-8
+import json
+import typing
+
+from binance_data_collector.app.helpers.exchange_info_client import (
+    ExchangeInfoClient,
+    ExchangeInfoDelta,
+)
+
+
+class FakeResponse(object):
+    def __init__(self, content: bytes) -> None:
+        self.content: bytes = content
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+def document(*symbols: str) -> bytes:
+    return json.dumps(
+        {
+            "serverTime": 1,
+            "symbols": [
+                {
+                    "symbol": symbol,
+                    "baseAsset": symbol[:3],
+                    "quoteAsset": symbol[3:],
+                    "status": "TRADING",
+                    "filters": [],
+                }
+                for symbol in symbols
+            ],
+        }
+    ).encode("utf8")
+
+
+def create(documents: list[bytes]) -> ExchangeInfoClient:
+    client: ExchangeInfoClient = ExchangeInfoClient()
+    responses: typing.Iterator[bytes] = iter(documents)
+    client._session.get = lambda **kwargs: FakeResponse(content=next(responses))
+
+    return client
+
+
+def test_delta_is_reported_until_acknowledged():
+    client: ExchangeInfoClient = create(
+        documents=[
+            document("BTCUSDT"),
+            document("BTCUSDT"),
+            document("BTCUSDT"),
+            document("BTCUSDT", "ETHUSDT"),
+        ],
+    )
+
+    # the consumer failed to apply the first one
+    failed: ExchangeInfoDelta = client.refresh()
+    delta: ExchangeInfoDelta = client.refresh()
+
+    assert failed.initial and delta.initial
+    assert [info.symbol for info in delta.added] == ["btcusdt"]
+
+    client.acknowledge(delta=delta)
+
+    assert client.refresh() is None
+
+    delta = client.refresh()
+
+    assert not delta.initial
+    assert [info.symbol for info in delta.added] == ["ethusdt"]
+    assert client.get_symbol(symbol="ethusdt") is None
+
+    client.acknowledge(delta=delta)
+
+    assert client.get_symbol(symbol="ethusdt").base == "ETH"
@@ -0,0 +1,54 @@
+# coding=utf-8
+from pathlib import Path
+
+from binance_data_collector.app.models.currency_pair import CurrencyPair, CurrencyPairStatus
+from binance_data_collector.app.models.file_mock_repository import FileMockRepository
+
+
+def create_repository(path: Path) -> FileMockRepository[CurrencyPair]:
+    repository: FileMockRepository[CurrencyPair] = FileMockRepository[CurrencyPair](
+        path=path / "currency_pairs.json",
+        indexes=["status", "quote"],
+    )
+    repository.load()
+
+    return repository
+
+
+def test_indexed_results_keep_the_order_of_the_entries(tmp_path):
+    repository: FileMockRepository[CurrencyPair] = create_repository(path=tmp_path)
+    currency_pairs: list[CurrencyPair] = repository.create_many(
+        items=[CurrencyPair(base=base, quote="USDT") for base in ["BTC", "ETH", "BNB"]],
+    )
+
+    # moves the first one to the end of its bucket
+    currency_pairs[0].status = CurrencyPairStatus.ACTIVE
+    repository.update(uuid=currency_pairs[0].uuid, item=currency_pairs[0])
+    currency_pairs[0].status = CurrencyPairStatus.CREATED
+    repository.update(uuid=currency_pairs[0].uuid, item=currency_pairs[0])
+
+    expected: list[str] = [cp.symbol for cp in repository.find()]
+
+    assert [cp.symbol for cp in repository.find(query={"quote": "USDT"})] == expected
+    assert [
+        cp.symbol for cp in repository.find(query={"status": CurrencyPairStatus.CREATED})
+    ] == expected
+
+    reloaded: FileMockRepository[CurrencyPair] = create_repository(path=tmp_path)
+
+    assert [cp.symbol for cp in reloaded.find(query={"quote": "USDT"})] == expected
+
+
+def test_indexes_reflect_the_saved_state(tmp_path):
+    repository: FileMockRepository[CurrencyPair] = create_repository(path=tmp_path)
+    [currency_pair] = repository.create_many(items=[CurrencyPair(base="BTC", quote="USDT")])
+
+    currency_pair.status = CurrencyPairStatus.ACTIVE
+
+    # not saved yet: found by neither the saved nor the current value
+    assert repository.find(query={"status": CurrencyPairStatus.CREATED}) == []
+    assert repository.find(query={"status": CurrencyPairStatus.ACTIVE}) == []
+
+    repository.update(uuid=currency_pair.uuid, item=currency_pair)
+
+    assert repository.find(query={"status": CurrencyPairStatus.ACTIVE}) == [currency_pair]
@@ -0,0 +1,60 @@
+# coding=utf-8
+import json
+import typing
+
+import pytest
+
+from binance_data_collector.app.helpers.frames import get_frame_info, scan_frame_info
+
+from conftest import trade_frame
+
+DEPTH_FRAME: dict[str, typing.Any] = {
+    "stream": "btcusdt@depth@100ms",
+    "data": {
+        "e": "depthUpdate",
+        "E": 1700000000123,
+        "s": "BTCUSDT",
+        "U": 157,
+        "u": 160,
+        "b": [["0.0024", "10"]],
+        "a": [["0.0026", "100"]],
+    },
+}
+
+SNAPSHOT: dict[str, typing.Any] = {
+    "lastUpdateId": 1027024,
+    "bids": [["4.00000000", "431.00000000"]],
+    "asks": [["4.00000200", "12.00000000"]],
+    "time": 1700000000123456789,
+}
+
+GAP: dict[str, typing.Any] = {
+    "symbol": "btcusdt",
+    "expected": 161,
+    "received": 170,
+    "time": 1700000000123456789,
+}
+
+
+@pytest.mark.parametrize(
+    "frame, payload",
+    [
+        # stream frames are stored as received, without whitespace
+        (trade_frame(1), json.dumps(trade_frame(1), separators=(",", ":")).encode("utf8")),
+        (DEPTH_FRAME, json.dumps(DEPTH_FRAME, separators=(",", ":")).encode("utf8")),
+        # snapshots and gaps are written by the collector
+        (SNAPSHOT, json.dumps(SNAPSHOT).encode("utf8")),
+        (GAP, json.dumps(GAP).encode("utf8")),
+    ],
+    ids=["trade", "depth", "snapshot", "gap"],
+)
+def test_scanned_and_decoded_frame_info_match(frame, payload):
+    assert scan_frame_info(payload=payload) == get_frame_info(frame=frame)
+
+
+def test_snapshot_frame_info():
+    assert scan_frame_info(payload=json.dumps(SNAPSHOT).encode("utf8")) == (
+        1700000000123,
+        1027024,
+        1027024,
+    )
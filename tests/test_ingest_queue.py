@@ -0,0 +1,63 @@
+# coding=utf-8
+import threading
+
+from binance_data_collector.app.helpers.ingest_queue import DropPolicy, IngestQueue
+
+
+def test_pressure_is_emitted_in_order_under_the_lock():
+    release: threading.Event = threading.Event()
+    ingest_queue: IngestQueue[int] = IngestQueue(
+        handler=lambda item: release.wait(timeout=5),
+        workers=1,
+        capacity=10,
+    )
+
+    emitted: list[tuple[bool, bool]] = []
+    ingest_queue.pressure.subscribe(
+        on_next=lambda paused: emitted.append(
+            (paused, ingest_queue._lock.locked()),
+        ),
+    )
+
+    ingest_queue.start()
+
+    for i in range(9):
+        ingest_queue.put(key="a", item=i)
+
+    release.set()
+    ingest_queue.stop()
+
+    assert emitted == [(True, True), (False, True)]
+    assert not ingest_queue.get_metrics().paused
+
+
+def test_drop_newest_when_full():
+    ingest_queue: IngestQueue[int] = IngestQueue(
+        handler=lambda item: None,
+        workers=1,
+        capacity=2,
+        policy=DropPolicy.DROP_NEWEST,
+    )
+
+    assert ingest_queue.put(key="a", item=1)
+    assert ingest_queue.put(key="a", item=2)
+    assert not ingest_queue.put(key="a", item=3)
+
+    assert ingest_queue.get_metrics().dropped == 1
+
+
+def test_items_of_a_key_keep_their_order():
+    handled: list[int] = []
+    ingest_queue: IngestQueue[int] = IngestQueue(
+        handler=handled.append,
+        workers=4,
+        capacity=10000,
+    )
+    ingest_queue.start()
+
+    for i in range(1000):
+        ingest_queue.put(key="btcusdt", item=i)
+
+    ingest_queue.stop()
+
+    assert handled == list(range(1000))
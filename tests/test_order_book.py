@@ -0,0 +1,97 @@
+# coding=utf-8
+import random
+
+from binance_data_collector.app.helpers.order_book import BookSide, OrderBook
+
+
+def diff(first: int, last: int, bids=(), asks=()) -> dict:
+    return {"U": first, "u": last, "b": list(bids), "a": list(asks)}
+
+
+def test_book_side_keeps_levels_ordered_from_the_best_price():
+    bids: BookSide = BookSide(descending=True)
+    asks: BookSide = BookSide(descending=False)
+
+    expected: dict[str, str] = {}
+    rng: random.Random = random.Random(7)
+
+    for _ in range(2000):
+        price: str = f"{rng.randint(1, 300)}.5"
+        quantity: str = rng.choice(["0", "0", "1.0", "2.0"])
+
+        bids.update(price=price, quantity=quantity)
+        asks.update(price=price, quantity=quantity)
+
+        if quantity == "0":
+            expected.pop(price, None)
+        else:
+            expected[price] = quantity
+
+    ordered: list[tuple[str, str]] = sorted(expected.items(), key=lambda level: float(level[0]))
+
+    assert len(bids) == len(asks) == len(expected)
+    assert asks.get_levels(depth=10) == ordered[:10]
+    assert bids.get_levels(depth=10) == ordered[::-1][:10]
+    assert asks.best() == ordered[0]
+    assert bids.best() == ordered[-1]
+    # removed levels do not pile up in the heap
+    assert len(asks._heap) <= max(64, 2 * len(expected))
+
+
+def test_book_side_deletes_and_readds_a_level():
+    asks: BookSide = BookSide(descending=False)
+
+    asks.update(price="1.0", quantity="5")
+    asks.update(price="2.0", quantity="5")
+    asks.update(price="1.0", quantity="0")
+
+    assert asks.best() == ("2.0", "5")
+
+    asks.update(price="1.0", quantity="3")
+
+    assert asks.get_levels(depth=5) == [("1.0", "3"), ("2.0", "5")]
+
+
+def test_diffs_are_buffered_until_the_snapshot():
+    book: OrderBook = OrderBook(symbol="btcusdt")
+
+    assert book.apply_diff(diff=diff(1, 5, bids=[("9.0", "1")]))
+    assert book.apply_diff(diff=diff(6, 8, asks=[("11.0", "2")]))
+    assert book.apply_diff(diff=diff(9, 10, bids=[("9.0", "0"), ("8.0", "3")]))
+    assert not book.synced
+
+    assert book.apply_snapshot(snapshot={
+        "lastUpdateId": 7,
+        "bids": [["9.0", "1"]],
+        "asks": [["12.0", "1"]],
+    })
+
+    # the first diff is older than the snapshot, the second overlaps it
+    assert book.last_update_id == 10
+    assert book.top() == (("8.0", "3"), ("11.0", "2"))
+
+
+def test_gap_resets_the_book():
+    book: OrderBook = OrderBook(symbol="btcusdt")
+
+    book.apply_snapshot(snapshot={"lastUpdateId": 10, "bids": [["9.0", "1"]], "asks": []})
+
+    assert book.apply_diff(diff=diff(11, 12))
+    # a stale diff is ignored
+    assert book.apply_diff(diff=diff(5, 12))
+    assert not book.apply_diff(diff=diff(14, 15))
+
+    assert not book.synced
+    assert book.top() == (None, None)
+
+
+def test_stale_snapshot_is_not_applied():
+    book: OrderBook = OrderBook(symbol="btcusdt")
+
+    book.apply_diff(diff=diff(20, 25))
+
+    assert not book.apply_snapshot(snapshot={"lastUpdateId": 10, "bids": [], "asks": []})
+    assert not book.synced
+
+    assert book.apply_snapshot(snapshot={"lastUpdateId": 22, "bids": [], "asks": []})
+    assert book.last_update_id == 25
@@ -0,0 +1,107 @@
+# coding=utf-8
+import json
+import typing
+
+import pytest
+
+from binance_data_collector.app.helpers.record_format import (
+    BinaryRecordEncoder,
+    JsonRecordEncoder,
+    Record,
+    TRADE,
+    RecordKind,
+    create_encoder,
+    get_scale,
+    iter_records,
+)
+
+from conftest import trade_frame
+
+
+def depth_frame(i: int) -> dict[str, typing.Any]:
+    return {
+        "stream": "btcusdt@depth@100ms",
+        "data": {
+            "e": "depthUpdate",
+            "E": 1000 + i,
+            "s": "BTCUSDT",
+            "U": 10 * i,
+            "u": 10 * i + 9,
+            "b": [["30000.01000000", "0.50000000"], ["29999.99000000", "0.00000000"]],
+            "a": [["30000.02000000", "1.25000000"]],
+        },
+    }
+
+
+@pytest.mark.parametrize(
+    "size, scale",
+    [("0.01000000", 2), ("1.00000000", 0), ("0.00000001", 8), (None, 8), ("0", 8)],
+)
+def test_get_scale(size, scale):
+    assert get_scale(size=size) == scale
+
+
+@pytest.mark.parametrize(
+    "channel, frame",
+    [("trade", trade_frame(7)), ("depth", depth_frame(3))],
+)
+def test_frames_round_trip(channel, frame):
+    encoder: BinaryRecordEncoder = create_encoder(
+        name="bin",
+        channel=channel,
+        tick_size="0.01000000",
+        step_size="0.00100000",
+    )
+
+    [record] = iter_records(data=encoder.encode_data(data=frame))
+
+    assert record.raw is None
+    assert record.frame == frame
+
+
+def test_raw_frames_round_trip_as_received():
+    encoder: BinaryRecordEncoder = BinaryRecordEncoder(kind=RecordKind.TRADE)
+    raw: bytes = json.dumps(trade_frame(1)).encode("utf8")
+
+    [record] = iter_records(data=encoder.encode_raw(data=raw))
+
+    assert record.frame == trade_frame(1)
+    assert (record.event_time, record.first_id) == (1001, 1)
+
+
+def test_frames_exceeding_the_scale_are_kept_raw():
+    encoder: BinaryRecordEncoder = BinaryRecordEncoder(
+        kind=RecordKind.TRADE,
+        price_scale=1,
+    )
+    frame: dict[str, typing.Any] = trade_frame(1)
+
+    [record] = iter_records(data=encoder.encode_data(data=frame))
+
+    assert record.frame is None
+    assert json.loads(record.raw) == frame
+
+
+def test_header_starts_every_block():
+    encoder: BinaryRecordEncoder = BinaryRecordEncoder(kind=RecordKind.TRADE)
+
+    first: bytes = encoder.encode_data(data=trade_frame(1))
+    second: bytes = encoder.encode_data(data=trade_frame(2))
+
+    # the second record continues the block
+    assert len(second) == TRADE.size
+
+    encoder.reset()
+    third: bytes = encoder.encode_data(data=trade_frame(3))
+
+    records: list[Record] = list(iter_records(data=third))
+
+    assert len(first) == len(third)
+    assert [record.first_id for record in records] == [3]
+
+
+def test_other_channels_fall_back_to_json():
+    assert isinstance(create_encoder(name="bin", channel="gap"), JsonRecordEncoder)
+
+    with pytest.raises(RuntimeError):
+        create_encoder(name="csv", channel="trade")
@@ -0,0 +1,74 @@
+# coding=utf-8
+import threading
+import time
+
+from binance_data_collector.app.helpers.scheduler import Job, Scheduler
+from binance_data_collector.environments import environment
+
+
+def wait_for(predicate, timeout_s: float = 2.0) -> bool:
+    deadline: float = time.monotonic() + timeout_s
+
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+
+        time.sleep(0.005)
+
+    return True
+
+
+def test_cancel_waits_for_the_running_callback(monkeypatch):
+    monkeypatch.setattr(environment, "scheduler_workers", 1)
+
+    scheduler: Scheduler = Scheduler()
+    scheduler.on_init()
+
+    started: threading.Event = threading.Event()
+    release: threading.Event = threading.Event()
+    finished: list[bool] = []
+
+    def callback() -> None:
+        started.set()
+        release.wait()
+        finished.append(True)
+
+    job: Job = scheduler.call_later(name="blocking", delay_s=0.0, callback=callback)
+
+    assert started.wait(timeout=2.0)
+
+    threading.Timer(0.1, release.set).start()
+    scheduler.cancel(job=job)
+
+    assert finished == [True]
+
+    scheduler.on_destroy()
+
+
+def test_cancel_returns_for_a_run_dropped_at_shutdown(monkeypatch):
+    monkeypatch.setattr(environment, "scheduler_workers", 1)
+
+    scheduler: Scheduler = Scheduler()
+    scheduler.on_init()
+
+    release: threading.Event = threading.Event()
+
+    scheduler.call_later(name="blocking", delay_s=0.0, callback=release.wait)
+    # queued behind the blocking job on the single worker
+    job: Job = scheduler.call_later(name="queued", delay_s=0.0, callback=lambda: None)
+
+    assert wait_for(lambda: job.running)
+
+    destroy: threading.Thread = threading.Thread(target=scheduler.on_destroy)
+    destroy.start()
+
+    threading.Timer(0.1, release.set).start()
+    destroy.join(timeout=2.0)
+
+    cancel: threading.Thread = threading.Thread(target=scheduler.cancel, args=(job,), daemon=True)
+    cancel.start()
+    cancel.join(timeout=2.0)
+
+    assert not destroy.is_alive()
+    assert not cancel.is_alive()
+    assert not job.running
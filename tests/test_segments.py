@@ -0,0 +1,101 @@
+# coding=utf-8
+import os
+from pathlib import Path
+
+import pytest
+
+from binance_data_collector.app.helpers.block_index import get_index_path
+from binance_data_collector.app.helpers.catalog import Catalog
+from binance_data_collector.app.helpers.data_file_manager import DataFileManager
+from binance_data_collector.app.helpers.segments import (
+    ORPHAN_SUFFIX,
+    PARTIAL_SUFFIX,
+    SegmentFile,
+    finalize_partial,
+    recover_partials,
+)
+from binance_data_collector.app.models.currency_pair import CurrencyPair
+
+from conftest import FakeScheduler, trade_frame
+
+
+def write_partial(scheduler: FakeScheduler, base: str = "BTC") -> Path:
+    """Data written until a crash, returns the partial data file"""
+
+    catalog: Catalog = Catalog()
+    manager: DataFileManager = DataFileManager(scheduler=scheduler, catalog=catalog)
+    currency_pair: CurrencyPair = CurrencyPair(base=base, quote="USDT")
+
+    for i in range(300):
+        manager.get_file(currency_pair=currency_pair, name="trade").write_data(
+            data=trade_frame(i),
+        )
+
+    data_file = manager.get_file(currency_pair=currency_pair, name="trade")
+    data_file.flush()
+
+    catalog.close()
+
+    [partial_path] = data_file.path.parent.glob(f"*{PARTIAL_SUFFIX}")
+
+    return partial_path
+
+
+def get_final_path(partial_path: Path) -> Path:
+    return partial_path.with_name(partial_path.name.removesuffix(PARTIAL_SUFFIX))
+
+
+def test_torn_block_is_cut_off(data_root, scheduler):
+    partial_path: Path = write_partial(scheduler=scheduler)
+    size: int = partial_path.stat().st_size
+
+    # a block was being written, its index entry is missing
+    with open(partial_path, mode="ab") as f:
+        f.write(b"\x1f\x8b torn")
+
+    segment: SegmentFile = finalize_partial(path=get_final_path(partial_path))
+
+    assert segment.records == 300
+    assert segment.size == size
+    assert segment.path.stat().st_size == size
+    assert not partial_path.exists()
+
+
+def test_foreign_index_does_not_stop_recovery(data_root, scheduler):
+    foreign_path: Path = write_partial(scheduler=scheduler)
+    get_index_path(path=foreign_path).write_bytes(b"\x00" * 200)
+
+    # sorted after the foreign one
+    other_path: Path = write_partial(scheduler=scheduler, base="ETH")
+    os.replace(other_path, foreign_path.with_name(f"z{other_path.name}"))
+    os.replace(
+        get_index_path(path=other_path),
+        get_index_path(path=foreign_path.with_name(f"z{other_path.name}")),
+    )
+
+    segments: list[SegmentFile] = recover_partials(directory=foreign_path.parent)
+
+    assert [segment.records for segment in segments] == [300]
+    assert foreign_path.exists()
+
+
+def test_missing_index_is_kept_as_orphan(data_root, scheduler):
+    partial_path: Path = write_partial(scheduler=scheduler)
+    get_index_path(path=partial_path).unlink()
+
+    path: Path = get_final_path(partial_path)
+
+    with pytest.raises(ValueError):
+        finalize_partial(path=path)
+
+    assert not partial_path.exists()
+    assert path.with_name(path.name + ORPHAN_SUFFIX).stat().st_size > 0
+
+
+def test_empty_segment_is_removed(data_root, scheduler):
+    partial_path: Path = write_partial(scheduler=scheduler)
+    os.truncate(partial_path, 0)
+
+    assert finalize_partial(path=get_final_path(partial_path)) is None
+    assert not partial_path.exists()
+    assert not get_index_path(path=partial_path).exists()
@@ -0,0 +1,83 @@
+# coding=utf-8
+from pathlib import Path
+
+import pytest
+
+from binance_data_collector.app.models.currency_pair import CurrencyPair, CurrencyPairStatus
+from binance_data_collector.app.models.file_mock_repository import FileMockRepository
+from binance_data_collector.app.models.repository import EntityNotFoundException
+from binance_data_collector.app.models.sqlite_repository import SqliteRepository
+
+
+def create_repository(path: Path) -> SqliteRepository[CurrencyPair]:
+    repository: SqliteRepository[CurrencyPair] = SqliteRepository[CurrencyPair](
+        path=path / "currency_pairs.db",
+        cls=CurrencyPair,
+        table="currency_pairs",
+        indexes=["status", "base", "quote"],
+        import_path=path / "currency_pairs.json",
+    )
+    repository.load()
+
+    return repository
+
+
+def test_rollback_reloads_the_written_entities(tmp_path):
+    repository: SqliteRepository[CurrencyPair] = create_repository(path=tmp_path)
+    [btc, eth] = repository.create_many(
+        items=[CurrencyPair(base="BTC", quote="USDT"), CurrencyPair(base="ETH", quote="USDT")],
+    )
+
+    with pytest.raises(EntityNotFoundException):
+        with repository.batch():
+            btc.status = CurrencyPairStatus.ACTIVE
+            repository.update(uuid=btc.uuid, item=btc)
+
+            repository.update(uuid="missing", item=CurrencyPair(base="BNB", quote="USDT"))
+
+    # the same instance, with the committed values
+    assert repository.read(uuid=btc.uuid) is btc
+    assert btc.status == CurrencyPairStatus.CREATED
+    assert repository.read(uuid=eth.uuid) is eth
+
+    repository.close()
+
+
+def test_rollback_evicts_the_created_entities_and_restores_the_deleted(tmp_path):
+    repository: SqliteRepository[CurrencyPair] = create_repository(path=tmp_path)
+    [btc] = repository.create_many(items=[CurrencyPair(base="BTC", quote="USDT")])
+
+    with pytest.raises(RuntimeError):
+        with repository.batch():
+            repository.create_many(items=[CurrencyPair(base="ETH", quote="USDT")])
+            repository.delete(uuid=btc.uuid)
+
+            raise RuntimeError()
+
+    assert repository.find(query={"base": "ETH"}) == []
+    assert repository.find(query={"base": "BTC"})[0] is btc
+
+    repository.close()
+
+
+def test_file_entities_are_imported_into_an_empty_table(tmp_path):
+    fmr: FileMockRepository[CurrencyPair] = FileMockRepository[CurrencyPair](
+        path=tmp_path / "currency_pairs.json",
+    )
+    fmr.load()
+    [currency_pair] = fmr.create_many(items=[CurrencyPair(base="BTC", quote="USDT")])
+
+    repository: SqliteRepository[CurrencyPair] = create_repository(path=tmp_path)
+
+    assert [cp.uuid for cp in repository.find(query={"base": "BTC"})] == [currency_pair.uuid]
+
+    # imported once, deleted entities do not come back
+    repository.delete(uuid=currency_pair.uuid)
+    repository.close()
+
+    repository = create_repository(path=tmp_path)
+
+    assert repository.find() == []
+    assert (tmp_path / "currency_pairs.json.imported").exists()
+
+    repository.close()
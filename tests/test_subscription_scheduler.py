@@ -0,0 +1,93 @@
+# coding=utf-8
+import typing
+
+from binance_data_collector.app.helpers.subscription_scheduler import (
+    SubscriptionScheduler,
+)
+
+
+class Timers(object):
+    """Collects the callbacks of `call_later`, runs the due ones on demand"""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[float, typing.Callable[[], typing.Any]]] = []
+
+    def call_later(self, delay_s: float, callback: typing.Callable[[], typing.Any]) -> None:
+        self.calls.append((delay_s, callback))
+
+    def run(self, max_delay_s: float = 0.0) -> None:
+        due = [call for call in self.calls if call[0] <= max_delay_s]
+        self.calls = [call for call in self.calls if call[0] > max_delay_s]
+
+        for _, callback in due:
+            callback()
+
+
+def create() -> tuple[SubscriptionScheduler, Timers, list[dict[str, typing.Any]]]:
+    timers: Timers = Timers()
+    frames: list[dict[str, typing.Any]] = []
+
+    scheduler: SubscriptionScheduler = SubscriptionScheduler(
+        send=frames.append,
+        call_later=timers.call_later,
+        streams_per_message=2,
+    )
+
+    return scheduler, timers, frames
+
+
+def test_streams_are_packed_into_frames():
+    scheduler, timers, frames = create()
+
+    scheduler.connect(streams=["a", "b", "c"])
+    timers.run()
+
+    assert [frame["params"] for frame in frames] == [["a", "b"], ["c"]]
+    assert scheduler.queued == 0
+    assert scheduler.pending == 2
+
+
+def test_subscribe_after_ack_is_sent_promptly():
+    scheduler, timers, frames = create()
+
+    scheduler.connect(streams=["a"])
+    timers.run()
+
+    # the tick waiting for the ack timeout stays armed
+    assert len(timers.calls) == 1
+    assert timers.calls[0][0] > 1.0
+
+    scheduler.acknowledge(key=frames[0]["id"])
+    scheduler.subscribe(streams=["b"])
+    timers.run()
+
+    assert frames[-1]["params"] == ["b"]
+    assert scheduler.queued == 0
+
+
+def test_stale_tick_is_ignored():
+    scheduler, timers, frames = create()
+
+    scheduler.connect(streams=["a"])
+    timers.run()
+    scheduler.subscribe(streams=["b"])
+    timers.run()
+
+    # the ack timeout tick of the first frame was replaced, only the current
+    # one is armed again
+    timers.run(max_delay_s=60.0)
+
+    assert len(frames) == 2
+    assert len(timers.calls) == 1
+
+
+def test_opposite_requests_cancel_out():
+    scheduler, timers, frames = create()
+
+    scheduler.connect(streams=[])
+    scheduler.subscribe(streams=["a"])
+    scheduler.unsubscribe(streams=["a"])
+    timers.run()
+
+    assert frames == []
+    assert scheduler.queued == 0
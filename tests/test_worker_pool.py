@@ -0,0 +1,111 @@
+# coding=utf-8
+import threading
+
+import pytest
+
+from binance_data_collector.app.helpers.scheduler import JobMetrics
+from binance_data_collector.app.helpers.snapshot_fetcher import (
+    SnapshotMetrics,
+    WeightBudget,
+)
+from binance_data_collector.app.helpers.worker_pool import _merge
+
+
+def snapshot_metrics(requests: int, latency_ms_avg: float, used_weight: int) -> SnapshotMetrics:
+    return SnapshotMetrics(
+        workers=4,
+        requests=requests,
+        failures=1,
+        throttled=0,
+        used_weight=used_weight,
+        weight_budget=3000,
+        sent_weight=requests * 250,
+        sent_weight_last=requests * 500,
+        latency_ms_avg=latency_ms_avg,
+        latency_ms_max=latency_ms_avg * 2,
+    )
+
+
+def test_merge_combines_fields_by_meaning():
+    merged: SnapshotMetrics = _merge(
+        values=[
+            snapshot_metrics(requests=1, latency_ms_avg=10.0, used_weight=100),
+            snapshot_metrics(requests=3, latency_ms_avg=30.0, used_weight=120),
+        ],
+    )
+
+    assert merged.requests == 4
+    assert merged.failures == 2
+    assert merged.used_weight == 120
+    assert merged.weight_budget == 3000
+    # every worker sends its own weight
+    assert merged.sent_weight == 1000
+    assert merged.sent_weight_last == 2000
+    assert merged.latency_ms_avg == 25.0
+    assert merged.latency_ms_max == 60.0
+
+
+def test_merge_joins_lists():
+    job: JobMetrics = JobMetrics(
+        name="a",
+        jobs=1,
+        runs=0,
+        skipped=0,
+        failures=0,
+        run_time_ms_avg=0.0,
+        run_time_ms_max=0.0,
+        lateness_ms_avg=0.0,
+        lateness_ms_max=0.0,
+    )
+
+    assert _merge(values=[[job], [job]]) == [job, job]
+
+
+def test_weight_budget_share():
+    budget: WeightBudget = WeightBudget(limit=100, share=50)
+
+    assert budget.acquire(weight=50) is False
+    budget.update(used=60)
+
+    # the count of the IP is below the limit, the share is used up: the
+    # request waits until the budget is closed
+    threading.Timer(interval=0.1, function=budget.close).start()
+
+    with pytest.raises(RuntimeError):
+        budget.acquire(weight=1)
+
+
+def test_weight_budget_counts_the_weight_sent_per_window(monkeypatch):
+    window: list[int] = [100]
+    monkeypatch.setattr(WeightBudget, "_get_window", staticmethod(lambda: window[0]))
+
+    budget: WeightBudget = WeightBudget(limit=100)
+
+    budget.acquire(weight=20)
+    budget.acquire(weight=30)
+
+    assert budget.sent == (50, 0)
+
+    window[0] += 1
+    budget.acquire(weight=10)
+
+    assert budget.sent == (10, 50)
+
+    # a window without requests in between
+    window[0] += 2
+
+    assert budget.sent == (0, 0)
+
+
+def test_weight_budget_blocks_at_the_limit(monkeypatch):
+    # no new window while waiting
+    monkeypatch.setattr(WeightBudget, "_get_window", staticmethod(lambda: 100))
+
+    budget: WeightBudget = WeightBudget(limit=100)
+
+    assert budget.acquire(weight=100) is False
+
+    threading.Timer(interval=0.1, function=budget.close).start()
+
+    with pytest.raises(RuntimeError):
+        budget.acquire(weight=1)